@@ -0,0 +1,160 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "10000"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "")  # SQLite file; empty keeps the cache in memory only
+
+
+def document_set_fingerprint(content_keys: Iterable[str]) -> str:
+    """Order-independent fingerprint of a set of documents from their content hashes."""
+    return hashlib.sha256("|".join(sorted(content_keys)).encode("utf-8")).hexdigest()
+
+
+def normalize_question(question: str) -> str:
+    return re.sub(r"\s+", " ", question).strip().lower()
+
+
+def _numbers(question: str) -> set:
+    """Numbers in a question; paraphrases must agree on these (e.g. "5L" vs "20L" sum insured)."""
+    return set(re.findall(r"\d+(?:\.\d+)?", question))
+
+
+class AnswerCache:
+    """
+    Answers keyed by (document-set fingerprint, question).
+
+    A lookup first tries the exact normalized question, then the cached question
+    for the same documents whose embedding has the highest cosine similarity,
+    accepted if it reaches `threshold` and both questions mention the same
+    numbers. Entries expire after `ttl` seconds and the least recently used are
+    evicted beyond `max_entries`. With `path` set, entries are also written to
+    SQLite and reloaded on startup.
+    """
+
+    def __init__(self, ttl: float = ANSWER_CACHE_TTL, max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+                 threshold: float = ANSWER_CACHE_THRESHOLD, path: str = ANSWER_CACHE_PATH):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, str, float]]" = OrderedDict()
+        self._by_fingerprint: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "near_hits": 0, "misses": 0}
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS answers (fingerprint TEXT, question TEXT, embedding BLOB, "
+                "answer TEXT, created REAL, PRIMARY KEY (fingerprint, question))"
+            )
+            self._load()
+
+    def _load(self) -> None:
+        cutoff = time.time() - self.ttl
+        rows = self._db.execute(
+            "SELECT fingerprint, question, embedding, answer, created FROM answers "
+            "WHERE created >= ? ORDER BY created DESC LIMIT ?", (cutoff, self.max_entries)
+        ).fetchall()
+        for fingerprint, question, blob, answer, created in reversed(rows):
+            self._store((fingerprint, question), np.frombuffer(blob, dtype="float32"), answer, created)
+        self._db.execute("DELETE FROM answers WHERE created < ?", (cutoff,))
+        self._db.commit()
+        logger.info(f"Loaded {len(rows)} cached answers from disk")
+
+    def _store(self, key: Tuple[str, str], embedding: np.ndarray, answer: str, created: float) -> None:
+        self._entries[key] = (embedding, answer, created)
+        self._entries.move_to_end(key)
+        self._by_fingerprint.setdefault(key[0], set()).add(key)
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        self._entries.pop(key, None)
+        keys = self._by_fingerprint.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_fingerprint[key[0]]
+        if self._db is not None:
+            self._db.execute("DELETE FROM answers WHERE fingerprint = ? AND question = ?", key)
+
+    def get(self, fingerprint: str, question: str, embedding: np.ndarray) -> Optional[str]:
+        """
+        Look up an answer for a question about a document set.
+
+        Args:
+            fingerprint: From `document_set_fingerprint`
+            question: The question
+            embedding: L2-normalized question embedding
+
+        Returns:
+            Cached answer, or None on a miss
+        """
+        now = time.time()
+        key = (fingerprint, normalize_question(question))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[2] <= self.ttl:
+                self._entries.move_to_end(key)
+                self._stats["exact_hits"] += 1
+                return entry[1]
+
+            best_key, best_score = None, self.threshold
+            numbers = _numbers(key[1])
+            for other in list(self._by_fingerprint.get(fingerprint, ())):
+                other_embedding, _, created = self._entries[other]
+                if now - created > self.ttl:
+                    self._drop(other)
+                    continue
+                if _numbers(other[1]) != numbers:
+                    continue
+                score = float(np.dot(other_embedding, embedding))
+                if score >= best_score:
+                    best_key, best_score = other, score
+
+            if best_key is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self._stats["near_hits"] += 1
+            logger.info(f"Near-duplicate answer cache hit (cosine {best_score:.3f}): {best_key[1]!r}")
+            return self._entries[best_key][1]
+
+    def put(self, fingerprint: str, question: str, embedding: np.ndarray, answer: str) -> None:
+        """Cache an answer, evicting the least recently used entries over `max_entries`."""
+        key = (fingerprint, normalize_question(question))
+        embedding = np.ascontiguousarray(embedding, dtype="float32")
+        created = time.time()
+        with self._lock:
+            self._store(key, embedding, answer, created)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?)",
+                    (*key, embedding.tobytes(), answer, created),
+                )
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+            if self._db is not None:
+                self._db.commit()
+
+    def stats(self) -> dict:
+        """Hit and miss counts, hit rate and current size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["exact_hits"] + stats["near_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["exact_hits"] + stats["near_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
@@ -1,12 +1,20 @@
-from flask import Flask, request, jsonify
-from document_loader import extract_structured_table_with_fallback, extract_text_and_urls_fallback
-from vectorizer import build_vector_index
-from retriever import get_top_chunks
-from gpt_client import get_gemini_response
-from urllib.parse import urlparse
+import startup
+from flask import Flask, request, jsonify, Response, stream_with_context
+from vectorizer import reconstruct_all
+from corpus import Corpus
+from pipeline import ingest_documents
+from retriever import encode_queries
+from gpt_client import get_gemini_response, get_model
+from llm_pool import answer_questions
+from model_registry import get_embedding_model, warm_up
+from downloader import PDF_STORAGE_DIR
+from qa_service import fetch_document, clean_answer, index_cache
+from jobs import JobManager, QueueFull, FINISHED
+import metrics
+import tracing
 import os
-import requests
-import time
+import json
+import threading
 import logging
 from logging.handlers import RotatingFileHandler
 from dotenv import load_dotenv
@@ -16,7 +24,6 @@ load_dotenv()
 EXPECTED_TOKEN = os.getenv("API_TOKEN")
 
 # 📂 Ensure PDF storage folder exists
-PDF_STORAGE_DIR = "pdfs"
 os.makedirs(PDF_STORAGE_DIR, exist_ok=True)
 
 # 📂 Ensure logs directory exists
@@ -25,6 +32,22 @@ os.makedirs(LOG_DIR, exist_ok=True)
 
 app = Flask(__name__)
 
+# 📚 Long-lived multi-document corpus, reloaded from disk on first use or during warm-up
+_corpus = None
+_corpus_lock = threading.Lock()
+
+def get_corpus() -> Corpus:
+    global _corpus
+    if _corpus is None:
+        with _corpus_lock:
+            if _corpus is None:
+                with startup.timed_init("corpus"):
+                    _corpus = Corpus.load()
+    return _corpus
+
+# ⏳ Background job queue; the synchronous endpoint runs through it too
+jobs = JobManager()
+
 # Set up logging
 def setup_logging():
     # Create a file handler that writes to log.txt
@@ -58,6 +81,24 @@ def setup_logging():
 
 setup_logging()
 
+# 🔥 Load the heavy stack ahead of the first request. In the background by default, so
+# the worker answers /healthz right away; /readyz turns 200 once everything is loaded.
+# WARMUP_EMBEDDING_MODEL=true (the old switch) still means a blocking warm-up.
+HEAVY_MODULES = ("numpy", "faiss", "torch", "sentence_transformers", "fitz", "camelot", "google.generativeai")
+WARMUP_STEPS = [
+    ("embedding_model", warm_up),
+    ("gemini_client", get_model),
+    ("corpus", get_corpus),
+]
+warmup_mode = startup.STARTUP_WARMUP
+if os.getenv("WARMUP_EMBEDDING_MODEL", "false").lower() in ("1", "true", "yes"):
+    warmup_mode = "blocking"
+# Extraction worker processes import this module again as __mp_main__ when the app
+# runs as a script; they only need document_loader, so they skip the warm-up
+if __name__ != "__mp_main__":
+    startup.start_warm_up(HEAVY_MODULES, WARMUP_STEPS, warmup_mode)
+startup.mark("app_imported")
+
 @app.route("/", methods=["GET"])
 def home():
     app.logger.info("Home page accessed")
@@ -67,13 +108,27 @@ def home():
         <body>
             <h1>🚀 Welcome to the HackRX Document QA API</h1>
             <p>Usage: Send a POST request to <code>/api/v1/hackrx/run</code> with Bearer Token and JSON body containing <code>'documents'</code> (array) and <code>'questions'</code>.</p>
+            <p>Add <code>?stream=ndjson</code> or <code>?stream=sse</code> to receive each answer as soon as it is ready.</p>
+            <p>For long documents, POST the same body to <code>/api/v1/hackrx/jobs</code> and poll <code>/api/v1/hackrx/jobs/&lt;job_id&gt;</code> for progress.</p>
         </body>
     </html>
     """
 
-@app.route("/api/v1/hackrx/run", methods=["POST"])
-def hackrx_run():
-    # ✅ Step 1: Token validation
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    """Liveness: answers as soon as the app is imported, with the startup-time report."""
+    return jsonify({"status": "ok", "ready": startup.ready(), "startup": startup.report()})
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    """Readiness: 200 once the warm-up has loaded every dependency, 503 before that."""
+    report = startup.report()
+    if startup.ready():
+        return jsonify({"status": "ready", "warm_up": report["warm_up"]})
+    return jsonify({"status": "warming_up", "warm_up": report["warm_up"]}), 503
+
+def check_auth():
+    """Validate the Bearer token; returns an error response, or None if authorized."""
     auth_header = request.headers.get("Authorization", "")
     if not auth_header.startswith("Bearer "):
         app.logger.warning("Missing or invalid Authorization header")
@@ -83,105 +138,227 @@ def hackrx_run():
     if token != EXPECTED_TOKEN:
         app.logger.warning(f"Unauthorized access attempt with token: {token}")
         return jsonify({"error": "Unauthorized invalid token"}), 403
+    return None
 
-    # ✅ Step 2: Extract payload
+def parse_qa_payload():
+    """Read documents and questions from the request; returns ((doc_paths, questions), None) or (None, error response)."""
     data = request.get_json()
     if not data or "documents" not in data or "questions" not in data:
         app.logger.warning("Invalid request format - missing documents or questions")
-        return jsonify({"error": "Invalid request format. Required: 'documents' and 'questions'."}), 400
+        return None, (jsonify({"error": "Invalid request format. Required: 'documents' and 'questions'."}), 400)
 
     doc_paths = data["documents"]
     if isinstance(doc_paths, str):
         doc_paths = [doc_paths]
     elif not isinstance(doc_paths, list):
         app.logger.warning("Invalid documents format - not a string or list")
-        return jsonify({"error": "'documents' should be a string or a list of strings"}), 400
+        return None, (jsonify({"error": "'documents' should be a string or a list of strings"}), 400)
 
-    questions = data["questions"]
-    app.logger.info(f"Processing {len(doc_paths)} documents and {len(questions)} questions")
+    return (doc_paths, data["questions"]), None
+
+def wants_timings():
+    """Whether the client asked for a per-stage timing breakdown (?timings=1 or X-Include-Timings: 1)."""
+    flag = request.args.get("timings") or request.headers.get("X-Include-Timings", "")
+    return flag.lower() in ("1", "true", "yes")
+
+STREAM_MIMETYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
 
-    all_table_text = []
-    all_fallback_text = []
+def stream_format():
+    """Streaming format the client asked for (?stream=ndjson|sse or a matching Accept header), or None for plain JSON."""
+    requested = request.args.get("stream", "").lower()
+    if requested in STREAM_MIMETYPES:
+        return requested
+    accepted = request.accept_mimetypes
+    for fmt, mimetype in STREAM_MIMETYPES.items():
+        if accepted.best == mimetype:
+            return fmt
+    return None
 
-    for doc_path in doc_paths:
+def stream_job(job, fmt):
+    """
+    Stream a job's progress events as NDJSON lines or server-sent events.
+
+    Errors after the stream has started are reported in-band as an "error" event,
+    since the 200 status has already been sent. A client that disconnects early
+    cancels the job.
+    """
+    def generate():
         try:
-            # ✅ Step 3: Download or use local
-            if doc_path.startswith("http"):
-                app.logger.info(f"Downloading document: {doc_path}")
-                response = requests.get(doc_path)
-                if response.status_code != 200:
-                    app.logger.error(f"Download failed for {doc_path} with status {response.status_code}")
-                    continue
-
-                filename = os.path.basename(urlparse(doc_path).path) or f"file_{int(time.time())}.pdf"
-                safe_filename = f"{int(time.time())}_{filename}"
-                local_path = os.path.join(PDF_STORAGE_DIR, safe_filename)
-
-                with open(local_path, "wb") as f:
-                    f.write(response.content)
-
-                app.logger.info(f"Successfully saved document to: {local_path}")
-            else:
-                app.logger.info(f"Using local file path: {doc_path}")
-                local_path = doc_path
-
-            # ✅ Step 4: Extract content
-            table_text = extract_structured_table_with_fallback(local_path)
-            fallback_text = extract_text_and_urls_fallback(local_path)
-
-            if table_text:
-                all_table_text.append(f"--- Document: {doc_path} ---\n{table_text}")
-            if fallback_text:
-                all_fallback_text.append(f"--- Document: {doc_path} ---\n{fallback_text}")
-
-        except Exception as e:
-            app.logger.error(f"Error processing document {doc_path}: {str(e)}", exc_info=True)
-            continue
+            for event in job.iter_events():
+                data = json.dumps(event, ensure_ascii=False)
+                yield f"event: {event['event']}\ndata: {data}\n\n" if fmt == "sse" else data + "\n"
+        finally:
+            if job.status not in FINISHED:
+                app.logger.info(f"Stream closed early, cancelling job {job.id}")
+                job.cancel()
 
-    if not all_table_text and not all_fallback_text:
-        app.logger.error("Failed to extract content from any document")
-        return jsonify({"error": "❌ Failed to extract content from any document."}), 400
+    return Response(stream_with_context(generate()), mimetype=STREAM_MIMETYPES[fmt],
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-    combined_table_text = "\n\n".join(all_table_text)
-    combined_fallback_text = "\n\n".join(all_fallback_text)
+def queue_full_response():
+    app.logger.warning("Job queue full, rejecting request")
+    return jsonify({"error": "Server busy, retry later"}), 503, {"Retry-After": "5"}
 
-    # ✅ Step 5: Build vector index
+@app.route("/api/v1/hackrx/run", methods=["POST"])
+def hackrx_run():
+    # ✅ Step 1: Token validation
+    auth_error = check_auth()
+    if auth_error:
+        return auth_error
+
+    # ✅ Step 2: Extract payload
+    payload, payload_error = parse_qa_payload()
+    if payload_error:
+        return payload_error
+    doc_paths, questions = payload
+
+    # ✅ Step 3: Run as a job, so all requests share the worker pool (JOB_WORKERS at a time, 503 when the queue is full)
     try:
-        index, chunks, model = build_vector_index(combined_table_text, combined_fallback_text)
-        app.logger.info("Successfully built vector index")
-    except Exception as e:
-        app.logger.error(f"Failed to build vector index: {str(e)}", exc_info=True)
-        return jsonify({"error": "Failed to process documents"}), 500
+        with tracing.request_trace(request.headers.get(tracing.TRACE_HEADER)):
+            job = jobs.submit(doc_paths, questions, wants_timings())
+    except QueueFull:
+        return queue_full_response()
 
-    answers = []
-    for q in questions:
-        app.logger.info(f"Processing question: {q}")
-        try:
-            top_chunks = get_top_chunks(q, index, chunks, model, k=10)
-            app.logger.debug(f"Retrieved {len(top_chunks)} top chunks for question")
+    # ✅ Step 4: Either stream answers as they complete, or wait and return them all as JSON
+    fmt = stream_format()
+    if fmt:
+        return stream_job(job, fmt)
+    job.wait()
+
+    if job.status != "done":
+        return jsonify({"error": job.error or "Request was cancelled"}), job.error_status
+    return jsonify(job.result)
 
-            raw_ans = get_gemini_response(q, top_chunks)
+@app.route("/api/v1/hackrx/jobs", methods=["POST"])
+def hackrx_submit_job():
+    auth_error = check_auth()
+    if auth_error:
+        return auth_error
 
-            if "not specify" in raw_ans.lower() or not raw_ans.strip():
-                app.logger.info("Falling back to full context for question")
-                raw_ans = get_gemini_response(q, [combined_table_text + "\n" + combined_fallback_text])
+    payload, payload_error = parse_qa_payload()
+    if payload_error:
+        return payload_error
+    doc_paths, questions = payload
 
-            cleaned_ans = raw_ans.replace("✅", "").replace("❌", "").replace("₹", "").strip()
-            if not cleaned_ans:
-                cleaned_ans = "The document does not specify this."
+    try:
+        with tracing.request_trace(request.headers.get(tracing.TRACE_HEADER)):
+            job = jobs.submit(doc_paths, questions, wants_timings())
+    except QueueFull:
+        return queue_full_response()
+    return jsonify({"job_id": job.id, "status": job.status, "status_url": f"/api/v1/hackrx/jobs/{job.id}"}), 202
+
+@app.route("/api/v1/hackrx/jobs/<job_id>", methods=["GET"])
+def hackrx_job_status(job_id):
+    auth_error = check_auth()
+    if auth_error:
+        return auth_error
+
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job.to_dict())
+
+@app.route("/api/v1/hackrx/jobs/<job_id>", methods=["DELETE"])
+def hackrx_cancel_job(job_id):
+    auth_error = check_auth()
+    if auth_error:
+        return auth_error
+
+    job = jobs.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify({"job_id": job.id, "status": job.status, "cancel_requested": job.is_cancelled()})
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    # Prometheus text format; counters are per process
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/api/v1/corpus/documents", methods=["GET"])
+def corpus_list_documents():
+    auth_error = check_auth()
+    if auth_error:
+        return auth_error
+    corpus = get_corpus()
+
+    return jsonify({"documents": corpus.list_documents()})
+
+@app.route("/api/v1/corpus/documents", methods=["POST"])
+def corpus_add_documents():
+    auth_error = check_auth()
+    if auth_error:
+        return auth_error
+    corpus = get_corpus()
+
+    data = request.get_json()
+    if not data or not isinstance(data.get("documents"), list):
+        return jsonify({"error": "Invalid request format. Required: 'documents' (list)."}), 400
+
+    added, failed = [], []
+    for result in ingest_documents(data["documents"], fetch_document, index_cache):
+        if result.error or result.index is None:
+            failed.append({"id": result.doc_path, "error": result.error or "No content extracted"})
+            continue
+        chunk_ids = corpus.add_document(
+            result.doc_path, result.chunks, reconstruct_all(result.index), {"source": result.doc_path},
+            [record.provenance() for record in result.chunk_records]
+        )
+        added.append({"id": result.doc_path, "chunks": len(chunk_ids)})
+
+    if added:
+        corpus.save()
+    return jsonify({"added": added, "failed": failed})
+
+@app.route("/api/v1/corpus/documents", methods=["DELETE"])
+def corpus_remove_documents():
+    auth_error = check_auth()
+    if auth_error:
+        return auth_error
+    corpus = get_corpus()
+
+    data = request.get_json()
+    if not data or not isinstance(data.get("documents"), list):
+        return jsonify({"error": "Invalid request format. Required: 'documents' (list of IDs)."}), 400
+
+    removed = [doc_id for doc_id in data["documents"] if corpus.remove_document(doc_id)]
+    if removed:
+        corpus.save()
+    return jsonify({"removed": removed})
+
+@app.route("/api/v1/corpus/query", methods=["POST"])
+def corpus_query():
+    auth_error = check_auth()
+    if auth_error:
+        return auth_error
+    corpus = get_corpus()
+
+    data = request.get_json()
+    if not data or "questions" not in data:
+        return jsonify({"error": "Invalid request format. Required: 'questions'."}), 400
+
+    questions = data["questions"]
+    doc_ids = data.get("documents")  # optional scope
+    if not questions:
+        return jsonify({"answers": [], "sources": []})
+    try:
+        query_vecs = encode_queries(questions, get_embedding_model())
+        hits = corpus.search(query_vecs, k=10, doc_ids=doc_ids)
+    except Exception as e:
+        app.logger.error(f"Corpus search failed: {str(e)}", exc_info=True)
+        return jsonify({"error": "Failed to search corpus"}), 500
 
-            answers.append(cleaned_ans)
-            app.logger.info(f"Answered question: {q}")
+    top_chunks_by_question = {q: [hit["text"] for hit in q_hits] for q, q_hits in zip(questions, hits)}
 
-        except Exception as err:
-            app.logger.error(f"Error answering question {q}: {str(err)}", exc_info=True)
-            answers.append("The document does not specify this.")
+    def answer_question(q):
+        if not top_chunks_by_question[q]:
+            return "The document does not specify this."
+        return clean_answer(get_gemini_response(q, top_chunks_by_question[q]))
 
-    app.logger.info("Successfully processed all questions")
+    with tracing.request_trace(request.headers.get(tracing.TRACE_HEADER)):
+        answers = answer_questions(questions, answer_question)
     return jsonify({
         "answers": answers,
-        "documents_processed": len(doc_paths),
-        "documents_with_content": len(all_table_text) + len(all_fallback_text)
+        "sources": [sorted({hit["doc_id"] for hit in q_hits}) for q_hits in hits],
     })
 
 if __name__ == '__main__':
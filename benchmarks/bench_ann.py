@@ -0,0 +1,127 @@
+"""
+Recall@k, query latency and memory of each vector index type against the exact Flat baseline.
+
+    python -m benchmarks.bench_ann --vectors 100000 --dim 384 --k 10
+    python -m benchmarks.bench_ann --pdf policy.pdf        # embed real policy text instead
+
+Synthetic vectors are drawn around random cluster centres, which is closer to real
+sentence embeddings than uniform noise and gives IVF something to partition.
+"""
+import argparse
+import json
+import time
+from typing import List
+
+import faiss
+import numpy as np
+
+import vectorizer
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype("float32")
+    vectors = centres[rng.integers(0, clusters, n)] + 0.5 * rng.standard_normal((n, dim)).astype("float32")
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def pdf_vectors(pdf_path: str) -> np.ndarray:
+    from document_loader import extract_structured_table_with_fallback, extract_text_and_urls_fallback
+    from model_registry import get_embedding_model
+
+    model = get_embedding_model()
+    records = vectorizer.make_chunks(
+        extract_structured_table_with_fallback(pdf_path), extract_text_and_urls_fallback(pdf_path), model, pdf_path
+    )
+    return vectorizer.embed_chunks([record.text for record in records], model)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def measure(index: faiss.Index, queries: np.ndarray, k: int, truth: np.ndarray) -> dict:
+    start = time.perf_counter()
+    _, batch_ids = index.search(queries, k)
+    batch_seconds = time.perf_counter() - start
+
+    single = queries[: min(200, len(queries))]
+    start = time.perf_counter()
+    for q in single:
+        index.search(q[None, :], k)
+    single_seconds = time.perf_counter() - start
+
+    return {
+        "recall_at_k": round(recall_at_k(batch_ids, truth), 4),
+        "batch_ms_per_query": round(1000 * batch_seconds / len(queries), 4),
+        "single_query_ms": round(1000 * single_seconds / len(single), 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--pdf", help="Embed this PDF's chunks instead of synthetic vectors")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128])
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    if args.pdf:
+        base = pdf_vectors(args.pdf)
+        queries = base[np.random.default_rng(1).integers(0, len(base), args.queries)]
+    else:
+        base = synthetic_vectors(args.vectors, args.dim)
+        queries = synthetic_vectors(args.queries, args.dim, seed=1)
+    k = min(args.k, len(base))
+
+    flat = vectorizer.create_index(base, "flat")
+    _, truth = flat.search(queries, k)
+
+    results: List[dict] = []
+    for kind in vectorizer.INDEX_TYPES:
+        start = time.perf_counter()
+        index = vectorizer.create_index(base, kind)
+        build_seconds = time.perf_counter() - start
+        memory_bytes = faiss.serialize_index(index).nbytes
+
+        if kind.startswith("ivf") and not isinstance(index, faiss.IndexFlat):
+            settings = [("nprobe", value, {"nprobe": value}) for value in args.nprobe]
+        elif kind == "hnsw":
+            settings = [("efSearch", value, {"ef_search": value}) for value in args.ef_search]
+        else:
+            settings = [("-", "-", {})]
+
+        for param, value, tuning in settings:
+            vectorizer.tune_index(index, **tuning)
+            results.append({
+                "index": kind,
+                "built_as": type(index).__name__,
+                "param": param,
+                "value": value,
+                "build_seconds": round(build_seconds, 3),
+                "memory_bytes": memory_bytes,
+                "bytes_per_vector": round(memory_bytes / len(base), 1),
+                **measure(index, queries, k, truth),
+            })
+
+    print(f"\n{len(base)} vectors x {base.shape[1]} dims, {len(queries)} queries, k={k}\n")
+    print(f"{'index':<9} {'param':<9} {'value':>5} {'recall@k':>8} {'batch ms/q':>10} {'single ms':>9} {'MB':>8} {'build s':>8}")
+    for r in results:
+        print(f"{r['index']:<9} {r['param']:<9} {str(r['value']):>5} {r['recall_at_k']:>8.3f} {r['batch_ms_per_query']:>10.4f}"
+              f" {r['single_query_ms']:>9.3f} {r['memory_bytes'] / 1e6:>8.1f} {r['build_seconds']:>8.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"vectors": len(base), "dim": int(base.shape[1]), "k": k, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+LLM calls, prompt tokens and latency per request with questions batched into shared prompts.
+
+    python -m benchmarks.bench_batching                                  # synthetic policy PDF, questions.json
+    python -m benchmarks.bench_batching --pdf policy.pdf --batch-sizes 1 4 8 --llm-latency 0.8
+    python -m benchmarks.bench_batching --malformed 0.3                  # exercise the per-question retry
+
+Every batch size answers the same questions about the same documents through
+qa_service.run_qa with a StubLLM in place of Gemini and the answer cache off.
+Prompt tokens are counted with the embedding model's tokenizer, as the service
+does. Agreement is the share of answers equal to those of batch size 1, i.e. one
+prompt per question.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import List
+
+from benchmarks.stub_llm import StubLLM
+from benchmarks.synthetic_pdf import make_policy_pdf
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", nargs="+", help="Policy PDFs to ask about (default: a synthetic one)")
+    parser.add_argument("--pages", type=int, default=30, help="Pages of the synthetic PDF")
+    parser.add_argument("--questions", default="questions.json")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeats", type=int, default=3, help="Requests per batch size; the median latency is kept")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds per stub LLM call")
+    parser.add_argument("--malformed", type=float, default=0.0, help="Share of batched replies cut short")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_batching_")
+    # Settings are read at import time, so they are fixed before the service is imported
+    os.environ["ANSWER_CACHE_ENABLED"] = "false"
+    os.environ.setdefault("INDEX_CACHE_DIR", os.path.join(workdir, "index_cache"))
+    os.environ.setdefault("EMBEDDING_STORE_DIR", os.path.join(workdir, "embedding_store"))
+
+    import gpt_client
+    import qa_service
+    from context_builder import make_token_counter
+    from model_registry import get_embedding_model
+
+    doc_paths = args.pdf
+    if not doc_paths:
+        doc_paths = [make_policy_pdf(os.path.join(workdir, "policy.pdf"), pages=args.pages)]
+    with open(args.questions, encoding="utf-8") as f:
+        questions = json.load(f)
+
+    model = get_embedding_model()
+    llm = StubLLM(args.llm_latency, malformed=args.malformed,
+                  count_tokens=make_token_counter(getattr(model, "tokenizer", None)))
+    gpt_client.set_model(llm)
+    qa_service.run_qa(doc_paths, questions, batch_size=1)  # fills the index cache
+
+    results: List[dict] = []
+    reference = None
+    for batch_size in args.batch_sizes:
+        before = llm.stats()
+        seconds = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            answers = qa_service.run_qa(doc_paths, questions, batch_size=batch_size)["answers"]
+            seconds.append(time.perf_counter() - start)
+        after = llm.stats()
+        reference = reference or answers
+        delta = {key: (after[key] - before[key]) / args.repeats for key in after}
+        results.append({
+            "batch_size": batch_size,
+            "llm_calls": delta["calls"],
+            "batched_calls": delta["batched_calls"],
+            "prompt_tokens": delta["prompt_tokens"],
+            "prompt_chars": delta["prompt_chars"],
+            "latency_seconds": round(sorted(seconds)[len(seconds) // 2], 3),
+            "agreement": round(sum(a == b for a, b in zip(answers, reference)) / len(questions), 3),
+        })
+
+    base = results[0]
+    print(f"\n{len(questions)} questions, {len(doc_paths)} documents, {args.repeats} requests per batch size\n")
+    print(f"{'batch':>5} {'calls':>6} {'batched':>7} {'tokens':>8} {'vs first':>8} {'latency s':>9} {'agree':>6}")
+    for r in results:
+        saving = f"{100 * (r['prompt_tokens'] - base['prompt_tokens']) / base['prompt_tokens']:+.1f}%" \
+            if base["prompt_tokens"] else "n/a"
+        print(f"{r['batch_size']:>5} {r['llm_calls']:>6.1f} {r['batched_calls']:>7.1f} {r['prompt_tokens']:>8.0f}"
+              f" {saving:>8} {r['latency_seconds']:>9.2f} {r['agreement']:>6.3f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"questions": len(questions), "documents": doc_paths, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
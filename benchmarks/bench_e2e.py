@@ -0,0 +1,246 @@
+"""
+End-to-end latency, throughput and memory of /api/v1/hackrx/run with synthetic PDFs and a stub LLM.
+
+    python -m benchmarks.bench_e2e                                   # cold caches, 1/2/4/8 concurrent requests
+    python -m benchmarks.bench_e2e --pages 10 60 --table-rows 10 40 --llm-latency 0.8 --json e2e.json
+    python -m benchmarks.bench_e2e --mode warm --compare e2e.json    # compare against an earlier run
+
+Each request asks questions.json about one synthetic policy PDF per --pages value.
+Requests go through the Flask app in-process, so the job queue, pipeline, retrieval and
+LLM pool run exactly as in production. gpt_client gets a deterministic StubLLM in place
+of Gemini.
+
+In "cold" mode every request gets freshly generated PDFs, and the embedding store and
+answer cache are off, so each request pays for extraction, chunking and encoding.
+In "warm" mode every request reuses the same PDFs with all caches on.
+
+Per-stage seconds come from the request's own ?timings=1 breakdown. They are summed
+over the threads that worked on the request, so llm can exceed the total. Peak RSS
+is reported for this process and, once they exit, its extraction worker processes.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.stub_llm import StubLLM
+from benchmarks.synthetic_pdf import make_policy_pdf
+
+API_TOKEN = "bench"
+
+
+def percentiles(values: List[float]) -> dict:
+    if not values:
+        return {}
+    return {
+        "mean": round(float(np.mean(values)), 4),
+        "p50": round(float(np.percentile(values, 50)), 4),
+        "p90": round(float(np.percentile(values, 90)), 4),
+        "p99": round(float(np.percentile(values, 99)), 4),
+    }
+
+
+def peak_rss_bytes() -> Dict[str, int]:
+    """Peak resident set size of this process and of its largest child that has exited (ru_maxrss is KiB on Linux)."""
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def settings() -> dict:
+    """Settings that change what is being measured, for comparing runs."""
+    import model_registry
+    import retriever
+    import vectorizer
+
+    return {
+        "embedding_model": model_registry.EMBEDDING_MODEL_NAME,
+        "embedding_backend": model_registry.EMBEDDING_BACKEND,
+        "index_type": vectorizer.INDEX_TYPE,
+        "embedding_storage": vectorizer.EMBEDDING_STORAGE,
+        "chunk_tokens": vectorizer.CHUNK_TOKENS,
+        "retrieval_mode": retriever.RETRIEVAL_MODE,
+    }
+
+
+class DocumentFactory:
+    """Synthetic policy PDFs: a fresh set per request in cold mode, one shared set in warm mode."""
+
+    def __init__(self, directory: str, pages: List[int], table_rows: List[int], fresh: bool):
+        self.directory = directory
+        self.specs = [(p, table_rows[i % len(table_rows)]) for i, p in enumerate(pages)]
+        self.fresh = fresh
+        self._shared: Optional[List[str]] = None
+
+    def _make(self, seed: int) -> List[str]:
+        paths = []
+        for pages, rows in self.specs:
+            path = os.path.join(self.directory, f"policy-{pages}p-{rows}r-{seed}.pdf")
+            paths.append(make_policy_pdf(path, pages=pages, table_rows=rows, seed=seed))
+        return paths
+
+    def prepare(self, count: int, first_seed: int) -> List[List[str]]:
+        """Document lists for `count` requests, generated before timing starts."""
+        if not self.fresh:
+            if self._shared is None:
+                self._shared = self._make(0)
+            return [self._shared] * count
+        return [self._make(first_seed + i) for i in range(count)]
+
+
+def run_level(client, documents: List[List[str]], questions: List[str], concurrency: int) -> dict:
+    def one(doc_paths: List[str]) -> dict:
+        start = time.perf_counter()
+        response = client.post("/api/v1/hackrx/run?timings=1", json={"documents": doc_paths, "questions": questions},
+                               headers={"Authorization": f"Bearer {API_TOKEN}"})
+        body = response.get_json(silent=True) or {}
+        return {"status": response.status_code, "seconds": time.perf_counter() - start,
+                "timings": body.get("timings", {})}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, documents))
+    wall = time.perf_counter() - start
+
+    ok = [o for o in outcomes if o["status"] == 200]
+    stages: Dict[str, List[float]] = {}
+    for outcome in ok:
+        for stage, seconds in outcome["timings"].get("stage_seconds", {}).items():
+            stages.setdefault(stage, []).append(seconds)
+    return {
+        "concurrency": concurrency,
+        "requests": len(outcomes),
+        "errors": len(outcomes) - len(ok),
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(ok) / wall, 4) if wall else None,
+        "questions_per_second": round(len(ok) * len(questions) / wall, 4) if wall else None,
+        "latency_seconds": percentiles([o["seconds"] for o in ok]),
+        "stage_seconds": {stage: percentiles(values) for stage, values in sorted(stages.items())},
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def compare(results: dict, baseline_path: str) -> None:
+    """Print the relative change of latency, throughput and stage means against an earlier run."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    before = {level["concurrency"]: level for level in baseline["levels"]}
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('meta', {}).get('commit')}):")
+
+    def change(new, old) -> str:
+        return f"{100 * (new - old) / old:+.1f}%" if old else "n/a"
+
+    for level in results["levels"]:
+        old = before.get(level["concurrency"])
+        if old is None or not level["latency_seconds"] or not old["latency_seconds"]:
+            continue
+        line = (f"  c={level['concurrency']}: p50 {change(level['latency_seconds']['p50'], old['latency_seconds']['p50'])},"
+                f" throughput {change(level['throughput_rps'], old['throughput_rps'])}")
+        stage_changes = [
+            f"{stage} {change(stats['mean'], old['stage_seconds'][stage]['mean'])}"
+            for stage, stats in level["stage_seconds"].items() if stage in old["stage_seconds"]
+        ]
+        print(line + ("; " + ", ".join(stage_changes) if stage_changes else ""))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[20], help="One PDF of each size per request")
+    parser.add_argument("--table-rows", type=int, nargs="+", default=[25], help="Rows per table, cycled over --pages")
+    parser.add_argument("--questions", default="questions.json")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=0, help="Requests per level (default 2 x concurrency, at least 4)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds per stub LLM call")
+    parser.add_argument("--llm-jitter", type=float, default=0.2, help="Up to this many extra seconds per call")
+    parser.add_argument("--mode", choices=["cold", "warm"], default="cold")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--compare", help="Earlier --json output to compare against")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_e2e_")
+    # Settings are read at import time, so they are fixed before the app is imported
+    os.environ["API_TOKEN"] = API_TOKEN
+    os.environ["STARTUP_WARMUP"] = "blocking"
+    os.environ.setdefault("PDF_STORAGE_DIR", os.path.join(workdir, "pdfs"))
+    os.environ.setdefault("INDEX_CACHE_DIR", os.path.join(workdir, "index_cache"))
+    os.environ.setdefault("EMBEDDING_STORE_DIR", os.path.join(workdir, "embedding_store"))
+    os.environ.setdefault("CORPUS_DIR", os.path.join(workdir, "corpus"))
+    if args.mode == "cold":
+        os.environ["EMBEDDING_STORE_ENABLED"] = "false"
+        os.environ["ANSWER_CACHE_ENABLED"] = "false"
+
+    with open(args.questions, encoding="utf-8") as f:
+        questions = json.load(f)
+
+    import gpt_client
+
+    llm = StubLLM(args.llm_latency, args.llm_jitter)
+    gpt_client.set_model(llm)
+    start = time.perf_counter()
+    import app as app_module
+    import startup
+    app_import_seconds = time.perf_counter() - start
+    client = app_module.app.test_client()
+
+    factory = DocumentFactory(os.path.join(workdir, "docs"), args.pages, args.table_rows, fresh=args.mode == "cold")
+    os.makedirs(factory.directory, exist_ok=True)
+    # One untimed request loads everything left and, in warm mode, fills the caches
+    run_level(client, factory.prepare(1, first_seed=10_000), questions, 1)
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+            "settings": settings(),
+            "app_import_seconds": round(app_import_seconds, 3),
+            "startup": startup.report(),
+        },
+        "levels": [],
+    }
+    seed = 0
+    for concurrency in args.concurrency:
+        count = args.requests or max(4, 2 * concurrency)
+        documents = factory.prepare(count, first_seed=seed)
+        seed += count
+        calls_before = llm.stats()["calls"]
+        level = run_level(client, documents, questions, concurrency)
+        level["llm_calls"] = llm.stats()["calls"] - calls_before
+        results["levels"].append(level)
+
+        latency = level["latency_seconds"]
+        print(f"c={concurrency:<3} {level['requests']} requests ({level['errors']} failed): "
+              f"{level['throughput_rps']:.3f} req/s, p50 {latency.get('p50', float('nan')):.2f}s, "
+              f"p90 {latency.get('p90', float('nan')):.2f}s, peak RSS {level['peak_rss_bytes']['self'] / 1e6:.0f} MB")
+        print("       " + ", ".join(f"{stage} {stats['mean']:.3f}s" for stage, stats in level["stage_seconds"].items()))
+
+    results["llm"] = llm.stats()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
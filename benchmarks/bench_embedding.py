@@ -0,0 +1,105 @@
+"""
+Encoding throughput and agreement with the reference PyTorch model for each embedding backend.
+
+    python -m benchmarks.bench_embedding                          # synthetic policy PDF
+    python -m benchmarks.bench_embedding --pdf policy.pdf --backends torch torch_int8 onnx --threads 1 2 4
+
+Every backend encodes the same chunks. Agreement is the cosine similarity of each
+chunk's vector with the reference (`torch`) vector, and the overlap of each
+question's top-k chunks. Backends whose optional dependencies are missing are
+reported and skipped.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+
+import vectorizer
+from benchmarks.bench_retrieval import load_chunks
+from benchmarks.synthetic_pdf import make_policy_pdf
+from model_registry import EMBEDDING_BACKENDS, EMBEDDING_DEVICE, EMBEDDING_MODEL_NAME, get_embedding_model
+
+
+def encode(model, texts: List[str], batch_size: int) -> np.ndarray:
+    return np.asarray(model.encode(texts, batch_size=batch_size, convert_to_numpy=True,
+                                   normalize_embeddings=True, show_progress_bar=False), dtype="float32")
+
+
+def top_k(chunk_vecs: np.ndarray, query_vecs: np.ndarray, k: int) -> np.ndarray:
+    return np.argsort(-(query_vecs @ chunk_vecs.T), axis=1, kind="stable")[:, :k]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="Policy PDF to chunk (default: a synthetic one)")
+    parser.add_argument("--pages", type=int, default=50, help="Pages of the synthetic PDF")
+    parser.add_argument("--questions", default="questions.json")
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--backends", nargs="+", default=list(EMBEDDING_BACKENDS))
+    parser.add_argument("--threads", type=int, nargs="+", default=[0], help="Intra-op threads, 0 = library default")
+    parser.add_argument("--batch-size", type=int, default=vectorizer.ENCODE_BATCH_SIZE)
+    parser.add_argument("--repeats", type=int, default=3, help="Timed encodes of all chunks; the best is kept")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    pdf_path = args.pdf
+    if not pdf_path:
+        pdf_path = os.path.join(tempfile.mkdtemp(), "policy.pdf")
+        make_policy_pdf(pdf_path, pages=args.pages)
+    with open(args.questions, encoding="utf-8") as f:
+        questions = json.load(f)
+
+    reference_model = get_embedding_model(args.model, EMBEDDING_DEVICE, "torch")
+    chunks = load_chunks(pdf_path, reference_model)
+    reference = encode(reference_model, chunks, args.batch_size)
+    k = min(args.k, len(chunks))
+    reference_top = top_k(reference, encode(reference_model, questions, args.batch_size), k)
+
+    results: List[dict] = []
+    for backend in args.backends:
+        for threads in args.threads:
+            try:
+                start = time.perf_counter()
+                model = EMBEDDING_BACKENDS[backend](args.model, EMBEDDING_DEVICE, threads)
+                load_seconds = time.perf_counter() - start
+            except (ImportError, ValueError, OSError) as e:
+                print(f"{backend}: skipped ({e})")
+                break
+
+            encode(model, chunks[:args.batch_size], args.batch_size)  # warm-up
+            seconds = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                vecs = encode(model, chunks, args.batch_size)
+                seconds.append(time.perf_counter() - start)
+
+            cosine = (vecs * reference).sum(axis=1)
+            top = top_k(vecs, encode(model, questions, args.batch_size), k)
+            results.append({
+                "backend": backend,
+                "threads": threads,
+                "load_seconds": round(load_seconds, 3),
+                "chunks_per_second": round(len(chunks) / min(seconds), 1),
+                "mean_cosine": round(float(cosine.mean()), 6),
+                "min_cosine": round(float(cosine.min()), 6),
+                "top_k_overlap": round(float(np.mean([len(set(a) & set(b)) / k for a, b in zip(top, reference_top)])), 4),
+            })
+
+    print(f"\n{len(chunks)} chunks, {len(questions)} questions, model {args.model}, batch size {args.batch_size}\n")
+    print(f"{'backend':<11} {'threads':>7} {'chunks/s':>9} {'mean cos':>9} {'min cos':>9} {'top-k':>6} {'load s':>7}")
+    for r in results:
+        print(f"{r['backend']:<11} {r['threads']:>7} {r['chunks_per_second']:>9.1f} {r['mean_cosine']:>9.6f}"
+              f" {r['min_cosine']:>9.6f} {r['top_k_overlap']:>6.3f} {r['load_seconds']:>7.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"model": args.model, "chunks": len(chunks), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
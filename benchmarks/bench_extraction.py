@@ -0,0 +1,60 @@
+"""
+Wall-clock scaling of page-sharded PDF extraction with the number of worker processes.
+camelot reads every page; see bench_table_detection for the table page pre-pass.
+
+    python -m benchmarks.bench_extraction --pages 120 --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic_pdf import make_policy_pdf
+from document_loader import extract_structured_table_with_fallback, extract_text_and_urls_fallback
+
+
+def _time(fn, *args, repeat: int = 1) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=120)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = make_policy_pdf(os.path.join(tmp, "policy.pdf"), pages=args.pages)
+
+        results = []
+        for workers in sorted(set(args.workers)):
+            # Warm the pool so process start-up isn't counted against the first shard
+            extract_text_and_urls_fallback(pdf_path, workers=workers)
+            results.append({
+                "workers": workers,
+                "camelot_seconds": _time(extract_structured_table_with_fallback, pdf_path, workers, "off",
+                                         repeat=args.repeat),
+                "fitz_seconds": _time(extract_text_and_urls_fallback, pdf_path, workers, repeat=args.repeat),
+            })
+
+    base = results[0]
+    print(f"\n{'workers':>7} {'camelot s':>10} {'speedup':>8} {'fitz s':>8} {'speedup':>8}")
+    for r in results:
+        print(f"{r['workers']:>7} {r['camelot_seconds']:>10.2f} {base['camelot_seconds'] / r['camelot_seconds']:>7.2f}x"
+              f" {r['fitz_seconds']:>8.3f} {base['fitz_seconds'] / r['fitz_seconds']:>7.2f}x")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"pages": args.pages, "cpu_count": os.cpu_count(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Retrieval quality and query latency of dense, BM25 and hybrid (RRF) retrieval.
+
+    python -m benchmarks.bench_retrieval                      # synthetic policy PDF, questions.json
+    python -m benchmarks.bench_retrieval --pdf policy.pdf --questions questions.json
+
+There are no labelled answers, so relevance is judged from the question itself:
+a chunk is relevant when it names the question's treatment with, if the
+question gives a sum insured, the matching tier label (e.g. "3L/4L/5L" for a
+5L policy) on the same table row. hit@k is then the share of questions whose
+first k chunks contain a relevant one, i.e. that the first escalation stage
+can answer.
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+from typing import List, Optional
+
+import numpy as np
+
+import vectorizer
+from lexical_index import LexicalIndex, tokenize
+from retriever import encode_queries, search_batch, RETRIEVAL_MODES
+from benchmarks.synthetic_pdf import make_policy_pdf
+
+GENERIC_TERMS = {"surgery", "treatment", "policy", "for"}
+
+
+def tier_for(question: str) -> Optional[str]:
+    match = re.search(r"(\d+(?:\.\d+)?)\s*[Ll]\b", question)
+    if not match:
+        return None
+    lakhs = float(match.group(1))
+    if lakhs <= 5:
+        return "3l/4l/5l"
+    if lakhs <= 20:
+        return "10l/15l/20l"
+    return ">20l"
+
+
+def treatment_terms(question: str) -> List[str]:
+    """Distinctive words of the treatment field ("34F, cataract surgery, Mumbai, 5L policy" -> cataract)."""
+    fields = [f.strip() for f in question.split(",")]
+    field = fields[1] if len(fields) > 1 else question
+    return [t for t in tokenize(field) if t not in GENERIC_TERMS and not t.isdigit()]
+
+
+def is_relevant(chunk: str, terms: List[str], tier: Optional[str]) -> bool:
+    # PyMuPDF text puts each table cell on its own line, so look at the next few lines too
+    lines = chunk.lower().splitlines()
+    for pos, line in enumerate(lines):
+        if any(term in line for term in terms) and (tier is None or tier in " ".join(lines[pos:pos + 3])):
+            return True
+    return False
+
+
+def load_chunks(pdf_path: str, model) -> List[str]:
+    from document_loader import extract_structured_table_with_fallback, extract_text_and_urls_fallback
+
+    records = vectorizer.make_chunks(
+        extract_structured_table_with_fallback(pdf_path), extract_text_and_urls_fallback(pdf_path), model, pdf_path
+    )
+    return [record.text for record in records]
+
+
+def quality(ids: np.ndarray, relevant: List[set], ks: List[int]) -> dict:
+    result = {}
+    for k in ks:
+        result[f"hit_at_{k}"] = round(np.mean([bool(set(row[:k]) & rel) for row, rel in zip(ids, relevant)]), 4)
+        result[f"precision_at_{k}"] = round(np.mean([len(set(row[:k]) & rel) / k for row, rel in zip(ids, relevant)]), 4)
+    reciprocal_ranks = []
+    for row, rel in zip(ids, relevant):
+        ranks = [rank for rank, i in enumerate(row) if i in rel]
+        reciprocal_ranks.append(1.0 / (ranks[0] + 1) if ranks else 0.0)
+    result["mrr"] = round(float(np.mean(reciprocal_ranks)), 4)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="Policy PDF to index (default: a synthetic one)")
+    parser.add_argument("--pages", type=int, default=50, help="Pages of the synthetic PDF")
+    parser.add_argument("--questions", default="questions.json")
+    parser.add_argument("--k", type=int, nargs="+", default=[5, 10, 30])
+    parser.add_argument("--repeats", type=int, default=50, help="Timed repetitions of the query batch")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    with open(args.questions, encoding="utf-8") as f:
+        questions = json.load(f)
+
+    pdf_path = args.pdf
+    if not pdf_path:
+        pdf_path = os.path.join(tempfile.mkdtemp(), "policy.pdf")
+        make_policy_pdf(pdf_path, pages=args.pages)
+
+    from model_registry import get_embedding_model
+    model = get_embedding_model()
+    chunks = load_chunks(pdf_path, model)
+    index = vectorizer.create_index(vectorizer.embed_chunks(chunks, model))
+
+    start = time.perf_counter()
+    lexical_index = LexicalIndex.build(chunks)
+    build_ms = 1000 * (time.perf_counter() - start)
+
+    relevant = []
+    for q in questions:
+        terms, tier = treatment_terms(q), tier_for(q)
+        relevant.append({i for i, chunk in enumerate(chunks) if is_relevant(chunk, terms, tier)})
+    answerable = sum(1 for rel in relevant if rel)
+    print(f"{len(chunks)} chunks, {len(lexical_index.terms)} terms (BM25 build {build_ms:.1f} ms), "
+          f"{answerable}/{len(questions)} questions with a relevant chunk")
+
+    query_vecs = encode_queries(questions, model)
+    depth = max(args.k)
+    results = {"chunks": len(chunks), "questions": len(questions), "answerable": answerable,
+               "bm25_build_ms": round(build_ms, 2), "modes": {}}
+    for mode in RETRIEVAL_MODES:
+        _, ids = search_batch(questions, index, model, depth, query_vecs, lexical_index, mode)
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            search_batch(questions, index, model, depth, query_vecs, lexical_index, mode)
+        ms_per_query = 1000 * (time.perf_counter() - start) / (args.repeats * len(questions))
+
+        row = quality(ids, relevant, args.k)
+        row["ms_per_query"] = round(ms_per_query, 4)
+        results["modes"][mode] = row
+        print(f"{mode:>8}: " + ", ".join(f"{name}={value}" for name, value in row.items()))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Memory per vector, search latency and top-k agreement of float16 and int8 embedding
+storage against float32, on embedded policy text.
+
+    python -m benchmarks.bench_storage                        # synthetic policy PDF, questions.json
+    python -m benchmarks.bench_storage --pdf policy.pdf --index flat hnsw
+    python -m benchmarks.bench_storage --replicate 200        # ~200x the vectors, for latency at corpus scale
+
+Queries are the questions plus a sample of the chunks themselves. A policy yields
+only a few hundred chunks, so `--replicate` adds jittered copies of them to
+measure latency at corpus scale; overlap is then still against float32 on the
+same vectors. Policies repeat boilerplate, so many chunks tie: an overlap below
+1 with a score error near 0 means tied chunks were reordered, not lost.
+"""
+import argparse
+import json
+import os
+import tempfile
+from typing import List
+
+import faiss
+import numpy as np
+
+import vectorizer
+from benchmarks.bench_ann import measure
+from benchmarks.bench_retrieval import load_chunks
+from benchmarks.synthetic_pdf import make_policy_pdf
+from retriever import encode_queries
+
+
+def replicate(base: np.ndarray, copies: int, noise: float = 0.3, seed: int = 0) -> np.ndarray:
+    """`base` followed by `copies - 1` copies jittered by about `noise` in norm, re-normalized."""
+    if copies <= 1:
+        return base
+    rng = np.random.default_rng(seed)
+    extra = np.repeat(base, copies - 1, axis=0)
+    extra += noise * rng.standard_normal(extra.shape).astype("float32") / np.sqrt(base.shape[1])
+    vectors = np.ascontiguousarray(np.vstack([base, extra]), dtype="float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def score_error(index: faiss.Index, reference: faiss.Index, queries: np.ndarray, k: int) -> float:
+    """Mean absolute difference of the top-k similarity scores against `reference`."""
+    scores, _ = index.search(queries, k)
+    reference_scores, _ = reference.search(queries, k)
+    return float(np.abs(scores - reference_scores).mean())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="Policy PDF to embed (default: a synthetic one)")
+    parser.add_argument("--pages", type=int, default=50, help="Pages of the synthetic PDF")
+    parser.add_argument("--questions", default="questions.json")
+    parser.add_argument("--queries", type=int, default=500, help="Chunks sampled as extra queries")
+    parser.add_argument("--replicate", type=int, default=1, help="Copies of the chunk vectors to index")
+    parser.add_argument("--index", nargs="+", default=["flat"], choices=vectorizer.INDEX_TYPES)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    pdf_path = args.pdf
+    if not pdf_path:
+        pdf_path = os.path.join(tempfile.mkdtemp(), "policy.pdf")
+        make_policy_pdf(pdf_path, pages=args.pages)
+
+    from model_registry import get_embedding_model
+    model = get_embedding_model()
+    chunk_vecs = vectorizer.embed_chunks(load_chunks(pdf_path, model), model)
+    base = replicate(chunk_vecs, args.replicate)
+
+    with open(args.questions, encoding="utf-8") as f:
+        questions = json.load(f)
+    sample = chunk_vecs[np.random.default_rng(1).integers(0, len(chunk_vecs), args.queries)]
+    queries = np.ascontiguousarray(np.vstack([encode_queries(questions, model), sample]), dtype="float32")
+    k = min(args.k, len(base))
+
+    results: List[dict] = []
+    for kind in args.index:
+        reference = vectorizer.create_index(base, kind, "float32")
+        _, truth = reference.search(queries, k)
+        for storage in vectorizer.EMBEDDING_STORAGE_TYPES:
+            index = reference if storage == "float32" else vectorizer.create_index(base, kind, storage)
+            memory_bytes = faiss.serialize_index(index).nbytes
+            row = measure(index, queries, k, truth)
+            results.append({
+                "index": kind,
+                "storage": storage,
+                "built_as": type(index).__name__,
+                "memory_bytes": memory_bytes,
+                "bytes_per_vector": round(memory_bytes / len(base), 1),
+                "top_k_overlap": row.pop("recall_at_k"),
+                "score_error": round(score_error(index, reference, queries, k), 5),
+                **row,
+            })
+
+    print(f"\n{len(base)} vectors x {base.shape[1]} dims ({len(chunk_vecs)} chunks), {len(queries)} queries, k={k}\n")
+    print(f"{'index':<9} {'storage':<8} {'B/vector':>9} {'overlap':>8} {'score err':>9} {'batch ms/q':>10} {'single ms':>9}")
+    for r in results:
+        print(f"{r['index']:<9} {r['storage']:<8} {r['bytes_per_vector']:>9.1f} {r['top_k_overlap']:>8.3f}"
+              f" {r['score_error']:>9.5f} {r['batch_ms_per_query']:>10.4f} {r['single_query_ms']:>9.3f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"vectors": len(base), "chunks": len(chunk_vecs), "dim": int(base.shape[1]), "k": k,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Pages skipped, time saved and output agreement of the table page pre-pass against a full camelot run.
+
+    python -m benchmarks.bench_table_detection                       # synthetic PDFs, tables every 5th and 20th page
+    python -m benchmarks.bench_table_detection --pdf policy.pdf other.pdf --workers 4
+
+Each PDF is extracted twice with document_loader.compare_table_extraction: once
+with camelot over every page, once over the detected pages only. Rows are the
+formatted sub-limit rows; any row found by only one run is listed. For synthetic
+PDFs the detected pages are also checked against the pages that hold tables.
+"""
+import argparse
+import json
+import os
+import tempfile
+from typing import List
+
+from benchmarks.synthetic_pdf import make_policy_pdf, table_pages
+from document_loader import EXTRACT_WORKERS, compare_table_extraction
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", nargs="+", help="PDFs to compare on (default: synthetic ones)")
+    parser.add_argument("--pages", type=int, default=60, help="Pages of each synthetic PDF")
+    parser.add_argument("--table-every", type=int, nargs="+", default=[5, 20], help="One synthetic PDF per value")
+    parser.add_argument("--workers", type=int, default=EXTRACT_WORKERS)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    documents = []  # (path, true table pages or None)
+    if args.pdf:
+        documents = [(path, None) for path in args.pdf]
+    else:
+        tmp = tempfile.mkdtemp(prefix="bench_table_detection_")
+        for every in args.table_every:
+            path = make_policy_pdf(os.path.join(tmp, f"policy-every{every}.pdf"), pages=args.pages, table_every=every)
+            documents.append((path, table_pages(args.pages, every)))
+
+    results: List[dict] = []
+    for path, truth in documents:
+        comparison = compare_table_extraction(path, args.workers)
+        row = {k: v for k, v in comparison.items() if not k.endswith("_output")}
+        row["path"] = path
+        row["identical"] = comparison["full_output"] == comparison["detected_output"]
+        if truth is not None:
+            skipped = set(comparison["skipped_pages"])
+            row["missed_table_pages"] = [p for p in truth if p in skipped]
+        results.append(row)
+
+    print(f"\n{'document':<28} {'pages':>5} {'skipped':>7} {'full s':>7} {'detect s':>8} {'camelot s':>9}"
+          f" {'saved':>7} {'identical':>9}")
+    for r in results:
+        saved = f"{100 * r['saved_seconds'] / r['full_seconds']:.0f}%" if r["full_seconds"] else "n/a"
+        print(f"{os.path.basename(r['path'])[:28]:<28} {r['pages']:>5} {len(r['skipped_pages']):>7}"
+              f" {r['full_seconds']:>7.2f} {r['detect_seconds']:>8.3f} {r['detected_seconds']:>9.2f}"
+              f" {saved:>7} {str(r['identical']):>9}")
+        missed = r.get("missed_table_pages")
+        if missed:
+            print(f"    missed table pages: {missed}")
+        for label in ("only_full", "only_detected"):
+            for line in r[label][:5]:
+                print(f"    {label}: {line}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"workers": args.workers, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
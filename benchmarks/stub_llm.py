@@ -0,0 +1,82 @@
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from typing import Callable, Dict, Optional
+
+_AMOUNT_RE = re.compile(r"\d{1,3}(?:,\d{2,3})+")
+_BATCH_QUESTION_RE = re.compile(r"^(\d+)\. \(Sum Insured: [^)]*\) (.*)$", re.MULTILINE)
+_NOT_SPECIFIED = "❌ The document does not specify this."
+
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubLLM:
+    """
+    Deterministic local stand-in for the Gemini model (see gpt_client.set_model).
+
+    Each call sleeps `latency` seconds plus up to `jitter` more, derived from the
+    prompt so repeated runs sleep the same. A question is answered with the amount
+    on the first excerpt line naming one of its words, or else the first amount in
+    the excerpts. Batched prompts (gpt_client.build_batch_prompt) get a JSON reply,
+    of which a `malformed` fraction is cut short. Calls, prompt characters and, with
+    `count_tokens`, prompt tokens are counted.
+    """
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.0, malformed: float = 0.0,
+                 count_tokens: Optional[Callable[[str], int]] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.malformed = malformed
+        self.count_tokens = count_tokens
+        self.calls = 0
+        self.batched_calls = 0
+        self.prompt_chars = 0
+        self.prompt_tokens = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _answer_one(question: str, excerpts: str) -> str:
+        words = [w for w in re.findall(r"[a-z]+", question.lower()) if len(w) > 4]
+        lines = [line for line in excerpts.splitlines() if _AMOUNT_RE.search(line)]
+        for line in lines:
+            if any(w in line.lower() for w in words):
+                return f"✅ Yes, it is covered, up to ₹{_AMOUNT_RE.search(line).group()}."
+        if lines:
+            return f"✅ Yes, it is covered, up to ₹{_AMOUNT_RE.search(lines[0]).group()}."
+        return _NOT_SPECIFIED
+
+    def answer(self, prompt: str) -> str:
+        head, _, excerpts = prompt.partition("### Document Excerpts:")
+        if "### Questions:" in head:
+            answers = [{"id": int(n), "answer": self._answer_one(q, excerpts)}
+                       for n, q in _BATCH_QUESTION_RE.findall(head)]
+            return json.dumps({"answers": answers}, ensure_ascii=False)
+        question = head.partition("### Question:")[2]
+        return self._answer_one(question, excerpts)
+
+    def generate_content(self, prompt: str, request_options: Optional[dict] = None,
+                         generation_config: Optional[dict] = None) -> _Response:
+        tokens = self.count_tokens(prompt) if self.count_tokens else 0
+        rng = random.Random(zlib.crc32(prompt.encode("utf-8")))
+        batched = "### Questions:" in prompt
+        with self._lock:
+            self.calls += 1
+            self.batched_calls += batched
+            self.prompt_chars += len(prompt)
+            self.prompt_tokens += tokens
+        time.sleep(self.latency + self.jitter * rng.random())
+        text = self.answer(prompt)
+        if batched and rng.random() < self.malformed:
+            text = text[:len(text) // 2]
+        return _Response(text)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "batched_calls": self.batched_calls,
+                    "prompt_chars": self.prompt_chars, "prompt_tokens": self.prompt_tokens}
@@ -0,0 +1,76 @@
+import random
+from typing import List
+
+import fitz  # PyMuPDF
+
+TREATMENTS = [
+    "Cataract Surgery", "Robotic Surgery", "Chemotherapy", "Hip Replacement",
+    "Knee Replacement", "Ayurvedic Treatment", "Dialysis", "Bariatric Surgery",
+    "Angioplasty", "Organ Donor Expenses", "Modern Treatment Methods", "Maternity Cover",
+]
+
+PROSE = (
+    "The Company shall indemnify the Insured Person for Medical Expenses incurred for "
+    "Hospitalisation during the Policy Period, subject to the terms, conditions and "
+    "exclusions of this Policy and the Sum Insured shown in the Schedule. "
+    "Claims must be intimated within 48 hours of admission. See https://example.com/claims "
+    "for the list of network hospitals. "
+)
+
+
+def _prose_page(page: fitz.Page, page_no: int, rng: random.Random) -> None:
+    text = f"{page_no}.1 General Conditions\n\n" + PROSE * rng.randint(6, 10)
+    page.insert_textbox(fitz.Rect(50, 50, 545, 790), text, fontsize=10)
+
+
+def _table_page(page: fitz.Page, page_no: int, rows: int, rng: random.Random) -> None:
+    # Imported here, not at module level: benchmarks set the service's env settings after importing this module
+    from document_loader import TIER_AMOUNTS  # amounts detect_tier_from_amounts maps to each tier
+
+    page.insert_text((50, 50), f"{page_no}.1 Schedule of Sub-limits", fontsize=12)
+    columns = [50, 250, 350, 450]
+    y = 80
+    for header, x in zip(["Treatment", "Tier", "Limit (Rs.)", "Co-pay"], columns):
+        page.insert_text((x, y), header, fontsize=10)
+    page.draw_line((45, y + 5), (550, y + 5))
+    for _ in range(rows):
+        y += 18
+        if y > 780:
+            break
+        tier, amounts = rng.choice(TIER_AMOUNTS)
+        cells = [rng.choice(TREATMENTS), tier, f"{rng.choice(amounts):,}", f"{rng.choice([0, 10, 20])}%"]
+        for cell, x in zip(cells, columns):
+            page.insert_text((x, y), cell, fontsize=9)
+
+
+def make_policy_pdf(path: str, pages: int = 50, table_every: int = 5, table_rows: int = 25,
+                    seed: int = 0) -> str:
+    """
+    Write a synthetic multi-page policy PDF with prose pages and sub-limit tables.
+
+    Args:
+        path: Output PDF path
+        pages: Number of pages
+        table_every: Every n-th page holds a table instead of prose
+        table_rows: Rows per table
+        seed: Random seed, so the same arguments always produce the same file
+
+    Returns:
+        The output path
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_no in range(1, pages + 1):
+        page = doc.new_page()
+        if table_every and page_no % table_every == 0:
+            _table_page(page, page_no, table_rows, rng)
+        else:
+            _prose_page(page, page_no, rng)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def table_pages(pages: int, table_every: int = 5) -> List[int]:
+    """1-based page numbers that `make_policy_pdf` fills with tables."""
+    return [p for p in range(1, pages + 1) if table_every and p % table_every == 0]
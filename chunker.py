@@ -0,0 +1,170 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+PAGE_BREAK = "\f"  # separates pages in extracted text, so chunks can report their page
+
+# Sentence-ish segments: up to sentence punctuation (not inside "3.5") or a line break,
+# with trailing whitespace.
+# Consecutive segments always reproduce the page text exactly.
+_SEGMENT_RE = re.compile(r"(?:[^.!?\n]|[.!?]+(?![\s.!?]|$))*(?:[.!?]+|\n|$)[ \t]*\n*")
+_SECTION_RE = re.compile(r"\s*\d+\.\d+(?:\.\d+)?\s+\S")  # section headers such as "4.2 Exclusions"
+
+
+@dataclass
+class Chunk:
+    """A chunk of document text and where it came from."""
+    text: str
+    source: Optional[str]
+    section: str              # "table" or "text"
+    start: int                # character offsets into the section's text, pages joined by PAGE_BREAK
+    end: int
+    page: Optional[int]       # 1-based page the chunk starts on; None for table text
+    end_page: Optional[int]
+
+    def provenance(self) -> dict:
+        """Everything but the text, e.g. for storing next to the chunk text."""
+        return {"source": self.source, "section": self.section, "start": self.start, "end": self.end,
+                "page": self.page, "end_page": self.end_page}
+
+
+def iter_pages(text: str) -> Iterator[Tuple[int, str]]:
+    """Yield (page number, page text) from text whose pages are separated by PAGE_BREAK."""
+    page_no, pos = 1, 0
+    while True:
+        end = text.find(PAGE_BREAK, pos)
+        if end == -1:
+            yield page_no, text[pos:]
+            return
+        yield page_no, text[pos:end]
+        page_no, pos = page_no + 1, end + 1
+
+
+def _segments(page_text: str) -> Iterator[Tuple[int, str]]:
+    """(offset, text) of each non-empty segment of a page."""
+    for match in _SEGMENT_RE.finditer(page_text):
+        if match.group():
+            yield match.start(), match.group()
+
+
+def _split_long(offset: int, text: str, pieces: int) -> Iterator[Tuple[int, str]]:
+    """Cut an over-long segment into roughly equal pieces at whitespace."""
+    size = max(1, len(text) // pieces)
+    pos = 0
+    while pos < len(text):
+        cut = len(text) if len(text) - pos <= size * 1.5 else text.rfind(" ", pos + size // 2, pos + size) + 1
+        if cut <= pos:
+            cut = min(len(text), pos + size)
+        yield offset + pos, text[pos:cut]
+        pos = cut
+
+
+def _split_to_fit(offset: int, text: str, tokens: int, max_tokens: int,
+                  count_tokens: Callable[[str], int]) -> Iterator[Tuple[int, str, int]]:
+    """(offset, text, tokens) pieces of a segment, each at most `max_tokens` unless it is a single character."""
+    if tokens <= max_tokens or len(text) < 2:
+        yield offset, text, tokens
+        return
+    # Pieces are cut by characters, so one can still be over the limit; those are split again
+    for piece_offset, piece in _split_long(offset, text, -(-tokens // max_tokens)):
+        yield from _split_to_fit(piece_offset, piece, count_tokens(piece), max_tokens, count_tokens)
+
+
+def chunk_stream(pages: Iterable[Tuple[Optional[int], str]], max_tokens: int, overlap_tokens: int,
+                 count_tokens: Callable[[str], int], source: Optional[str] = None,
+                 section: str = "text") -> Iterator[Chunk]:
+    """
+    Split a stream of pages into chunks in one pass.
+
+    Pages are cut into sentence-like segments, and segments are packed into chunks
+    of at most `max_tokens`. The next chunk starts with the previous chunk's last
+    segments, up to `overlap_tokens`, so each segment is tokenized once and only
+    overlap is ever repeated. A section header starts a new chunk once the
+    current one is a quarter full. Identical chunks are emitted once. Besides the
+    current chunk, only a 16-byte digest per emitted chunk is kept, so `pages`
+    can be a generator over a long document.
+
+    Args:
+        pages: (page number, page text) pairs in order; page may be None
+        max_tokens: Maximum tokens per chunk
+        overlap_tokens: Tokens of trailing context repeated at the start of the next chunk
+        count_tokens: Token counter (see context_builder.make_token_counter)
+        source: Document the pages come from
+        section: Label for the kind of text, e.g. "text" or "table"
+
+    Yields:
+        Chunk records in document order
+    """
+    current: List[Tuple[int, str, int, Optional[int]]] = []  # (offset, text, tokens, page)
+    current_tokens = 0
+    new_in_current = 0  # segments not carried over from the previous chunk
+    emitted = set()  # blake2b digests of the chunks yielded so far
+
+    def flush() -> Optional[Chunk]:
+        pieces, previous_page = [], current[0][3]
+        for _, segment, _, page in current:
+            if page != previous_page:
+                pieces.append("\n")  # page boundary
+                previous_page = page
+            pieces.append(segment)
+        text = "".join(pieces).strip()
+        if not text or new_in_current == 0:
+            return None
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        if digest in emitted:
+            return None
+        emitted.add(digest)
+        first, last = current[0], current[-1]
+        return Chunk(text, source, section, first[0], last[0] + len(last[1]), first[3], last[3])
+
+    def carry_overlap() -> None:
+        nonlocal current, current_tokens, new_in_current
+        kept, tokens = [], 0
+        for segment in reversed(current[1:]):  # never carry the whole chunk
+            if tokens + segment[2] > overlap_tokens:
+                break
+            kept.append(segment)
+            tokens += segment[2]
+        current, current_tokens, new_in_current = kept[::-1], tokens, 0
+
+    base = 0  # offset of the current page within the section text
+    for page_no, page_text in pages:
+        for offset, segment in _segments(page_text):
+            parts = _split_to_fit(offset, segment, count_tokens(segment), max_tokens, count_tokens)
+            for part_offset, part, part_tokens in parts:
+                starts_section = _SECTION_RE.match(part) is not None and current_tokens >= max_tokens // 4
+                if current and (current_tokens + part_tokens > max_tokens or starts_section):
+                    chunk = flush()
+                    if chunk is not None:
+                        yield chunk
+                    if starts_section:
+                        current, current_tokens, new_in_current = [], 0, 0
+                    else:
+                        carry_overlap()
+                        while current and current_tokens + part_tokens > max_tokens:
+                            current_tokens -= current.pop(0)[2]
+                current.append((base + part_offset, part, part_tokens, page_no))
+                current_tokens += part_tokens
+                new_in_current += 1
+        base += len(page_text) + len(PAGE_BREAK)
+
+    if current:
+        chunk = flush()
+        if chunk is not None:
+            yield chunk
+
+
+def chunk_document(table_text: Optional[str], fallback_text: Optional[str], max_tokens: int,
+                   overlap_tokens: int, count_tokens: Callable[[str], int],
+                   source: Optional[str] = None) -> List[Chunk]:
+    """
+    Chunk a document's table text and page text separately, so table rows and prose
+    never share a chunk and text chunks keep their page numbers.
+    """
+    chunks: List[Chunk] = []
+    if table_text and table_text.strip():
+        chunks.extend(chunk_stream([(None, table_text)], max_tokens, overlap_tokens, count_tokens, source, "table"))
+    if fallback_text and fallback_text.strip():
+        chunks.extend(chunk_stream(iter_pages(fallback_text), max_tokens, overlap_tokens, count_tokens, source, "text"))
+    return chunks
@@ -0,0 +1,177 @@
+import os
+import logging
+from typing import Callable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+EXPANSION_TOKEN_BUDGET = int(os.getenv("EXPANSION_TOKEN_BUDGET", "8000"))
+ESCALATION_K = [int(k) for k in os.getenv("ESCALATION_K", "10,30").split(",")]
+EXPANSION_NEIGHBOURS = int(os.getenv("EXPANSION_NEIGHBOURS", "2"))
+QUESTION_BATCH_SIZE = int(os.getenv("QUESTION_BATCH_SIZE", "1"))  # questions per LLM prompt; 1 disables batching
+QUESTION_BATCH_MIN_OVERLAP = float(os.getenv("QUESTION_BATCH_MIN_OVERLAP", "0.5"))
+BATCH_CONTEXT_TOKEN_BUDGET = int(os.getenv("BATCH_CONTEXT_TOKEN_BUDGET", "6000"))
+
+MIN_OVERLAP_CHARS = 40
+
+
+def make_token_counter(tokenizer=None) -> Callable[[str], int]:
+    """
+    Token counter backed by a local Hugging Face tokenizer, e.g. the embedding model's.
+
+    Falls back to ~4 characters per token when no tokenizer is available.
+    """
+    if tokenizer is None:
+        return lambda text: len(text) // 4 + 1
+    return lambda text: len(tokenizer(text, add_special_tokens=False, verbose=False)["input_ids"])
+
+
+def _merge_text(first: str, second: str) -> str:
+    """Join two consecutive chunks, dropping the text they share if `second` starts inside `first`."""
+    probe = second[:MIN_OVERLAP_CHARS]
+    start = first.find(probe) if len(probe) == MIN_OVERLAP_CHARS else -1
+    if start != -1 and second.startswith(first[start:]):
+        return first[:start] + second
+    return first + "\n" + second
+
+
+def assemble_context(ranked_ids: Sequence[int], chunks: List[str], budget: int,
+                     count_tokens: Callable[[str], int],
+                     doc_of: Optional[Sequence[int]] = None) -> Tuple[List[str], int]:
+    """
+    Pack the best-ranked chunks into a context of at most `budget` tokens.
+
+    Duplicate chunks and chunks contained in an already selected chunk are
+    skipped. Selected chunks that are neighbours in the same document are
+    merged into one passage, so overlapping windows appear only once.
+
+    Args:
+        ranked_ids: Chunk ids, best first
+        chunks: All chunks of the index
+        budget: Maximum context size in tokens
+        count_tokens: Token counter (see `make_token_counter`)
+        doc_of: Document ordinal of each chunk; chunks of different documents are never merged
+
+    Returns:
+        Tuple containing:
+        - Context passages, ordered by their best-ranked chunk
+        - Token count of the passages
+    """
+    selected = []
+    seen_texts = set()
+    used = 0
+    for chunk_id in ranked_ids:
+        if not 0 <= chunk_id < len(chunks) or chunk_id in selected:
+            continue
+        text = chunks[chunk_id]
+        if text in seen_texts or any(text in chunks[s] for s in selected):
+            continue
+        tokens = count_tokens(text)
+        if used + tokens > budget:
+            continue  # a smaller, lower-ranked chunk may still fit
+        selected.append(chunk_id)
+        seen_texts.add(text)
+        used += tokens
+
+    # Group runs of consecutive chunk ids from the same document
+    rank = {chunk_id: r for r, chunk_id in enumerate(selected)}
+    runs: List[List[int]] = []
+    for chunk_id in sorted(selected):
+        previous = runs[-1][-1] if runs else None
+        same_doc = doc_of is None or (previous is not None and doc_of[previous] == doc_of[chunk_id])
+        if previous is not None and chunk_id == previous + 1 and same_doc:
+            runs[-1].append(chunk_id)
+        else:
+            runs.append([chunk_id])
+    runs.sort(key=lambda run: min(rank[c] for c in run))
+
+    passages = []
+    for run in runs:
+        text = chunks[run[0]]
+        for chunk_id in run[1:]:
+            text = _merge_text(text, chunks[chunk_id])
+        passages.append(text)
+    return passages, used
+
+
+def expand_neighbours(ranked_ids: Sequence[int], total: int, neighbours: int = EXPANSION_NEIGHBOURS) -> List[int]:
+    """
+    Ranked chunk ids followed, hit by hit, by the chunks around them.
+
+    Used for the last escalation stage so each hit is read in its surrounding context.
+    """
+    expanded = []
+    for chunk_id in ranked_ids:
+        if not 0 <= chunk_id < total:
+            continue
+        expanded.append(chunk_id)
+        for distance in range(1, neighbours + 1):
+            expanded.extend(c for c in (chunk_id - distance, chunk_id + distance) if 0 <= c < total)
+    return list(dict.fromkeys(expanded))
+
+
+def escalation_stages(ranked_ids: Sequence[int], total: int,
+                      reranked_ids: Optional[Sequence[int]] = None) -> List[Tuple[str, List[int], int]]:
+    """
+    Context stages to try in order until the LLM finds an answer.
+
+    Args:
+        ranked_ids: Retrieved chunk ids, best first
+        total: Number of chunks in the index
+        reranked_ids: Cross-encoder top chunks, tried first when given
+
+    Returns:
+        List of (stage name, ranked chunk ids, token budget): the reranked chunks if
+        any, the top ESCALATION_K[0] hits, then each wider k, then the first-stage
+        hits with their neighbours under EXPANSION_TOKEN_BUDGET.
+    """
+    stages = [(f"k={k}", list(ranked_ids[:k]), CONTEXT_TOKEN_BUDGET) for k in ESCALATION_K]
+    if reranked_ids:
+        stages.insert(0, ("reranked", list(reranked_ids), CONTEXT_TOKEN_BUDGET))
+    expanded = expand_neighbours(ranked_ids[:ESCALATION_K[0]], total)
+    stages.append(("expanded", expanded, EXPANSION_TOKEN_BUDGET))
+    return stages
+
+
+def group_questions(ranked_ids: Sequence[Sequence[int]], max_size: int = QUESTION_BATCH_SIZE,
+                    min_overlap: float = QUESTION_BATCH_MIN_OVERLAP) -> List[List[int]]:
+    """
+    Group questions whose retrieved chunks overlap, so each group can share one prompt.
+
+    Questions are placed greedily in order: each joins the open group holding the
+    largest share of its chunks, if that share is at least `min_overlap`, and
+    otherwise starts a new group.
+
+    Args:
+        ranked_ids: First-stage chunk ids of each question
+        max_size: Most questions per group; 1 gives every question its own group
+        min_overlap: Fraction of a question's chunks that must already be in the group
+
+    Returns:
+        Groups of question indexes, each in question order
+    """
+    groups: List[List[int]] = []
+    group_chunks: List[set] = []
+    for i, ids in enumerate(ranked_ids):
+        ids = set(ids)
+        best, best_overlap = None, min_overlap
+        if max_size > 1 and ids:
+            for g, chunk_ids in enumerate(group_chunks):
+                overlap = len(ids & chunk_ids) / len(ids)
+                if len(groups[g]) < max_size and overlap >= best_overlap:
+                    best, best_overlap = g, overlap
+        if best is None:
+            groups.append([i])
+            group_chunks.append(ids)
+        else:
+            groups[best].append(i)
+            group_chunks[best] |= ids
+    return groups
+
+
+def interleave(ranked_lists: Sequence[Sequence[int]]) -> List[int]:
+    """Merge several rankings round-robin, best first, keeping the first occurrence of each id."""
+    merged = []
+    for rank in range(max((len(ids) for ids in ranked_lists), default=0)):
+        merged.extend(ids[rank] for ids in ranked_lists if rank < len(ids))
+    return list(dict.fromkeys(merged))
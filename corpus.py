@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from startup import lazy_import
+from vectorizer import EMBEDDING_STORAGE, flat_index, train_unit_range
+
+faiss = lazy_import("faiss")
+
+logger = logging.getLogger(__name__)
+
+CORPUS_DIR = os.getenv("CORPUS_DIR", "corpus")
+META_FILE = "corpus.json"
+
+
+class Corpus:
+    """
+    Long-lived multi-document vector index with stable chunk IDs.
+
+    Vectors are kept in a `faiss.IndexIDMap2` keyed by chunk ID, so documents can
+    be added and removed without rebuilding the index. Chunk IDs come from a
+    counter that is never reused. `save` writes the index under a new generation
+    number and then atomically replaces `corpus.json`, which names the index file
+    to load, so a crash mid-save leaves the previous snapshot intact. Vectors
+    are stored at `storage` precision (see vectorizer.EMBEDDING_STORAGE).
+    """
+
+    def __init__(self, corpus_dir: str = CORPUS_DIR, storage: str = EMBEDDING_STORAGE):
+        self.corpus_dir = corpus_dir
+        self.storage = storage
+        self.index: Optional[faiss.IndexIDMap2] = None
+        self.documents: Dict[str, dict] = {}
+        self.chunks: Dict[int, dict] = {}
+        self.next_id = 0
+        self.generation = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def add_document(self, doc_id: str, chunks: List[str], embeddings: np.ndarray,
+                     metadata: Optional[dict] = None, records: Optional[List[dict]] = None) -> List[int]:
+        """
+        Add a document, replacing any previous version with the same ID.
+
+        Args:
+            doc_id: Caller-chosen document ID
+            chunks: Text chunks of the document
+            embeddings: L2-normalized float32 embeddings, one row per chunk
+            metadata: Extra fields stored with the document (e.g. source URL)
+            records: Optional provenance per chunk (chunker.Chunk.provenance()); its page is stored
+
+        Returns:
+            Chunk IDs assigned to the document's chunks
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+        with self._lock:
+            if self.index is None:
+                vectors = flat_index(embeddings.shape[1], self.storage)
+                if not vectors.is_trained:
+                    # int8 ranges cover any normalized vector, not just the first document's
+                    train_unit_range(vectors)
+                self.index = faiss.IndexIDMap2(vectors)
+            self.remove_document(doc_id)
+
+            ids = np.arange(self.next_id, self.next_id + len(chunks), dtype="int64")
+            self.next_id += len(chunks)
+            self.index.add_with_ids(embeddings, ids)
+
+            for pos, (chunk_id, text) in enumerate(zip(ids.tolist(), chunks)):
+                page = records[pos].get("page") if records else None
+                self.chunks[chunk_id] = {"doc_id": doc_id, "text": text, "page": page}
+            self.documents[doc_id] = {
+                **(metadata or {}),
+                "chunk_ids": ids.tolist(),
+                "added_at": time.time(),
+            }
+            logger.info(f"Added document {doc_id} with {len(chunks)} chunks to corpus")
+            return ids.tolist()
+
+    def remove_document(self, doc_id: str) -> bool:
+        """
+        Remove a document and its chunks.
+
+        Returns:
+            True if the document was present
+        """
+        with self._lock:
+            document = self.documents.pop(doc_id, None)
+            if document is None:
+                return False
+            ids = np.array(document["chunk_ids"], dtype="int64")
+            self.index.remove_ids(ids)
+            for chunk_id in document["chunk_ids"]:
+                self.chunks.pop(chunk_id, None)
+            logger.info(f"Removed document {doc_id} from corpus")
+            return True
+
+    def list_documents(self) -> List[dict]:
+        """
+        Metadata of every document, copied under the lock so it is safe to use while
+        documents are added or removed.
+
+        Returns:
+            One dict per document with its ID, source, chunk count and time added
+        """
+        with self._lock:
+            return [
+                {"id": doc_id, "source": doc.get("source"), "chunks": len(doc["chunk_ids"]), "added_at": doc["added_at"]}
+                for doc_id, doc in self.documents.items()
+            ]
+
+    def search(self, query_vecs: np.ndarray, k: int = 10,
+               doc_ids: Optional[Iterable[str]] = None) -> List[List[dict]]:
+        """
+        Find the top-k chunks for each query, optionally within a subset of documents.
+
+        Args:
+            query_vecs: L2-normalized float32 query matrix
+            k: Number of chunks per query
+            doc_ids: Only search chunks of these documents
+
+        Returns:
+            For each query, a list of {chunk_id, doc_id, text, page, score} best first
+        """
+        with self._lock:
+            if self.index is None or self.index.ntotal == 0:
+                return [[] for _ in range(len(query_vecs))]
+
+            params = None
+            if doc_ids is not None:
+                scoped = [cid for d in doc_ids for cid in self.documents.get(d, {}).get("chunk_ids", [])]
+                if not scoped:
+                    return [[] for _ in range(len(query_vecs))]
+                params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(np.array(scoped, dtype="int64")))
+
+            scores, ids = self.index.search(np.ascontiguousarray(query_vecs, dtype="float32"), k, params=params)
+            return [
+                [
+                    {"chunk_id": int(cid), "doc_id": self.chunks[cid]["doc_id"],
+                     "text": self.chunks[cid]["text"], "page": self.chunks[cid].get("page"),
+                     "score": float(score)}
+                    for cid, score in zip(row_ids.tolist(), row_scores.tolist()) if cid in self.chunks
+                ]
+                for row_ids, row_scores in zip(ids, scores)
+            ]
+
+    def save(self) -> None:
+        """Write the corpus to `corpus_dir` atomically."""
+        with self._lock:
+            os.makedirs(self.corpus_dir, exist_ok=True)
+            generation = self.generation + 1
+            index_file = f"index-{generation}.faiss"
+            if self.index is not None:
+                faiss.write_index(self.index, os.path.join(self.corpus_dir, index_file))
+
+            meta_path = os.path.join(self.corpus_dir, META_FILE)
+            tmp_path = f"{meta_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "generation": generation,
+                    "index_file": index_file if self.index is not None else None,
+                    "next_id": self.next_id,
+                    "documents": self.documents,
+                    "chunks": {str(cid): chunk for cid, chunk in self.chunks.items()},
+                }, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, meta_path)
+
+            # The new snapshot is live; older index files are no longer referenced
+            for name in os.listdir(self.corpus_dir):
+                if name.startswith("index-") and name != index_file:
+                    os.unlink(os.path.join(self.corpus_dir, name))
+            self.generation = generation
+
+    @classmethod
+    def load(cls, corpus_dir: str = CORPUS_DIR) -> "Corpus":
+        """Load the last saved corpus, or return an empty one if none exists."""
+        corpus = cls(corpus_dir)
+        meta_path = os.path.join(corpus_dir, META_FILE)
+        if not os.path.exists(meta_path):
+            return corpus
+
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("index_file"):
+            corpus.index = faiss.read_index(os.path.join(corpus_dir, meta["index_file"]))
+        corpus.generation = meta["generation"]
+        corpus.next_id = meta["next_id"]
+        corpus.documents = meta["documents"]
+        corpus.chunks = {int(cid): chunk for cid, chunk in meta["chunks"].items()}
+        logger.info(f"Loaded corpus with {len(corpus.documents)} documents and {len(corpus.chunks)} chunks")
+        return corpus
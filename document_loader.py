@@ -1,15 +1,52 @@
-import camelot
-import fitz  # PyMuPDF
 import re
 import os
-from urllib.parse import urlparse
-from typing import List, Union, Optional,Tuple
-import requests
 import time
+from urllib.parse import urlparse
+from typing import Iterator, List, Union, Optional,Tuple
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from downloader import download, DownloadError, PDF_STORAGE_DIR
+import metrics
+import tracing
+from startup import lazy_import
+from chunker import PAGE_BREAK
+
+# Imported on first use: camelot pulls in OpenCV and ghostscript
+camelot = lazy_import("camelot")
+fitz = lazy_import("fitz")  # PyMuPDF
+
+logger = logging.getLogger(__name__)
 
-PDF_STORAGE_DIR = "pdfs"
 os.makedirs(PDF_STORAGE_DIR, exist_ok=True)
 
+# Page-range sharding for camelot and PyMuPDF extraction
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+EXTRACT_PAGES_PER_SHARD = int(os.getenv("EXTRACT_PAGES_PER_SHARD", "8"))
+# Worker processes are not forked from this multi-threaded process directly
+EXTRACT_START_METHOD = os.getenv("EXTRACT_START_METHOD", "forkserver")
+
+# PyMuPDF pre-pass choosing the pages camelot reads: on, off (every page) or
+# compare (both, logging the difference and keeping the full result)
+TABLE_PAGE_DETECTION = os.getenv("TABLE_PAGE_DETECTION", "on")
+TABLE_DENSE_AMOUNTS = int(os.getenv("TABLE_DENSE_AMOUNTS", "3"))
+TABLE_MIN_RULINGS = int(os.getenv("TABLE_MIN_RULINGS", "2"))
+TABLE_MIN_TABULAR_LINES = int(os.getenv("TABLE_MIN_TABULAR_LINES", "3"))
+TABLE_COLUMN_GAP = float(os.getenv("TABLE_COLUMN_GAP", "12"))  # points between words in different columns
+
+# Sub-limit amounts that identify each sum-insured tier, checked in this order
+TIER_AMOUNTS = [
+    ("3L/4L/5L", (25000, 100000, 200000)),
+    ("10L/15L/20L", (50000, 175000, 350000)),
+    (">20L", (75000, 250000, 500000)),
+]
+_ALL_TIER_AMOUNTS = {a for _, amounts in TIER_AMOUNTS for a in amounts}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
 
 def download_and_extract_text(doc_path: Union[str, List[str]]) -> Tuple[Optional[str], Optional[str]]:
     """
@@ -29,44 +66,29 @@ def download_and_extract_text(doc_path: Union[str, List[str]]) -> Tuple[Optional
     else:
         doc_paths = doc_path
 
+    from pipeline import ingest_documents  # imported here: pipeline builds on this module
+
+    def fetch(path: str) -> Optional[str]:
+        if is_url(path):
+            tracing.trace(tracing.INFO, "downloading_document", url=path)
+            return download_document(path)
+        tracing.trace(tracing.INFO, "local_document", path=path)
+        return path if validate_local_file(path) else None
+
+    # Downloads overlap extraction of earlier documents; table and text run side by side
+    results = ingest_documents(doc_paths, fetch, build_index=False)
+
     all_table_text = []
     all_fallback_text = []
-    temp_files = []
-    
-    for path in doc_paths:
-        try:
-            local_path = None
-            if is_url(path):
-                print(f"🌐 Downloading document from URL: {path}")
-                local_path = download_document(path)
-                if not local_path:
-                    continue
-                temp_files.append(local_path)
-            else:
-                print(f"📂 Using local file path: {path}")
-                if not validate_local_file(path):
-                    continue
-                local_path = path
-
-            # Process the document
-            table_text = extract_structured_table_with_fallback(local_path)
-            fallback_text = extract_text_and_urls_fallback(local_path)
-            
-            if table_text:
-                all_table_text.append(f"--- Document: {os.path.basename(path)} ---\n{table_text}")
-            if fallback_text:
-                all_fallback_text.append(f"--- Document: {os.path.basename(path)} ---\n{fallback_text}")
-
-        except Exception as e:
-            print(f"❌ Error processing document {path}: {str(e)}")
+    for result in results:
+        if result.error:
+            logger.warning(f"❌ Error processing document {result.doc_path}: {result.error}")
             continue
-
-    # Clean up temporary files
-    for temp_file in temp_files:
-        try:
-            os.unlink(temp_file)
-        except:
-            pass
+        if result.table_text:
+            all_table_text.append(f"--- Document: {os.path.basename(result.doc_path)} ---\n{result.table_text}")
+        if result.fallback_text:
+            all_fallback_text.append(f"--- Document: {os.path.basename(result.doc_path)} ---\n{result.fallback_text}")
+        tracing.trace(tracing.INFO, "stage_timings", document=result.doc_path, timings=result.timings)
 
     combined_table = "\n\n".join(all_table_text) if all_table_text else None
     combined_fallback = "\n\n".join(all_fallback_text) if all_fallback_text else None
@@ -74,40 +96,21 @@ def download_and_extract_text(doc_path: Union[str, List[str]]) -> Tuple[Optional
     return combined_table, combined_fallback
 
 def download_document(url: str) -> Optional[str]:
-    headers = {
-        'User-Agent': 'Mozilla/5.0',
-        'Accept': 'application/pdf'
-    }
-
+    """
+    Download a PDF through the shared pooled downloader.
+    
+    Args:
+        url: Document URL
+        
+    Returns:
+        Local file path, or None if the download failed or was not a PDF
+    """
     try:
-        if not url.lower().endswith('.pdf'):
-            head = requests.head(url, headers=headers, timeout=10, allow_redirects=True)
-            if 'pdf' not in head.headers.get('Content-Type', ''):
-                print(f"❌ Not a PDF: {url}")
-                return None
-
-        response = requests.get(url, headers=headers, stream=True, timeout=30)
-        response.raise_for_status()
-
-        content_type = response.headers.get('Content-Type', '').lower()
-        if 'pdf' not in content_type:
-            print(f"❌ Content-Type not PDF: {content_type}")
-            return None
-
-        filename = os.path.basename(urlparse(url).path) or f"file_{int(time.time())}.pdf"
-        safe_filename = f"{int(time.time())}_{filename}"
-        local_path = os.path.join(PDF_STORAGE_DIR, safe_filename)
-
-        with open(local_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-
-        print(f"✅ Saved to: {local_path}")
+        local_path = download(url, require_pdf=True)
+        tracing.trace(tracing.INFO, "document_saved", url=url, path=local_path)
         return local_path
-
-    except Exception as e:
-        print(f"❌ Download error: {str(e)}")
+    except DownloadError as e:
+        logger.warning(f"❌ {str(e)}")
         return None
 
 def validate_local_file(path: str) -> bool:
@@ -121,22 +124,22 @@ def validate_local_file(path: str) -> bool:
         bool: True if valid PDF, False otherwise
     """
     if not os.path.exists(path):
-        print(f"❌ File not found: {path}")
+        logger.warning(f"❌ File not found: {path}")
         return False
         
     if not path.lower().endswith('.pdf'):
-        print(f"❌ File is not PDF: {path}")
+        logger.warning(f"❌ File is not PDF: {path}")
         return False
         
     try:
         # Quick check if file is a valid PDF
         with fitz.open(path) as doc:
             if not doc.page_count:
-                print(f"❌ PDF appears to be empty: {path}")
+                logger.warning(f"❌ PDF appears to be empty: {path}")
                 return False
         return True
     except:
-        print(f"❌ File is not a valid PDF: {path}")
+        logger.warning(f"❌ File is not a valid PDF: {path}")
         return False
 
 def is_url(path: str) -> bool:
@@ -161,121 +164,377 @@ def extract_urls(text: str) -> List[str]:
     url_pattern = r"https?://[^\s)\]]+"  # Match http/https links
     return list(set(re.findall(url_pattern, text)))
 
-def extract_structured_table_with_fallback(pdf_path: str) -> Optional[str]:
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the shared process pool with `workers` processes, creating it on first use."""
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            context = multiprocessing.get_context(EXTRACT_START_METHOD)
+            if EXTRACT_START_METHOD == "forkserver":
+                # Workers fork from a server that has the extraction libraries loaded already
+                context.set_forkserver_preload(["document_loader", "camelot", "fitz"])
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _pools[workers] = pool
+        return pool
+
+def _discard_pool(workers: int, pool: ProcessPoolExecutor) -> None:
+    """Forget a broken pool so the next call to _get_pool starts fresh processes."""
+    with _pools_lock:
+        if _pools.get(workers) is pool:
+            del _pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def page_shards(page_count: int, workers: int, pages_per_shard: int = EXTRACT_PAGES_PER_SHARD) -> List[Tuple[int, int]]:
+    """
+    Split pages 1..page_count into contiguous (first, last) ranges, inclusive.
+    
+    Uses at least one shard per worker so small documents still spread across the pool.
+    """
+    if page_count <= 0:
+        return []
+    size = max(1, min(pages_per_shard, -(-page_count // max(1, workers))))
+    return [(first, min(first + size - 1, page_count)) for first in range(1, page_count + 1, size)]
+
+def _map_shards(fn, pdf_path: str, shards: List[tuple], workers: int) -> list:
+    """Run fn(pdf_path, *shard) for every shard, in a process pool when it helps, keeping shard order."""
+    if workers <= 1 or len(shards) <= 1:
+        return [fn(pdf_path, *shard) for shard in shards]
+    for attempt in range(2):
+        pool = _get_pool(workers)
+        try:
+            return list(pool.map(fn, [pdf_path] * len(shards), *zip(*shards)))
+        except BrokenProcessPool:
+            # A worker died (OOM, crash in camelot or ghostscript); replace the pool so
+            # this and later documents do not all fail on the same broken executor
+            logger.warning(f"⚠️ Extraction worker died on {pdf_path}, restarting the pool of {workers}")
+            _discard_pool(workers, pool)
+            if attempt:
+                raise
+
+def page_spec(pages: List[int]) -> str:
+    """Camelot page string for sorted 1-based page numbers, e.g. [1, 2, 3, 7] -> "1-3,7"."""
+    ranges = []
+    for page in pages:
+        if ranges and page == ranges[-1][1] + 1:
+            ranges[-1][1] = page
+        else:
+            ranges.append([page, page])
+    return ",".join(str(first) if first == last else f"{first}-{last}" for first, last in ranges)
+
+def _read_table_rows(pdf_path: str, pages: str) -> List[List[str]]:
+    """Run camelot stream mode over the given pages and return their cleaned rows."""
+    tables = camelot.read_pdf(pdf_path, pages=pages, flavor='stream')
+    rows = []
+    for table in tables:
+        rows.extend(clean_table(table))
+    return rows
+
+def _read_page_texts(pdf_path: str, first: int, last: int) -> List[str]:
+    """Extract the text of pages first..last (1-based, inclusive) with PyMuPDF."""
+    with fitz.open(pdf_path) as doc:
+        return [doc[page_no].get_text() for page_no in range(first - 1, last)]
+
+def get_page_count(pdf_path: str) -> int:
+    """Number of pages in a PDF"""
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
+def find_tier_amounts(text: str) -> List[int]:
+    """Numbers in `text` that identify a sum-insured tier (see TIER_AMOUNTS)."""
+    return [a for a in map(int, re.findall(r"\d{2,7}", text.replace(",", ""))) if a in _ALL_TIER_AMOUNTS]
+
+def detect_tier_from_amounts(row: List[str]) -> Optional[str]:
+    """Detect insurance tier from numerical amounts in row"""
+    amounts = find_tier_amounts(" ".join(row))
+    for tier, tier_amounts in TIER_AMOUNTS:
+        if any(a in tier_amounts for a in amounts):
+            return tier
+    return None
+
+def _count_rulings(page) -> int:
+    """Horizontal and vertical lines and rectangles drawn on a page, as table borders are."""
+    rulings = 0
+    for drawing in page.get_drawings():
+        for item in drawing["items"]:
+            if item[0] == "re":
+                rulings += 1
+            elif item[0] == "l":
+                start, end = item[1], item[2]
+                rulings += abs(start.x - end.x) < 1 or abs(start.y - end.y) < 1
+    return rulings
+
+def _count_tabular_lines(page) -> int:
+    """Text lines with at least three cells, i.e. two gaps wider than TABLE_COLUMN_GAP between words."""
+    lines = {}
+    for x0, _, x1, y1, *_ in page.get_text("words"):
+        lines.setdefault(round(y1 / 2), []).append((x0, x1))  # same baseline within ~2 points
+    tabular = 0
+    for words in lines.values():
+        words.sort()
+        gaps = sum(1 for (_, end), (start, _) in zip(words, words[1:]) if start - end > TABLE_COLUMN_GAP)
+        tabular += gaps >= 2
+    return tabular
+
+def _detect_table_pages(pdf_path: str, first: int, last: int) -> List[dict]:
+    """
+    Table signals for pages first..last (1-based, inclusive).
+
+    Only rows holding a tier amount are kept from camelot's output, so a page
+    without one is never a candidate. A page with some is a candidate if the
+    amounts are dense, or ruling lines or column-aligned text lines suggest a
+    table; the layout signals are only computed for pages with amounts. URLs on
+    skipped pages still reach the index through the PyMuPDF text fallback.
+    """
+    signals = []
+    with fitz.open(pdf_path) as doc:
+        for page_no in range(first - 1, last):
+            page = doc[page_no]
+            entry = {"page": page_no + 1, "amounts": len(find_tier_amounts(page.get_text())),
+                     "rulings": 0, "tabular_lines": 0}
+            if entry["amounts"]:
+                entry["rulings"] = _count_rulings(page)
+                entry["tabular_lines"] = _count_tabular_lines(page)
+            entry["candidate"] = entry["amounts"] > 0 and (
+                entry["amounts"] >= TABLE_DENSE_AMOUNTS
+                or entry["rulings"] >= TABLE_MIN_RULINGS
+                or entry["tabular_lines"] >= TABLE_MIN_TABULAR_LINES
+            )
+            signals.append(entry)
+    return signals
+
+def detect_table_pages(pdf_path: str, workers: Optional[int] = None) -> List[dict]:
+    """
+    Fast PyMuPDF pass picking the pages worth running camelot on.
+
+    Args:
+        pdf_path: Path to PDF file
+        workers: Processes to shard detection over (default EXTRACT_WORKERS)
+
+    Returns:
+        Per page, in order: page (1-based), amounts, rulings, tabular_lines and candidate
+    """
+    workers = workers or EXTRACT_WORKERS
+    signals = []
+    shards = page_shards(get_page_count(pdf_path), workers)
+    for shard_signals in _map_shards(_detect_table_pages, pdf_path, shards, workers):
+        signals.extend(shard_signals)
+    return signals
+
+def read_table_rows(pdf_path: str, pages: Optional[List[int]] = None, workers: Optional[int] = None) -> List[List[str]]:
+    """
+    Cleaned camelot rows of a PDF, sharded over worker processes in page order.
+
+    Args:
+        pdf_path: Path to PDF file
+        pages: 1-based pages to read in ascending order (default: all)
+        workers: Processes to shard camelot over (default EXTRACT_WORKERS)
+    """
+    workers = workers or EXTRACT_WORKERS
+    if pages is None:
+        pages = list(range(1, get_page_count(pdf_path) + 1))
+    shards = [(page_spec(pages[first - 1:last]),) for first, last in page_shards(len(pages), workers)]
+    all_rows = []
+    for shard_rows in _map_shards(_read_table_rows, pdf_path, shards, workers):
+        all_rows.extend(shard_rows)
+    return all_rows
+
+def _sublimit_rows(all_rows: List[List[str]]) -> Tuple[List[List[str]], set]:
+    """Rows carrying a tier amount, prefixed with their tier, and the URLs found in any table cell."""
+    sublimit_rows = []
+    found_urls = set()
+
+    # Analyze rows for insurance tiers
+    for row in all_rows:
+        row_clean = [c.strip().replace("`", "").replace("\n", " ") for c in row]
+        tier = detect_tier_from_amounts(row_clean)
+        if tier:
+            row_clean.insert(0, tier)
+            if len(row_clean) >= 3:  # Ensure we have at least tier + two data columns
+                sublimit_rows.append(row_clean)
+
+        # Extract URLs from table cells
+        found_urls.update(extract_urls(" ".join(row)))
+    return sublimit_rows, found_urls
+
+def _format_sublimit_rows(sublimit_rows: List[List[str]], found_urls: set) -> str:
+    output = "\n".join([" | ".join(r) for r in sublimit_rows])
+    if found_urls:
+        output += "\n\n🔗 URLs:\n" + "\n".join(sorted(found_urls))
+    return output
+
+def format_table_rows(all_rows: List[List[str]]) -> Optional[str]:
+    """Table text for camelot rows, as extract_structured_table_with_fallback returns it; None without tier rows."""
+    sublimit_rows, found_urls = _sublimit_rows(all_rows)
+    return _format_sublimit_rows(sublimit_rows, found_urls) if sublimit_rows else None
+
+def _read_detected_table_rows(pdf_path: str, workers: int) -> List[List[str]]:
+    """Camelot rows of the candidate table pages only, logging the pages skipped and the estimated time saved."""
+    start = time.perf_counter()
+    signals = detect_table_pages(pdf_path, workers)
+    detect_seconds = time.perf_counter() - start
+    pages = [s["page"] for s in signals if s["candidate"]]
+    skipped = [s["page"] for s in signals if not s["candidate"]]
+    metrics.count(metrics.TABLE_PAGES, len(pages), result="scanned")
+    metrics.count(metrics.TABLE_PAGES, len(skipped), result="skipped")
+    tracing.trace(tracing.DEBUG, "table_page_signals", path=pdf_path,
+                  candidates=lambda: [s for s in signals if s["amounts"]])
+
+    start = time.perf_counter()
+    all_rows = read_table_rows(pdf_path, pages, workers)
+    camelot_seconds = time.perf_counter() - start
+
+    # Saving estimated from the camelot time per page read, net of the detection pass
+    saved = f"~{camelot_seconds / len(pages) * len(skipped) - detect_seconds:.2f}s" if pages else "n/a"
+    logger.info(f"🔎 Table pages of {pdf_path}: camelot read {page_spec(pages) or 'none'} in {camelot_seconds:.2f}s, "
+                f"skipped {len(skipped)} of {len(signals)} pages ({page_spec(skipped) or 'none'}) after a "
+                f"{detect_seconds:.2f}s detection pass, saving {saved}")
+    tracing.trace(tracing.INFO, "table_pages_detected", path=pdf_path, pages=len(signals), skipped=page_spec(skipped),
+                  detect_seconds=round(detect_seconds, 3), camelot_seconds=round(camelot_seconds, 3))
+    return all_rows
+
+def compare_table_extraction(pdf_path: str, workers: Optional[int] = None) -> dict:
+    """
+    Run table extraction over every page and over the detected pages only.
+
+    Returns:
+        Dict with both outputs, the pages skipped, seconds for detection and for
+        each camelot run, and the formatted rows found only by one of them
+    """
+    workers = workers or EXTRACT_WORKERS
+    start = time.perf_counter()
+    full_output = format_table_rows(read_table_rows(pdf_path, workers=workers))
+    full_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    signals = detect_table_pages(pdf_path, workers)
+    detect_seconds = time.perf_counter() - start
+    pages = [s["page"] for s in signals if s["candidate"]]
+    start = time.perf_counter()
+    detected_output = format_table_rows(read_table_rows(pdf_path, pages, workers))
+    detected_seconds = time.perf_counter() - start
+
+    full_rows = set((full_output or "").splitlines())
+    detected_rows = set((detected_output or "").splitlines())
+    return {
+        "pages": len(signals),
+        "skipped_pages": [s["page"] for s in signals if not s["candidate"]],
+        "full_seconds": round(full_seconds, 3),
+        "detect_seconds": round(detect_seconds, 3),
+        "detected_seconds": round(detected_seconds, 3),
+        "saved_seconds": round(full_seconds - detect_seconds - detected_seconds, 3),
+        "only_full": sorted(full_rows - detected_rows),
+        "only_detected": sorted(detected_rows - full_rows),
+        "full_output": full_output,
+        "detected_output": detected_output,
+    }
+
+def extract_structured_table_with_fallback(pdf_path: str, workers: Optional[int] = None,
+                                           page_detection: str = TABLE_PAGE_DETECTION) -> Optional[str]:
     """
     Extract structured tables from PDF with tier detection.
     
     Args:
         pdf_path: Path to PDF file
+        workers: Processes to shard camelot over (default EXTRACT_WORKERS)
+        page_detection: "on" to run camelot only on pages that look like tables,
+            "off" to read every page, or "compare" to do both, log the difference
+            and return the full result
         
     Returns:
         Formatted table text if successful, None otherwise
     """
-    def detect_tier_from_amounts(row: List[str]) -> Optional[str]:
-        """Detect insurance tier from numerical amounts in row"""
-        joined = " ".join(row).replace(",", "")
-        amounts = re.findall(r"\d{2,7}", joined)
-        if not amounts:
-            return None
-            
-        amounts = list(map(int, amounts))
-        
-        # Tier detection logic
-        if any(a in [25000, 100000, 200000] for a in amounts):
-            return "3L/4L/5L"
-        elif any(a in [50000, 175000, 350000] for a in amounts):
-            return "10L/15L/20L"
-        elif any(a in [75000, 250000, 500000] for a in amounts):
-            return ">20L"
-        return None
-
     try:
-        print(f"📑 Extracting tables from: {pdf_path}")
-        tables = camelot.read_pdf(pdf_path, pages='all', flavor='stream')
-
-        all_rows = []
-        sublimit_rows = []
-        found_urls = set()
-
-        # Process all tables found in the document
-        for table in tables:
-            cleaned = clean_table(table)
-            if cleaned:
-                all_rows.extend(cleaned)
-
-        # Analyze rows for insurance tiers
-        for row in all_rows:
-            row_clean = [c.strip().replace("`", "").replace("\n", " ") for c in row]
-            tier = detect_tier_from_amounts(row_clean)
-            if tier:
-                row_clean.insert(0, tier)
-                if len(row_clean) >= 3:  # Ensure we have at least tier + two data columns
-                    sublimit_rows.append(row_clean)
-            
-            # Extract URLs from table cells
-            found_urls.update(extract_urls(" ".join(row)))
+        tracing.trace(tracing.INFO, "extracting_tables", path=pdf_path)
+        workers = workers or EXTRACT_WORKERS
+
+        if page_detection == "compare":
+            comparison = compare_table_extraction(pdf_path, workers)
+            logger.info(f"🔎 Table page detection on {pdf_path}: skipped {len(comparison['skipped_pages'])} of "
+                        f"{comparison['pages']} pages, saved {comparison['saved_seconds']}s; rows only in the full "
+                        f"run: {len(comparison['only_full'])}, only with detection: {len(comparison['only_detected'])}")
+            tracing.trace(tracing.INFO, "table_detection_compared", path=pdf_path,
+                          **{k: v for k, v in comparison.items() if not k.endswith("_output")})
+            if comparison["full_output"] is None:
+                raise ValueError("No relevant table rows found with tier information")
+            return comparison["full_output"]
+
+        if page_detection == "on":
+            all_rows = _read_detected_table_rows(pdf_path, workers)
+        else:
+            all_rows = read_table_rows(pdf_path, workers=workers)
 
+        sublimit_rows, found_urls = _sublimit_rows(all_rows)
         if not sublimit_rows:
             raise ValueError("No relevant table rows found with tier information")
 
         # Format output
-        output = "\n".join([" | ".join(r) for r in sublimit_rows])
-        
-        if found_urls:
-            output += "\n\n🔗 URLs:\n" + "\n".join(sorted(found_urls))
-
-        print(f"\n📊 Extracted {len(sublimit_rows)} table rows from {pdf_path}")
-        if len(sublimit_rows) > 5:
-            print("First 5 rows:")
-            for row in sublimit_rows[:5]:
-                print(" | ".join(row))
-            print(f"... plus {len(sublimit_rows)-5} more rows")
-        else:
-            for row in sublimit_rows:
-                print(" | ".join(row))
+        output = _format_sublimit_rows(sublimit_rows, found_urls)
+
+        tracing.trace(tracing.INFO, "tables_extracted", path=pdf_path, rows=len(sublimit_rows))
+        tracing.trace(tracing.DEBUG, "table_rows_sample", path=pdf_path,
+                      first_rows=lambda: [" | ".join(row) for row in sublimit_rows[:5]])
 
         return output
 
     except Exception as e:
-        print(f"❌ Table extraction failed for {pdf_path}: {str(e)}")
+        logger.warning(f"❌ Table extraction failed for {pdf_path}: {str(e)}")
         return None
 
-def extract_text_and_urls_fallback(pdf_path: str) -> Optional[str]:
+def iter_page_texts(pdf_path: str, workers: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield the text of each page of a PDF in order, empty pages included.
+    
+    Args:
+        pdf_path: Path to PDF file
+        workers: Processes to shard page extraction over (default EXTRACT_WORKERS)
+        
+    Yields:
+        Page text, one string per page
+    """
+    workers = workers or EXTRACT_WORKERS
+    shards = page_shards(get_page_count(pdf_path), workers)
+    for shard_texts in _map_shards(_read_page_texts, pdf_path, shards, workers):
+        for page_text in shard_texts:
+            yield page_text or ""
+
+def extract_text_and_urls_fallback(pdf_path: str, workers: Optional[int] = None) -> Optional[str]:
     """
     Fallback text extraction using PyMuPDF when table extraction fails.
     
+    The whole text is built in memory, because the pipeline caches it and
+    chunks it as one string. Callers that only need to chunk pages can stream
+    them from `iter_page_texts` into chunker.chunk_stream instead.
+    
     Args:
         pdf_path: Path to PDF file
+        workers: Processes to shard page extraction over (default EXTRACT_WORKERS)
         
     Returns:
-        Extracted text with URLs if successful, None otherwise
+        Extracted text with URLs if successful, None otherwise; pages are
+        separated by chunker.PAGE_BREAK
     """
     try:
-        text = ""
+        page_texts = []
         urls = set()
-        
-        with fitz.open(pdf_path) as doc:
-            for page in doc:
-                page_text = page.get_text()
-                if page_text:
-                    text += page_text
-                    urls.update(extract_urls(page_text))
+        for page_text in iter_page_texts(pdf_path, workers):
+            page_texts.append(page_text)
+            urls.update(extract_urls(page_text))
+        # Empty pages are kept so the chunker can count pages
+        text = PAGE_BREAK.join(page_texts)
 
         if not text.strip():
             return None
 
-        output = text.strip()
+        output = text.rstrip()  # no leading strip: it would shift page offsets
         if urls:
             output += "\n\n🔗 URLs:\n" + "\n".join(sorted(urls))
 
-        print(f"\n📝 Extracted {len(text)} characters from {pdf_path}")
-        print("Sample text (first 300 chars):", text[:300] + ("..." if len(text) > 300 else ""))
-        
-        if urls:
-            print(f"🔗 Found {len(urls)} URLs in document")
+        tracing.trace(tracing.INFO, "text_extracted", path=pdf_path, characters=len(text), urls=len(urls))
+        tracing.trace(tracing.DEBUG, "text_sample", path=pdf_path,
+                      text=lambda: text[:300] + ("..." if len(text) > 300 else ""))
 
         return output
 
     except Exception as e:
-        print(f"❌ Fallback text extraction failed for {pdf_path}: {str(e)}")
+        logger.warning(f"❌ Fallback text extraction failed for {pdf_path}: {str(e)}")
         return None
\ No newline at end of file
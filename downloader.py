@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import threading
+import logging
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+PDF_STORAGE_DIR = os.getenv("PDF_STORAGE_DIR", "pdfs")
+DOWNLOAD_MAX_BYTES = int(os.getenv("DOWNLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+DOWNLOAD_CONNECT_TIMEOUT = float(os.getenv("DOWNLOAD_CONNECT_TIMEOUT", "10"))
+DOWNLOAD_READ_TIMEOUT = float(os.getenv("DOWNLOAD_READ_TIMEOUT", "60"))
+DOWNLOAD_POOL_SIZE = int(os.getenv("DOWNLOAD_POOL_SIZE", "16"))
+
+DOWNLOAD_INDEX_FILE = "download_index.json"
+CHUNK_BYTES = 64 * 1024
+
+
+class DownloadError(Exception):
+    """Raised when a document cannot be downloaded."""
+
+
+def _create_session() -> requests.Session:
+    session = requests.Session()
+    retries = Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504), allowed_methods=("GET", "HEAD"))
+    adapter = HTTPAdapter(pool_connections=DOWNLOAD_POOL_SIZE, pool_maxsize=DOWNLOAD_POOL_SIZE, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({
+        "User-Agent": "Mozilla/5.0",
+        "Accept": "application/pdf",
+    })
+    return session
+
+
+# One pooled session per process so repeated downloads reuse connections
+session = _create_session()
+
+_index_lock = threading.Lock()
+
+
+def _index_path() -> str:
+    return os.path.join(PDF_STORAGE_DIR, DOWNLOAD_INDEX_FILE)
+
+
+def _load_index() -> dict:
+    try:
+        with open(_index_path(), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_entry(url: str, entry: dict) -> None:
+    """Record the local path and validators for a URL."""
+    with _index_lock:
+        index = _load_index()
+        index[url] = entry
+        tmp_path = f"{_index_path()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, _index_path())
+
+
+def _local_path_for(url: str) -> str:
+    """Stable storage path for a URL, so re-downloads replace the same file."""
+    filename = os.path.basename(urlparse(url).path) or "document.pdf"
+    url_hash = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(PDF_STORAGE_DIR, f"{url_hash}_{filename}")
+
+
+def download(url: str, max_bytes: int = DOWNLOAD_MAX_BYTES, require_pdf: bool = False,
+             timeout: Optional[tuple] = None) -> str:
+    """
+    Download a document to PDF_STORAGE_DIR, streaming it to disk.
+
+    If the URL was downloaded before and the stored copy is still present and
+    within max_bytes, a conditional GET (If-None-Match / If-Modified-Since) is
+    sent and a 304 reply reuses the stored copy without transferring the body again.
+
+    Args:
+        url: HTTP(S) URL of the document
+        max_bytes: Abort downloads larger than this
+        require_pdf: Reject responses whose Content-Type is not a PDF
+        timeout: (connect, read) timeout in seconds
+
+    Returns:
+        Local path of the downloaded document
+
+    Raises:
+        DownloadError: If the request fails, the response is too large or not a PDF
+    """
+    os.makedirs(PDF_STORAGE_DIR, exist_ok=True)
+    timeout = timeout or (DOWNLOAD_CONNECT_TIMEOUT, DOWNLOAD_READ_TIMEOUT)
+
+    local_path = _local_path_for(url)
+    cached = _load_index().get(url)
+    headers = {}
+    # A stored copy over the limit (e.g. saved under a larger max_bytes) is fetched again, not revalidated
+    if cached and os.path.exists(cached["path"]) and os.path.getsize(cached["path"]) <= max_bytes:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    try:
+        with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+            if response.status_code == 304 and headers:
+                logger.info(f"Not modified, reusing {cached['path']}")
+                return cached["path"]
+            if response.status_code != 200:
+                raise DownloadError(f"Download failed for {url} with status {response.status_code}")
+
+            content_type = response.headers.get("Content-Type", "").lower()
+            if require_pdf and "pdf" not in content_type:
+                raise DownloadError(f"Content-Type not PDF: {content_type}")
+
+            content_length = response.headers.get("Content-Length")
+            if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+                raise DownloadError(f"Document too large: {content_length} bytes (limit {max_bytes})")
+
+            tmp_path = f"{local_path}.part{threading.get_ident()}"
+            received = 0
+            try:
+                with open(tmp_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=CHUNK_BYTES):
+                        received += len(chunk)
+                        if received > max_bytes:
+                            raise DownloadError(f"Document exceeds {max_bytes} bytes: {url}")
+                        f.write(chunk)
+                os.replace(tmp_path, local_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+
+            _save_entry(url, {
+                "path": local_path,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            })
+    except requests.RequestException as e:
+        raise DownloadError(f"Download error for {url}: {str(e)}") from e
+
+    logger.info(f"Saved {received} bytes to {local_path}")
+    return local_path
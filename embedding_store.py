@@ -0,0 +1,156 @@
+import fcntl
+import hashlib
+import os
+import re
+import threading
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "embedding_store")
+EMBEDDING_STORE_ENABLED = os.getenv("EMBEDDING_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+KEY_BYTES = 16  # truncated SHA-256; collisions are negligible at corpus scale
+INITIAL_CAPACITY = 4096
+
+
+def chunk_key(text: str, model_name: str) -> bytes:
+    """Key for a chunk: hash of the model name and whitespace-normalized text."""
+    normalized = re.sub(r"\s+", " ", text).strip()
+    return hashlib.sha256(f"{model_name}\x00{normalized}".encode("utf-8")).digest()[:KEY_BYTES]
+
+
+class EmbeddingStore:
+    """
+    Append-only store of chunk embeddings for one model.
+
+    Vectors live in a memory-mapped float32 matrix (`<name>.f32`); row i belongs
+    to the i-th key in `<name>.keys`, a flat file of fixed-size digests. Keys are
+    appended only after their vectors are flushed, and appends are serialized
+    with a file lock, so several processes can share one store directory.
+    """
+
+    def __init__(self, model_name: str, dim: int, store_dir: str = EMBEDDING_STORE_DIR):
+        self.model_name = model_name
+        self.dim = dim
+        os.makedirs(store_dir, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name).strip("_")
+        self.matrix_path = os.path.join(store_dir, f"{slug}.f32")
+        self.keys_path = os.path.join(store_dir, f"{slug}.keys")
+        self.lock_path = os.path.join(store_dir, f"{slug}.lock")
+
+        self._lock = threading.Lock()
+        self._rows: Dict[bytes, int] = {}
+        self._count = 0  # rows in the keys file, which may exceed len(self._rows) after a duplicate
+        self._matrix: Optional[np.memmap] = None
+        self._capacity = 0
+
+        with self._lock:
+            self._refresh()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _map(self, capacity: int) -> None:
+        """(Re)map the matrix file with room for at least `capacity` rows."""
+        row_bytes = self.dim * 4
+        current = os.path.getsize(self.matrix_path) // row_bytes if os.path.exists(self.matrix_path) else 0
+        if current < capacity:
+            with open(self.matrix_path, "ab") as f:
+                f.truncate(capacity * row_bytes)
+            current = capacity
+        self._matrix = np.memmap(self.matrix_path, dtype="float32", mode="r+", shape=(current, self.dim))
+        self._capacity = current
+
+    def _refresh(self) -> None:
+        """Pick up keys appended by other processes since the last refresh."""
+        if not os.path.exists(self.keys_path):
+            if self._matrix is None:
+                self._map(INITIAL_CAPACITY)
+            return
+
+        known = self._count
+        with open(self.keys_path, "rb") as f:
+            f.seek(known * KEY_BYTES)
+            data = f.read()
+        count = len(data) // KEY_BYTES
+        for i in range(count):
+            self._rows.setdefault(data[i * KEY_BYTES:(i + 1) * KEY_BYTES], known + i)
+
+        total = known + count
+        self._count = total
+        if self._matrix is None or total > self._capacity:
+            self._map(max(INITIAL_CAPACITY, total))
+
+    def lookup(self, keys: List[bytes]) -> Tuple[Dict[int, np.ndarray], List[int]]:
+        """
+        Find stored vectors for a list of keys.
+
+        Args:
+            keys: Keys from `chunk_key`
+
+        Returns:
+            Tuple containing:
+            - Map from position in `keys` to its stored vector
+            - Positions in `keys` with no stored vector
+        """
+        with self._lock:
+            self._refresh()
+            hits, misses = {}, []
+            for pos, key in enumerate(keys):
+                row = self._rows.get(key)
+                if row is None:
+                    misses.append(pos)
+                else:
+                    hits[pos] = np.array(self._matrix[row])
+            return hits, misses
+
+    def add(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        """
+        Append vectors for keys that are not stored yet.
+
+        Args:
+            keys: Keys from `chunk_key`
+            vectors: float32 matrix of shape (len(keys), dim)
+        """
+        with self._lock, open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                new = [(key, vec) for key, vec in zip(keys, vectors) if key not in self._rows]
+                new = list({key: vec for key, vec in new}.items())  # drop duplicates within the batch
+                if not new:
+                    return
+
+                start = self._count
+                if start + len(new) > self._capacity:
+                    self._matrix.flush()
+                    self._map(max(self._capacity * 2, start + len(new)))
+                for offset, (_, vec) in enumerate(new):
+                    self._matrix[start + offset] = vec
+                self._matrix.flush()
+
+                with open(self.keys_path, "ab") as f:
+                    f.write(b"".join(key for key, _ in new))
+                for offset, (key, _) in enumerate(new):
+                    self._rows[key] = start + offset
+                self._count = start + len(new)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+_stores: Dict[str, EmbeddingStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_embedding_store(model_name: str, dim: int) -> EmbeddingStore:
+    """Return the process-wide store for a model, opening it on first use."""
+    with _stores_lock:
+        store = _stores.get(model_name)
+        if store is None:
+            store = EmbeddingStore(model_name, dim)
+            _stores[model_name] = store
+        return store
@@ -1,40 +1,87 @@
 import os
-from dotenv import load_dotenv
-import google.generativeai as genai
 import re
+import json
+import threading
+from dotenv import load_dotenv
+from llm_pool import TokenBucket, LLM_CALL_TIMEOUT
+from startup import lazy_import, timed_init
+import metrics
+import tracing
 
 load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise EnvironmentError("Missing GEMINI_API_KEY in .env")
-genai.configure(api_key=api_key)
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-1.5-flash")
 
-model = genai.GenerativeModel(model_name="gemini-1.5-flash")
+genai = lazy_import("google.generativeai")
 
-def get_gemini_response(question: str, context_chunks: list[str]) -> str:
-    context = "\n---\n".join(context_chunks)
+# Configured on first use (or by the warm-up), so importing this module needs no API key
+model = None
+_model_lock = threading.Lock()
 
-    sum_insured_match = re.search(r'(\d+(?:\.\d+)?)\s*[Ll]', question)
-    sum_insured = f"{sum_insured_match.group(1)}L" if sum_insured_match else "unknown"
+# Shared across worker threads so concurrent questions stay under the provider's rate limit
+rate_limiter = TokenBucket()
 
-    prompt = f"""
-You are a health insurance expert assistant.
+def get_model():
+    """
+    The Gemini model, configuring the client on first use.
 
-Use ONLY the provided document excerpts to answer the question. Do not guess or assume. Extract the answer *verbatim* from the excerpts.
+    Raises:
+        EnvironmentError: If GEMINI_API_KEY is not set
+    """
+    global model
+    if model is not None:
+        return model
+    with _model_lock:
+        if model is None:
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                raise EnvironmentError("Missing GEMINI_API_KEY in .env")
+            with timed_init("gemini_client"):
+                genai.configure(api_key=api_key)
+                model = genai.GenerativeModel(model_name=GEMINI_MODEL_NAME)
+        return model
 
-### Sum Insured: {sum_insured}
+def set_model(new_model) -> None:
+    """
+    Replace the Gemini model, e.g. with a local stub in tests or benchmarks.
+
+    The replacement needs a `generate_content(prompt, request_options=..., generation_config=...)`
+    method returning an object with a `.text` attribute.
+    """
+    global model
+    model = new_model
+
+PROMPT_INTRO = """You are a health insurance expert assistant.
+
+Use ONLY the provided document excerpts to answer the question. Do not guess or assume. Extract the answer *verbatim* from the excerpts."""
 
-### Rules for Matching Table Entries:
+MATCHING_RULES = """### Rules for Matching Table Entries:
 - If the sum insured is **3L**, **4L**, or **5L** → match row labeled: **"3L/4L/5L"**
 - If it's **10L**, **15L**, or **20L** → match: **"10L/15L/20L"**
 - If it's **above 20L** → match: **">20L"**
 - Do **not** match the wrong tier. Answer only if you find an exact tier.
 - If a treatment name appears (e.g., cataract, cancer, robotic surgery), use the exact associated amount for the correct tier.
-- If the answer is not explicitly stated, but strongly implied from the excerpts, explain using the original wording. If there's no match, say: ❌ The document does not specify this.
+- If the answer is not explicitly stated, but strongly implied from the excerpts, explain using the original wording. If there's no match, say: ❌ The document does not specify this."""
+
+ANSWER_FORMAT = """✅ Yes, [treatment] is covered, up to ₹[amount].
+❌ The document does not specify this."""
+
+def sum_insured_of(question: str) -> str:
+    sum_insured_match = re.search(r'(\d+(?:\.\d+)?)\s*[Ll]', question)
+    return f"{sum_insured_match.group(1)}L" if sum_insured_match else "unknown"
+
+def build_prompt(question: str, context_chunks: list[str]) -> str:
+    context = "\n---\n".join(context_chunks)
+    sum_insured = sum_insured_of(question)
+
+    prompt = f"""
+{PROMPT_INTRO}
+
+### Sum Insured: {sum_insured}
+
+{MATCHING_RULES}
 
 ### Format:
-✅ Yes, [treatment] is covered, up to ₹[amount].
-❌ The document does not specify this.
+{ANSWER_FORMAT}
 
 ### Question:
 {question}
@@ -42,7 +89,87 @@ Use ONLY the provided document excerpts to answer the question. Do not guess or
 ### Document Excerpts:
 {context}
 """
+    return prompt
+
+def build_batch_prompt(questions: list[str], context_chunks: list[str]) -> str:
+    """
+    One prompt for several questions sharing the same excerpts, asking for a JSON reply.
+
+    The instructions and excerpts appear once; each question is numbered from 1
+    and carries its own sum insured.
+    """
+    context = "\n---\n".join(context_chunks)
+    numbered = "\n".join(f"{i}. (Sum Insured: {sum_insured_of(q)}) {q}" for i, q in enumerate(questions, 1))
+
+    prompt = f"""
+{PROMPT_INTRO} Answer every question independently, using the sum insured stated with it.
+
+{MATCHING_RULES}
+
+### Format:
+Reply with JSON only: {{"answers": [{{"id": <question number>, "answer": "<answer>"}}, ...]}}, one entry per question.
+Each answer is one of:
+{ANSWER_FORMAT}
+
+### Questions:
+{numbered}
 
-    print("🧾 DEBUG: Prompt Sent to Gemini (truncated):\n", prompt[:1200], "\n...\n")
-    response = model.generate_content(prompt)
+### Document Excerpts:
+{context}
+"""
+    return prompt
+
+def parse_batch_answers(text: str, count: int) -> dict[int, str]:
+    """
+    Answers from a JSON reply to `build_batch_prompt`, by 0-based question index.
+
+    Entries that are missing, malformed or out of range are left out, so the
+    caller can retry those questions on their own; an unparseable reply gives {}.
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`").split("\n", 1)[-1]  # drop a ```json fence
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return {}
+    entries = data.get("answers") if isinstance(data, dict) else data
+    answers = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict) or not isinstance(entry.get("answer"), str):
+            continue
+        try:
+            index = int(entry.get("id")) - 1
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < count:
+            answers.setdefault(index, entry["answer"].strip())
+    return answers
+
+def get_gemini_response(question: str, context_chunks: list[str]) -> str:
+    prompt = build_prompt(question, context_chunks)
+    tracing.trace(tracing.DEBUG, "llm_prompt", question=question, prompt=lambda: prompt[:1200])
+    if not rate_limiter.acquire(timeout=LLM_CALL_TIMEOUT):
+        raise TimeoutError("Timed out waiting for the LLM rate limiter")
+    metrics.count(metrics.LLM_CALLS)
+    with metrics.timed("llm"):
+        response = get_model().generate_content(prompt, request_options={"timeout": LLM_CALL_TIMEOUT})
     return response.text.strip()
+
+def get_gemini_batch_response(questions: list[str], context_chunks: list[str]) -> dict[int, str]:
+    """
+    Answer several questions about the same excerpts in one call.
+
+    Returns:
+        Raw answers by 0-based question index; questions the reply did not answer
+        in the expected JSON are missing
+    """
+    prompt = build_batch_prompt(questions, context_chunks)
+    tracing.trace(tracing.DEBUG, "llm_batch_prompt", questions=questions, prompt=lambda: prompt[:1200])
+    if not rate_limiter.acquire(timeout=LLM_CALL_TIMEOUT):
+        raise TimeoutError("Timed out waiting for the LLM rate limiter")
+    metrics.count(metrics.LLM_CALLS)
+    with metrics.timed("llm"):
+        response = get_model().generate_content(prompt, request_options={"timeout": LLM_CALL_TIMEOUT},
+                                                generation_config={"response_mime_type": "application/json"})
+    return parse_batch_answers(response.text, len(questions))
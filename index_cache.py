@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import logging
+from typing import List, Optional
+
+from chunker import Chunk
+from document_loader import TABLE_PAGE_DETECTION
+from lexical_index import LexicalIndex
+from model_registry import embedding_model_id
+from startup import lazy_import
+from vectorizer import CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS, INDEX_TYPE, EMBEDDING_STORAGE
+
+faiss = lazy_import("faiss")
+
+logger = logging.getLogger(__name__)
+
+INDEX_CACHE_DIR = os.getenv("INDEX_CACHE_DIR", "index_cache")
+INDEX_CACHE_MAX_BYTES = int(os.getenv("INDEX_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+# Bump when the layout of a cache entry changes so stale entries are never read
+CACHE_FORMAT_VERSION = 3
+
+META_FILE = "meta.json"
+INDEX_FILE = "index.faiss"
+LEXICAL_FILE = "lexical.npz"
+
+
+def document_cache_key(pdf_path: str) -> str:
+    """
+    SHA-256 of the PDF bytes plus every setting that affects the cached output.
+
+    Args:
+        pdf_path: Path to PDF file
+
+    Returns:
+        Hex digest identifying the cache entry
+    """
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    settings = (f"v{CACHE_FORMAT_VERSION}|{embedding_model_id()}|{CHUNK_TOKENS}|{CHUNK_OVERLAP_TOKENS}|{INDEX_TYPE}"
+                f"|{EMBEDDING_STORAGE}|{TABLE_PAGE_DETECTION}")
+    digest.update(settings.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _read_index(path: str) -> faiss.Index:
+    """Read a FAISS index, memory-mapping it when this FAISS build supports it."""
+    for flag_name in ("IO_FLAG_MMAP_IFC", "IO_FLAG_MMAP"):
+        flag = getattr(faiss, flag_name, None)
+        if flag is None:
+            continue
+        try:
+            return faiss.read_index(path, flag | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            continue
+    return faiss.read_index(path)
+
+
+class IndexCache:
+    """
+    On-disk cache of extracted text, chunks, FAISS and BM25 indexes per document.
+
+    Each entry is a directory named after its key holding `meta.json`,
+    `index.faiss` and `lexical.npz`. An entry's mtime records its last use;
+    when the total size exceeds `max_bytes` the least recently used entries
+    are deleted.
+    """
+
+    def __init__(self, cache_dir: str = INDEX_CACHE_DIR, max_bytes: int = INDEX_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key: str, source: Optional[str] = None) -> Optional[dict]:
+        """
+        Look up a cache entry.
+
+        Args:
+            key: Key from `document_cache_key`
+            source: Document path recorded on the returned chunk records
+
+        Returns:
+            Dict with table_text, fallback_text, chunks, chunk_records, index and
+            lexical_index, or None on a miss
+        """
+        entry_dir = self._entry_dir(key)
+        meta_path = os.path.join(entry_dir, META_FILE)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            provenance = meta.pop("provenance")
+            index = _read_index(os.path.join(entry_dir, INDEX_FILE))
+            lexical_index = LexicalIndex.load(os.path.join(entry_dir, LEXICAL_FILE))
+            os.utime(entry_dir)  # mark as recently used
+        except (OSError, ValueError, KeyError, RuntimeError):
+            return None
+
+        meta["chunk_records"] = [
+            Chunk(text, source, **fields) for text, fields in zip(meta["chunks"], provenance)
+        ]
+        meta["index"] = index
+        meta["lexical_index"] = lexical_index
+        return meta
+
+    def put(self, key: str, table_text: Optional[str], fallback_text: Optional[str],
+            chunks: List[str], index: faiss.Index, lexical_index: LexicalIndex,
+            chunk_records: List[Chunk]) -> None:
+        """
+        Store an entry, then evict least recently used entries over the byte budget.
+
+        Args:
+            key: Key from `document_cache_key`
+            table_text: Extracted structured table text
+            fallback_text: Fallback extracted text
+            chunks: Text chunks the index was built from
+            index: FAISS index over `chunks`
+            lexical_index: BM25 index over `chunks`
+            chunk_records: Chunk records matching `chunks`; their offsets and pages are stored
+        """
+        entry_dir = self._entry_dir(key)
+        tmp_dir = f"{entry_dir}.tmp{os.getpid()}_{threading.get_ident()}"
+        try:
+            os.makedirs(tmp_dir, exist_ok=True)
+            with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+                json.dump({
+                    "table_text": table_text,
+                    "fallback_text": fallback_text,
+                    "chunks": chunks,
+                    # The source path is per request, the content key is not
+                    "provenance": [
+                        {name: value for name, value in record.provenance().items() if name != "source"}
+                        for record in chunk_records
+                    ],
+                }, f, ensure_ascii=False)
+            faiss.write_index(index, os.path.join(tmp_dir, INDEX_FILE))
+            lexical_index.save(os.path.join(tmp_dir, LEXICAL_FILE))
+            # Publish the finished entry in one step so readers never see a partial one
+            os.replace(tmp_dir, entry_dir)
+        except (OSError, RuntimeError) as e:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not os.path.isdir(entry_dir):  # otherwise another request stored it first
+                logger.warning(f"Failed to write index cache entry {key}: {e}")
+            return
+
+        self._evict()
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if ".tmp" in name or not os.path.isdir(path):
+                    continue
+                try:
+                    size = sum(entry.stat().st_size for entry in os.scandir(path))
+                    entries.append((os.stat(path).st_mtime, size, path))
+                except OSError:
+                    continue
+                total += size
+
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+                logger.info(f"Evicted index cache entry {os.path.basename(path)}")
@@ -0,0 +1,242 @@
+import os
+import queue
+import contextvars
+import threading
+import time
+import uuid
+import logging
+from typing import Dict, Iterator, List, Optional
+
+from qa_service import run_qa, ProgressReporter, QAError, Cancelled
+
+logger = logging.getLogger(__name__)
+
+# Every QA request, synchronous /hackrx/run included, runs as a job: at most JOB_WORKERS
+# run at once, and once JOB_QUEUE_SIZE more are waiting new requests get 503 + Retry-After
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "16"))
+JOB_ABANDON_SECONDS = float(os.getenv("JOB_ABANDON_SECONDS", "300"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+FINISHED = ("done", "failed", "cancelled")
+CANCELLED_STATUS = 409  # HTTP status reported for a job cancelled by DELETE or as abandoned
+
+
+class QueueFull(Exception):
+    """Raised when the job queue is at capacity."""
+
+
+class Job(ProgressReporter):
+    """A queued QA request and its progress."""
+
+    def __init__(self, doc_paths: List[str], questions: List[str], include_timings: bool = False):
+        self.id = uuid.uuid4().hex
+        self.doc_paths = doc_paths
+        self.questions = questions
+        self.include_timings = include_timings
+        self.context = contextvars.copy_context()  # carries the submitter's trace settings
+        self.status = "queued"
+        self.created = time.time()
+        self.last_polled = self.created
+        self.finished: Optional[float] = None
+        self.stages: Dict[str, dict] = {}
+        self.question_status = [{"status": "queued", "answer": None} for _ in questions]
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.error_status = 500
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+        self._lock = threading.Lock()
+        self._events: List[dict] = []  # streamed to the client by iter_events
+        self._changed = threading.Condition(self._lock)
+
+    def _emit(self, event: dict) -> None:
+        """Append a stream event; the caller holds self._lock."""
+        self._events.append(event)
+        self._changed.notify_all()
+
+    def stage(self, name: str, status: str, seconds: Optional[float] = None, details: Optional[dict] = None) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(name, {"status": status, "started": time.time()})
+            entry["status"] = status
+            entry.update(details or {})
+            if status == "done":
+                entry["seconds"] = round(seconds if seconds is not None else time.time() - entry["started"], 3)
+                self._emit({"event": "stage", "stage": name, **{k: v for k, v in entry.items() if k != "started"}})
+
+    def question(self, question: str, status: str, answer: Optional[str] = None) -> None:
+        with self._lock:
+            for q, entry in zip(self.questions, self.question_status):
+                if q == question:
+                    entry["status"] = status
+                    if answer is not None:
+                        entry["answer"] = answer
+
+    def answered(self, index: int, answer: str) -> None:
+        with self._lock:
+            self._emit({"event": "answer", "index": index, "question": self.questions[index], "answer": answer})
+
+    def is_cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def touch(self) -> None:
+        """Record that a client is still interested in this job."""
+        self.last_polled = time.time()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes, keeping it from being treated as abandoned."""
+        deadline = None if timeout is None else time.time() + timeout
+        while not self._finished.wait(1.0):
+            self.touch()
+            if deadline is not None and time.time() > deadline:
+                return False
+        return True
+
+    def iter_events(self) -> Iterator[dict]:
+        """
+        Progress events as they happen, ending with a "done" or "error" event.
+
+        Yields a "stage" event as each stage finishes (the "ingest" one carries
+        the document counts), an "answer" event per question in completion order,
+        tagged with the question's index, then "done" with the rest of the result
+        (answers were already sent) or "error" with the message and HTTP status.
+        Waiting keeps the job from being treated as abandoned.
+        """
+        sent = 0
+        while True:
+            with self._lock:
+                while sent == len(self._events):
+                    if not self._changed.wait(1.0):
+                        self.last_polled = time.time()
+                pending = self._events[sent:]
+            for event in pending:
+                yield event
+                if event["event"] in ("done", "error"):
+                    return
+            sent += len(pending)
+
+    def _start(self) -> None:
+        with self._lock:
+            self.status = "running"
+
+    def _finish(self, status: str, error: Optional[str] = None, error_status: int = 500) -> None:
+        with self._lock:
+            self.status = status
+            self.finished = time.time()
+            if status == "cancelled":
+                self.error_status = CANCELLED_STATUS
+            elif status == "failed":
+                self.error, self.error_status = error, error_status
+            if status == "done":
+                self._emit({"event": "done", **{k: v for k, v in self.result.items() if k != "answers"}})
+            else:
+                self._emit({"event": "error", "error": self.error or "Request was cancelled",
+                            "status": self.error_status})
+        self._finished.set()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            questions = [
+                {"index": i, "question": q, **entry}
+                for i, (q, entry) in enumerate(zip(self.questions, self.question_status))
+            ]
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "created": self.created,
+                "finished": self.finished,
+                "stages": {name: dict(entry) for name, entry in self.stages.items()},
+                "questions": questions,
+                "questions_done": sum(1 for entry in self.question_status if entry["status"] == "done"),
+                "result": self.result,
+                "error": self.error,
+            }
+
+
+class JobManager:
+    """
+    In-process job queue served by a fixed pool of worker threads.
+
+    `submit` raises QueueFull once JOB_QUEUE_SIZE jobs are waiting, so clients get
+    backpressure instead of an ever-growing backlog. Jobs nobody has polled for
+    JOB_ABANDON_SECONDS are cancelled, and finished jobs are forgotten after
+    JOB_RETENTION_SECONDS.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, queue_size: int = JOB_QUEUE_SIZE):
+        self._queue: "queue.Queue[Job]" = queue.Queue(maxsize=queue_size)
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True).start()
+        threading.Thread(target=self._reap, name="job-reaper", daemon=True).start()
+
+    def submit(self, doc_paths: List[str], questions: List[str], include_timings: bool = False) -> Job:
+        job = Job(doc_paths, questions, include_timings)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+            raise QueueFull()
+        logger.info(f"Queued job {job.id} ({self._queue.qsize()} waiting)")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            job.touch()
+        return job
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is not None and job.status not in FINISHED:
+            job.cancel()
+        return job
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: Job) -> None:
+        if job.is_cancelled():
+            job._finish("cancelled")
+            return
+
+        job._start()
+        try:
+            job.result = job.context.run(run_qa, job.doc_paths, job.questions, job, job.include_timings)
+            job._finish("cancelled" if job.is_cancelled() else "done")
+        except Cancelled:
+            logger.info(f"Job {job.id} cancelled")
+            job._finish("cancelled")
+        except QAError as e:
+            job._finish("failed", e.message, e.status)
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {str(e)}", exc_info=True)
+            job._finish("failed", str(e))
+
+    def _reap(self) -> None:
+        while True:
+            time.sleep(5)
+            now = time.time()
+            with self._lock:
+                jobs = list(self._jobs.values())
+            for job in jobs:
+                if job.status in FINISHED:
+                    if now - job.finished > JOB_RETENTION_SECONDS:
+                        with self._lock:
+                            self._jobs.pop(job.id, None)
+                elif now - job.last_polled > JOB_ABANDON_SECONDS and not job.is_cancelled():
+                    logger.info(f"Cancelling abandoned job {job.id}")
+                    job.cancel()
@@ -0,0 +1,169 @@
+import os
+import re
+import logging
+from collections import Counter
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it of on or that the this to was were will with".split()
+)
+
+# Words, numbers and slash-joined tier labels such as "3l/4l/5l"
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:/[a-z0-9]+)*")
+_THOUSANDS_RE = re.compile(r"(?<=\d),(?=\d)")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased terms for BM25.
+
+    Thousands separators are dropped so "2,00,000" and "200000" match, and a
+    tier label like "3L/4L/5L" yields both the whole label and each part, so a
+    question about a "5L policy" matches its row.
+    """
+    tokens = []
+    for match in _TOKEN_RE.findall(_THOUSANDS_RE.sub("", text.lower())):
+        if "/" in match:
+            tokens.append(match)
+            tokens.extend(part for part in match.split("/") if part)
+        elif match not in STOPWORDS:
+            tokens.append(match)
+    return tokens
+
+
+class LexicalIndex:
+    """
+    BM25 index over chunks with array-backed postings.
+
+    Postings are stored CSR-style: the postings of term `t` are
+    `doc_ids[offsets[t]:offsets[t + 1]]` with matching term frequencies in
+    `tfs`. The per-posting BM25 weights are precomputed, so scoring a query is
+    one vectorized add per query term.
+    """
+
+    def __init__(self, terms: List[str], offsets: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray,
+                 doc_lens: np.ndarray, k1: float = BM25_K1, b: float = BM25_B):
+        self.terms = list(terms)
+        self.term_ids = {term: i for i, term in enumerate(self.terms)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_lens = doc_lens
+        self.k1 = k1
+        self.b = b
+        self._weights = self._bm25_weights()
+
+    @property
+    def ntotal(self) -> int:
+        """Number of indexed chunks, like faiss.Index.ntotal."""
+        return len(self.doc_lens)
+
+    @classmethod
+    def build(cls, chunks: Sequence[str]) -> "LexicalIndex":
+        """Index `chunks`; chunk ids are their positions, matching the FAISS index."""
+        vocab = {}
+        term_col, doc_col, tf_col = [], [], []
+        doc_lens = np.zeros(len(chunks), dtype="float32")
+        for doc, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk))
+            doc_lens[doc] = sum(counts.values())
+            for term, tf in counts.items():
+                term_col.append(vocab.setdefault(term, len(vocab)))
+                doc_col.append(doc)
+                tf_col.append(tf)
+
+        terms = sorted(vocab, key=vocab.get)
+        return cls._from_postings(
+            terms, np.array(term_col, dtype="int32"), np.array(doc_col, dtype="int32"),
+            np.array(tf_col, dtype="float32"), doc_lens,
+        )
+
+    @classmethod
+    def _from_postings(cls, terms: List[str], term_ids: np.ndarray, doc_ids: np.ndarray,
+                       tfs: np.ndarray, doc_lens: np.ndarray) -> "LexicalIndex":
+        order = np.lexsort((doc_ids, term_ids))  # group by term, documents ascending
+        offsets = np.zeros(len(terms) + 1, dtype="int64")
+        np.cumsum(np.bincount(term_ids, minlength=len(terms)), out=offsets[1:])
+        return cls(terms, offsets, doc_ids[order], tfs[order], doc_lens)
+
+    @classmethod
+    def merge(cls, indexes: List["LexicalIndex"]) -> "LexicalIndex":
+        """Concatenate per-document indexes, offsetting chunk ids in order like `merge_indexes`."""
+        vocab = {}
+        term_cols, doc_cols, tf_cols, lens = [], [], [], []
+        base = 0
+        for index in indexes:
+            remap = np.array([vocab.setdefault(term, len(vocab)) for term in index.terms], dtype="int32")
+            term_cols.append(remap[np.repeat(np.arange(len(index.terms)), np.diff(index.offsets))])
+            doc_cols.append(index.doc_ids + base)
+            tf_cols.append(index.tfs)
+            lens.append(index.doc_lens)
+            base += index.ntotal
+
+        terms = sorted(vocab, key=vocab.get)
+        return cls._from_postings(
+            terms, np.concatenate(term_cols or [np.zeros(0, dtype="int32")]),
+            np.concatenate(doc_cols or [np.zeros(0, dtype="int32")]).astype("int32"),
+            np.concatenate(tf_cols or [np.zeros(0, dtype="float32")]),
+            np.concatenate(lens or [np.zeros(0, dtype="float32")]),
+        )
+
+    def _bm25_weights(self) -> np.ndarray:
+        if not len(self.doc_ids):
+            return np.zeros(0, dtype="float32")
+        df = np.diff(self.offsets).astype("float32")
+        idf = np.log1p((self.ntotal - df + 0.5) / (df + 0.5))
+        avgdl = max(float(self.doc_lens.mean()), 1e-9)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lens[self.doc_ids] / avgdl)
+        return (np.repeat(idf, np.diff(self.offsets)) * self.tfs * (self.k1 + 1) / (self.tfs + norm)).astype("float32")
+
+    def score(self, query: str) -> np.ndarray:
+        """BM25 score of every chunk for `query`."""
+        scores = np.zeros(self.ntotal, dtype="float32")
+        for term in set(tokenize(query)):
+            t = self.term_ids.get(term)
+            if t is None:
+                continue
+            start, end = self.offsets[t], self.offsets[t + 1]
+            scores[self.doc_ids[start:end]] += self._weights[start:end]
+        return scores
+
+    def search(self, queries: Sequence[str], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k chunks per query.
+
+        Args:
+            queries: Query strings
+            k: Results per query
+
+        Returns:
+            (scores, ids) shaped (len(queries), k), best first, like faiss.Index.search;
+            ids are -1 where fewer than k chunks share a term with the query
+        """
+        D = np.zeros((len(queries), k), dtype="float32")
+        I = np.full((len(queries), k), -1, dtype="int64")
+        for row, query in enumerate(queries):
+            scores = self.score(query)
+            matched = np.flatnonzero(scores)
+            if len(matched) > k:
+                matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+            top = matched[np.argsort(-scores[matched], kind="stable")]
+            D[row, :len(top)] = scores[top]
+            I[row, :len(top)] = top
+        return D, I
+
+    def save(self, path: str) -> None:
+        np.savez(path, terms=np.array(self.terms, dtype=str), offsets=self.offsets,
+                 doc_ids=self.doc_ids, tfs=self.tfs, doc_lens=self.doc_lens)
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["terms"].tolist(), data["offsets"], data["doc_ids"], data["tfs"], data["doc_lens"])
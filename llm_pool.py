@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_WORKERS = int(os.getenv("LLM_MAX_WORKERS", "4"))
+LLM_CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", "60"))
+LLM_RATE_PER_SEC = float(os.getenv("LLM_RATE_PER_SEC", "5"))
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "5"))
+
+DEFAULT_ANSWER = "The document does not specify this."
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens are added per second up to `capacity`.
+    """
+
+    def __init__(self, rate: float = LLM_RATE_PER_SEC, capacity: int = LLM_RATE_BURST):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Take one token, waiting for it to become available.
+
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            True if a token was taken, False if the timeout expired first
+        """
+        if self.rate <= 0:
+            return True  # rate limiting disabled
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+# Shared by every request so LLM_MAX_WORKERS bounds concurrent LLM calls process-wide
+_executor = ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS, thread_name_prefix="llm")
+
+
+def iter_answers(questions: Sequence[T], answer_fn: Callable[[T], R],
+                 timeout: Optional[float] = None, default: R = DEFAULT_ANSWER) -> Iterator[Tuple[int, R]]:
+    """
+    Answer questions concurrently on the shared LLM worker pool, yielding each answer as soon as it is ready.
+
+    Args:
+        questions: Questions (or groups of questions) to answer
+        answer_fn: Produces the answer for one of them
+        timeout: Overall seconds to wait for all answers, or None to wait for all
+        default: Answer used when a question fails or times out
+
+    Returns:
+        Iterator of (question index, answer) in completion order; every index is yielded exactly once
+    """
+    futures = {metrics.submit_in_context(_executor, answer_fn, q): i for i, q in enumerate(questions)}
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            pending.discard(future)
+            i = futures[future]
+            try:
+                answer = future.result()
+            except Exception as err:
+                logger.error(f"Error answering question {questions[i]}: {str(err)}", exc_info=True)
+                answer = default
+            yield i, answer
+    except FutureTimeoutError:
+        for future in sorted(pending, key=futures.get):
+            future.cancel()
+            logger.error(f"Timed out answering question: {questions[futures[future]]}")
+            yield futures[future], default
+
+
+def answer_questions(questions: List[str], answer_fn: Callable[[str], str],
+                     timeout: Optional[float] = None, default: str = DEFAULT_ANSWER) -> List[str]:
+    """
+    Answer questions concurrently on the shared LLM worker pool.
+
+    Args:
+        questions: Questions to answer
+        answer_fn: Produces the answer for one question
+        timeout: Overall seconds to wait for all answers, or None to wait for all
+        default: Answer used when a question fails or times out
+
+    Returns:
+        Answers in the same order as `questions`
+    """
+    answers = [default] * len(questions)
+    for i, answer in iter_answers(questions, answer_fn, timeout, default):
+        answers[i] = answer
+    return answers
@@ -0,0 +1,193 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Stages of a QA request, each with its own latency histogram series
+STAGES = ("download", "table_extract", "text_extract", "chunk", "encode", "index_build", "search", "rerank", "llm")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_registry: List["_Metric"] = []
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing total, optionally split by labels."""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed cumulative buckets."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            position = bisect.bisect_left(self.buckets, value)
+            if position < len(self.buckets):
+                series[position] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    bucket_labels = _format_labels(self.labels, key, 'le="%s"' % bound)
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                inf_labels = _format_labels(self.labels, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf_labels} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {series[-1]}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("docqa_stage_seconds", "Time spent in each QA pipeline stage", ("stage",))
+REQUEST_SECONDS = Histogram("docqa_request_seconds", "End-to-end time to answer a QA request")
+CACHE_LOOKUPS = Counter("docqa_cache_lookups_total", "Cache lookups by cache and result", ("cache", "result"))
+DOCUMENT_BYTES = Counter("docqa_document_bytes_total", "Bytes of documents ingested")
+DOCUMENTS = Counter("docqa_documents_total", "Documents ingested by outcome", ("result",))
+CHUNKS = Counter("docqa_chunks_total", "Text chunks created")
+PROMPT_TOKENS = Counter("docqa_prompt_tokens_total", "Prompt tokens sent to the LLM")
+TABLE_PAGES = Counter("docqa_table_pages_total", "PDF pages camelot scanned or skipped after table detection", ("result",))
+LLM_CALLS = Counter("docqa_llm_calls_total", "LLM calls made")
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class RequestTimings:
+    """Per-request totals of stage seconds and counters, safe to update from worker threads."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._stages: Dict[str, float] = {}
+        self._counts: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._stages[stage] = self._stages.get(stage, 0.0) + seconds
+
+    def add_count(self, name: str, amount: float) -> None:
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "total_seconds": round(time.perf_counter() - self.started, 3),
+                "stage_seconds": {stage: round(seconds, 3) for stage, seconds in self._stages.items()},
+                "counts": dict(self._counts),
+            }
+
+
+_current: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def request_timings() -> Iterator[RequestTimings]:
+    """Collect a per-request breakdown for everything run in this context."""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+        REQUEST_SECONDS.observe(time.perf_counter() - timings.started)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """Record time spent in a stage, in the histogram and in the current request's breakdown."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _current.get()
+    if timings is not None:
+        timings.add_stage(stage, seconds)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time the enclosed block as `stage`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def count(counter: Counter, amount: float = 1, **labels: str) -> None:
+    """Increment a counter and the current request's matching count."""
+    counter.inc(amount, **labels)
+    timings = _current.get()
+    if timings is not None:
+        # e.g. docqa_cache_lookups_total{cache="index",result="hit"} -> cache_lookups_index_hit
+        parts = [counter.name[len("docqa_"):-len("_total")]] + [labels.get(name, "") for name in counter.labels]
+        timings.add_count("_".join(parts), amount)
+
+
+def submit_in_context(executor, fn, *args, context: Optional[contextvars.Context] = None):
+    """
+    Submit to an executor so the task sees the current request's timings.
+
+    Pass `context` (from contextvars.copy_context()) when submitting from a
+    callback that runs outside the request's context.
+    """
+    context = context.copy() if context is not None else contextvars.copy_context()
+    return executor.submit(context.run, fn, *args)
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import os
+import resource
+import threading
+import time
+import logging
+from typing import TYPE_CHECKING, Callable, Dict, Optional
+
+from startup import lazy_import, timed_init
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer, CrossEncoder
+
+# Imported on first use; sentence_transformers brings in torch and transformers
+torch = lazy_import("torch")
+sentence_transformers = lazy_import("sentence_transformers")
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "cpu")
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", "./model_cache")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")    # see EMBEDDING_BACKENDS
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))   # intra-op threads for encoding, 0 = library default
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "")     # e.g. "onnx/model_qint8_avx512_vnni.onnx"
+
+# One model instance per (name, device) for the whole process. SentenceTransformer.encode
+# is safe to call from several threads at once, so the instance is shared as-is. Under a
+# pre-forking server (e.g. gunicorn --preload) a model warmed up in the master is inherited
+# copy-on-write by every worker; otherwise each worker process loads it once on first use.
+_models: Dict[tuple, SentenceTransformer] = {}
+_cross_encoders: Dict[tuple, CrossEncoder] = {}
+_stats: Dict[tuple, dict] = {}
+_lock = threading.Lock()
+
+
+def _max_rss_bytes() -> int:
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _model_nbytes(model: SentenceTransformer) -> int:
+    """Bytes held by the model's torch weights, including packed int8 ones (0 for ONNX models)."""
+    total = 0
+    for value in model.state_dict().values():
+        for tensor in value if isinstance(value, tuple) else (value,):
+            if isinstance(tensor, torch.Tensor):
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def _load_torch(name: str, device: str, threads: int) -> SentenceTransformer:
+    """The reference sentence-transformers PyTorch model."""
+    if threads:
+        torch.set_num_threads(threads)  # process-wide
+    return sentence_transformers.SentenceTransformer(name, device=device, cache_folder=MODEL_CACHE_DIR)
+
+
+def _load_torch_int8(name: str, device: str, threads: int) -> SentenceTransformer:
+    """PyTorch model with its Linear layers dynamically quantized to int8 (CPU only)."""
+    if device != "cpu":
+        raise ValueError("The torch_int8 embedding backend only runs on CPU")
+    model = _load_torch(name, device, threads)
+    torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+
+def _load_onnx(name: str, device: str, threads: int) -> SentenceTransformer:
+    """ONNX Runtime model via sentence-transformers (needs `sentence-transformers[onnx]`)."""
+    model_kwargs = {"provider": "CUDAExecutionProvider" if device.startswith("cuda") else "CPUExecutionProvider"}
+    if EMBEDDING_ONNX_FILE:
+        model_kwargs["file_name"] = EMBEDDING_ONNX_FILE
+    if threads:
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        model_kwargs["session_options"] = options
+    return sentence_transformers.SentenceTransformer(name, device=device, cache_folder=MODEL_CACHE_DIR,
+                                                     backend="onnx", model_kwargs=model_kwargs)
+
+
+# Embedding backends by name. A loader takes (model name, device, intra-op threads) and
+# returns an object with the SentenceTransformer interface used here: encode(),
+# tokenizer and get_sentence_embedding_dimension().
+EMBEDDING_BACKENDS: Dict[str, Callable[[str, str, int], SentenceTransformer]] = {
+    "torch": _load_torch,
+    "torch_int8": _load_torch_int8,
+    "onnx": _load_onnx,
+}
+
+
+def register_embedding_backend(backend: str, loader: Callable[[str, str, int], SentenceTransformer]) -> None:
+    """Make `loader` available as EMBEDDING_BACKEND=`backend`."""
+    EMBEDDING_BACKENDS[backend] = loader
+
+
+def embedding_model_id(name: str = EMBEDDING_MODEL_NAME, backend: str = EMBEDDING_BACKEND) -> str:
+    """
+    Identifier for the vectors a model and backend produce, for keying stored embeddings.
+
+    Non-reference backends produce slightly different vectors, so they get their own ID.
+    """
+    return name if backend == "torch" else f"{name}@{backend}"
+
+
+def get_embedding_model(name: str = EMBEDDING_MODEL_NAME, device: str = EMBEDDING_DEVICE,
+                        backend: str = EMBEDDING_BACKEND) -> SentenceTransformer:
+    """
+    Return the process-wide embedding model for `name`, loading it on first use.
+
+    Args:
+        name: Sentence-transformers model name or path
+        device: Torch device to load the model on
+        backend: One of EMBEDDING_BACKENDS
+
+    Returns:
+        Shared SentenceTransformer instance
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {sorted(EMBEDDING_BACKENDS)}")
+    key = (name, device, backend)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(key)
+        if model is not None:
+            return model
+
+        logger.info(f"Loading embedding model {name} on {device} ({backend} backend)...")
+        rss_before = _max_rss_bytes()
+        start = time.perf_counter()
+        with timed_init(f"embedding_model:{backend}"):
+            model = EMBEDDING_BACKENDS[backend](name, device, EMBEDDING_THREADS)
+        load_seconds = time.perf_counter() - start
+
+        _stats[key] = {
+            "model": name,
+            "device": device,
+            "backend": backend,
+            "load_seconds": round(load_seconds, 3),
+            "parameter_bytes": _model_nbytes(model),
+            "rss_increase_bytes": max(0, _max_rss_bytes() - rss_before),
+        }
+        _models[key] = model
+        logger.info(f"Loaded embedding model {name} in {load_seconds:.2f}s")
+        return model
+
+
+def get_cross_encoder(name: str, device: str = EMBEDDING_DEVICE, max_length: int = 512) -> CrossEncoder:
+    """
+    Return the process-wide CrossEncoder for `name`, loading it on first use.
+
+    Args:
+        name: Cross-encoder model name or path
+        device: Torch device to load the model on
+        max_length: Maximum tokens per (query, passage) pair
+
+    Returns:
+        Shared CrossEncoder instance
+    """
+    key = (name, device, max_length)
+    model = _cross_encoders.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _cross_encoders.get(key)
+        if model is not None:
+            return model
+
+        logger.info(f"Loading cross-encoder {name} on {device}...")
+        start = time.perf_counter()
+        with timed_init("cross_encoder"):
+            model = sentence_transformers.CrossEncoder(name, device=device, max_length=max_length,
+                                                       cache_folder=MODEL_CACHE_DIR)
+        _cross_encoders[key] = model
+        logger.info(f"Loaded cross-encoder {name} in {time.perf_counter() - start:.2f}s")
+        return model
+
+
+def warm_up(name: str = EMBEDDING_MODEL_NAME, device: str = EMBEDDING_DEVICE,
+            backend: str = EMBEDDING_BACKEND) -> dict:
+    """
+    Load the embedding model and run one encode so the first request doesn't pay for it.
+
+    Returns:
+        Load statistics for the model (see `get_model_stats`)
+    """
+    model = get_embedding_model(name, device, backend)
+    model.encode(["warm-up"], convert_to_numpy=True)
+    return get_model_stats(name, device, backend)
+
+
+def get_model_stats(name: str = EMBEDDING_MODEL_NAME, device: str = EMBEDDING_DEVICE,
+                    backend: str = EMBEDDING_BACKEND) -> Optional[dict]:
+    """
+    Load time and memory footprint of a loaded model, or None if it hasn't been loaded.
+
+    Returns:
+        Dict with backend, load_seconds, parameter_bytes and rss_increase_bytes
+    """
+    stats = _stats.get((name, device, backend))
+    return dict(stats) if stats else None
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import os
+import time
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from document_loader import extract_structured_table_with_fallback, extract_text_and_urls_fallback, is_url
+from vectorizer import build_vector_index
+from index_cache import IndexCache, document_cache_key
+from lexical_index import LexicalIndex
+from chunker import Chunk
+import metrics
+from startup import lazy_import
+
+faiss = lazy_import("faiss")
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_DOWNLOAD_WORKERS = int(os.getenv("PIPELINE_DOWNLOAD_WORKERS", "4"))
+PIPELINE_DOCUMENT_WORKERS = int(os.getenv("PIPELINE_DOCUMENT_WORKERS", "2"))
+
+# Stage pools are shared by all requests. Table extraction gets its own pool so a
+# document worker can wait on it without starving the pool it is running on.
+_download_pool = ThreadPoolExecutor(max_workers=PIPELINE_DOWNLOAD_WORKERS, thread_name_prefix="download")
+_document_pool = ThreadPoolExecutor(max_workers=PIPELINE_DOCUMENT_WORKERS, thread_name_prefix="document")
+_table_pool = ThreadPoolExecutor(max_workers=PIPELINE_DOCUMENT_WORKERS, thread_name_prefix="table")
+
+
+@dataclass
+class DocumentResult:
+    """Outcome of ingesting one document; `error` is set when it failed."""
+    doc_path: str
+    local_path: Optional[str] = None
+    table_text: Optional[str] = None
+    fallback_text: Optional[str] = None
+    chunks: List[str] = field(default_factory=list)
+    chunk_records: List[Chunk] = field(default_factory=list)  # provenance of each chunk
+    index: Optional[faiss.Index] = None
+    lexical_index: Optional[LexicalIndex] = None
+    content_key: Optional[str] = None
+    cache_hit: bool = False
+    error: Optional[str] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    embedding_stats: Dict[str, float] = field(default_factory=dict)
+
+
+def _timed(timings: Dict[str, float], stage: str, fn, *args):
+    start = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        seconds = time.perf_counter() - start
+        timings[stage] = round(seconds, 3)
+        if stage in metrics.STAGES:
+            metrics.observe_stage(stage, seconds)
+
+
+def _extract(result: DocumentResult) -> None:
+    """Run camelot and PyMuPDF extraction for one document side by side."""
+    table_future = metrics.submit_in_context(
+        _table_pool, _timed, result.timings, "table_extract",
+        extract_structured_table_with_fallback, result.local_path
+    )
+    result.fallback_text = _timed(result.timings, "text_extract", extract_text_and_urls_fallback, result.local_path)
+    result.table_text = table_future.result()
+
+
+def _process(result: DocumentResult, index_cache: Optional[IndexCache], build_index: bool) -> DocumentResult:
+    """Extraction and indexing stages for one downloaded document."""
+    start = time.perf_counter()
+    try:
+        cache_key = None
+        if index_cache is not None:
+            cache_key = _timed(result.timings, "hash", document_cache_key, result.local_path)
+            result.content_key = cache_key
+            cached = index_cache.get(cache_key, result.doc_path)
+            metrics.count(metrics.CACHE_LOOKUPS, cache="index", result="hit" if cached else "miss")
+            if cached:
+                result.cache_hit = True
+                result.table_text = cached["table_text"]
+                result.fallback_text = cached["fallback_text"]
+                result.chunks = cached["chunks"]
+                result.chunk_records = cached["chunk_records"]
+                result.index = cached["index"]
+                result.lexical_index = cached["lexical_index"]
+                return result
+
+        _extract(result)
+
+        if build_index and (result.table_text or result.fallback_text):
+            result.index, result.chunks, _, result.lexical_index = _timed(
+                result.timings, "vectorize", build_vector_index,
+                result.table_text, result.fallback_text, result.embedding_stats,
+                result.doc_path, result.chunk_records
+            )
+            if cache_key is not None:
+                index_cache.put(cache_key, result.table_text, result.fallback_text, result.chunks,
+                                result.index, result.lexical_index, result.chunk_records)
+    except Exception as e:
+        logger.error(f"Error processing document {result.doc_path}: {str(e)}", exc_info=True)
+        result.error = str(e)
+    finally:
+        result.timings["process"] = round(time.perf_counter() - start, 3)
+        metrics.count(metrics.DOCUMENTS, result="failed" if result.error else "ok")
+    return result
+
+
+def _fetch(result: DocumentResult, fetch: Callable[[str], Optional[str]]) -> DocumentResult:
+    """Download stage: resolve a document path or URL to a local file."""
+    try:
+        result.local_path = _timed(result.timings, "download", fetch, result.doc_path)
+        if not result.local_path:
+            result.error = "Download failed" if is_url(result.doc_path) else "File not found or not a valid PDF"
+        else:
+            metrics.count(metrics.DOCUMENT_BYTES, os.path.getsize(result.local_path))
+    except Exception as e:
+        logger.error(f"Error downloading document {result.doc_path}: {str(e)}", exc_info=True)
+        result.error = str(e)
+    return result
+
+
+def ingest_documents(doc_paths: List[str], fetch: Callable[[str], Optional[str]],
+                     index_cache: Optional[IndexCache] = None, build_index: bool = True) -> List[DocumentResult]:
+    """
+    Download, extract and index documents as a staged pipeline.
+
+    Downloads run ahead on their own pool, so later documents download while earlier
+    ones are being extracted; within a document, table and text extraction run in
+    parallel. A failure in one document is recorded on its result and does not
+    affect the others.
+
+    Args:
+        doc_paths: Document URLs or local paths
+        fetch: Returns a local file path for a document, or None if it is unavailable
+        index_cache: Optional per-document cache consulted before extraction
+        build_index: Whether to chunk and embed each document
+
+    Returns:
+        One DocumentResult per input, in input order
+    """
+    # Hand-offs run in download threads, outside the caller's context, so carry it
+    # explicitly to keep per-request timings
+    context = contextvars.copy_context()
+    pending: List[Future] = []
+    for doc_path in doc_paths:
+        done: Future = Future()
+
+        def hand_off(downloaded: Future, done: Future = done) -> None:
+            # Queue extraction as soon as this document's download finishes
+            result = downloaded.result()
+            if result.error is not None:
+                done.set_result(result)
+                return
+            processed = metrics.submit_in_context(
+                _document_pool, _process, result, index_cache, build_index, context=context
+            )
+            processed.add_done_callback(lambda f: done.set_result(f.result()))
+
+        metrics.submit_in_context(
+            _download_pool, _fetch, DocumentResult(doc_path=doc_path), fetch, context=context
+        ).add_done_callback(hand_off)
+        pending.append(done)
+
+    return [done.result() for done in pending]
+
+
+def _sum_fields(dicts: List[Dict[str, float]]) -> Dict[str, float]:
+    totals: Dict[str, float] = {}
+    for values in dicts:
+        for name, value in values.items():
+            totals[name] = round(totals.get(name, 0) + value, 3)
+    return totals
+
+
+def summarize_timings(results: List[DocumentResult]) -> Dict[str, float]:
+    """Total seconds spent per stage across all documents of a request."""
+    return _sum_fields([result.timings for result in results])
+
+
+def summarize_embedding_stats(results: List[DocumentResult]) -> Dict[str, float]:
+    """Embedding store hits, misses and encode seconds saved across a request's documents."""
+    return _sum_fields([result.embedding_stats for result in results])
@@ -0,0 +1,325 @@
+import time
+import logging
+from typing import List, Optional
+
+from vectorizer import merge_indexes
+from index_cache import IndexCache
+from lexical_index import LexicalIndex
+from answer_cache import AnswerCache, document_set_fingerprint, ANSWER_CACHE_ENABLED
+from pipeline import ingest_documents, summarize_timings, summarize_embedding_stats
+from retriever import search_batch, encode_queries
+from gpt_client import get_gemini_response, get_gemini_batch_response, build_prompt, build_batch_prompt
+from context_builder import (assemble_context, escalation_stages, group_questions, interleave, make_token_counter,
+                             ESCALATION_K, QUESTION_BATCH_SIZE, BATCH_CONTEXT_TOKEN_BUDGET)
+from llm_pool import iter_answers, DEFAULT_ANSWER
+from model_registry import get_embedding_model
+from reranker import get_reranker, RERANK_CANDIDATES, RERANK_BUDGET_SECONDS, RERANK_SKIP_AFTER_SECONDS
+from downloader import download
+from document_loader import validate_local_file
+import metrics
+import tracing
+
+logger = logging.getLogger(__name__)
+
+# 🗄️ Per-document cache of extracted text, chunks and FAISS index
+index_cache = IndexCache()
+
+# 💬 Answers to repeated and near-duplicate questions about the same documents
+answer_cache = AnswerCache() if ANSWER_CACHE_ENABLED else None
+
+
+class QAError(Exception):
+    """A request that cannot be answered; `status` is the HTTP status to report."""
+
+    def __init__(self, message: str, status: int = 500):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class Cancelled(Exception):
+    """Raised when the caller cancels a run."""
+
+
+class ProgressReporter:
+    """
+    Receives progress from `run_qa`. The base class ignores everything; the job
+    queue subclasses it to record progress, stream answers and request cancellation.
+    """
+
+    def stage(self, name: str, status: str, seconds: Optional[float] = None, details: Optional[dict] = None) -> None:
+        pass
+
+    def question(self, question: str, status: str, answer: Optional[str] = None) -> None:
+        pass
+
+    def answered(self, index: int, answer: str) -> None:
+        """The final answer to questions[index], reported as soon as it is ready."""
+        pass
+
+    def is_cancelled(self) -> bool:
+        return False
+
+    def check_cancelled(self) -> None:
+        if self.is_cancelled():
+            raise Cancelled()
+
+
+def fetch_document(doc_path: str) -> Optional[str]:
+    """Download a document URL into PDF_STORAGE_DIR, or pass a local path through if it is a readable PDF."""
+    if not doc_path.startswith("http"):
+        logger.info(f"Using local file path: {doc_path}")
+        return doc_path if validate_local_file(doc_path) else None
+
+    logger.info(f"Downloading document: {doc_path}")
+    local_path = download(doc_path)
+    logger.info(f"Successfully saved document to: {local_path}")
+    return local_path
+
+
+def clean_answer(raw_ans: str) -> str:
+    """Strip the answer-format markers from an LLM answer."""
+    cleaned_ans = raw_ans.replace("✅", "").replace("❌", "").replace("₹", "").strip()
+    return cleaned_ans or DEFAULT_ANSWER
+
+
+def run_qa(doc_paths: List[str], questions: List[str], progress: Optional[ProgressReporter] = None,
+           include_timings: bool = False, batch_size: int = QUESTION_BATCH_SIZE) -> dict:
+    """
+    Answer questions about a set of documents.
+
+    Args:
+        doc_paths: Document URLs or local paths
+        questions: Questions to answer
+        progress: Optional receiver for per-stage and per-question progress
+        include_timings: Add a per-stage timing breakdown under "timings"
+        batch_size: Most questions answered by one LLM prompt; questions are only
+            batched when their retrieved chunks overlap, and 1 disables batching
+
+    Returns:
+        Dict with answers (in question order), documents_processed and documents_with_content
+
+    Raises:
+        QAError: If no document could be processed
+        Cancelled: If `progress` reports cancellation
+    """
+    with metrics.request_timings() as timings:
+        result = _run_qa(doc_paths, questions, progress or ProgressReporter(), batch_size)
+    if include_timings:
+        result["timings"] = timings.as_dict()
+    return result
+
+
+def _run_qa(doc_paths: List[str], questions: List[str], progress: ProgressReporter, batch_size: int) -> dict:
+    started = time.monotonic()
+    logger.info(f"Processing {len(doc_paths)} documents and {len(questions)} questions")
+
+    all_table_text = []
+    all_fallback_text = []
+    all_indexes = []
+    all_lexical_indexes = []
+    all_chunks = []
+    chunk_doc = []  # document ordinal of each chunk in all_chunks
+
+    # ✅ Download, extract and index documents as a pipeline,
+    # reusing the cached result for known documents
+    progress.stage("ingest", "running")
+    results = ingest_documents(doc_paths, fetch_document, index_cache)
+
+    for result in results:
+        if result.error:
+            continue
+        if result.cache_hit:
+            logger.info(f"Index cache hit for {result.doc_path}")
+        if result.table_text:
+            all_table_text.append(f"--- Document: {result.doc_path} ---\n{result.table_text}")
+        if result.fallback_text:
+            all_fallback_text.append(f"--- Document: {result.doc_path} ---\n{result.fallback_text}")
+        if result.index is not None:
+            chunk_doc.extend([len(all_indexes)] * len(result.chunks))
+            all_indexes.append(result.index)
+            all_lexical_indexes.append(result.lexical_index)
+            all_chunks.extend(result.chunks)
+        logger.info(f"Stage timings for {result.doc_path}: {result.timings}")
+
+    stage_totals = summarize_timings(results)
+    logger.info(f"Ingestion stage totals: {stage_totals}")
+    logger.info(f"Embedding store: {summarize_embedding_stats(results)}")
+    documents_with_content = len(all_table_text) + len(all_fallback_text)
+    progress.stage("ingest", "done", stage_totals.get("process"),
+                   {"documents_processed": len(doc_paths), "documents_with_content": documents_with_content})
+    progress.check_cancelled()
+
+    if not documents_with_content:
+        logger.error("Failed to extract content from any document")
+        raise QAError("❌ Failed to extract content from any document.", 400)
+
+    # ✅ Combine per-document indexes and retrieve context for every question in one
+    # batched encode and hybrid dense + BM25 search, deep enough for the widest escalation stage
+    progress.stage("retrieve", "running")
+    try:
+        index = merge_indexes(all_indexes)
+        lexical_index = LexicalIndex.merge(all_lexical_indexes)
+        chunks = all_chunks
+        model = get_embedding_model()
+        query_vecs = encode_queries(questions, model)
+        vec_by_question = dict(zip(questions, query_vecs))
+        scores, ranked_ids = search_batch(
+            questions, index, model, k=max(ESCALATION_K), query_vecs=query_vecs, lexical_index=lexical_index
+        )
+        ids_by_question = {q: [int(i) for i in ids if i >= 0] for q, ids in zip(questions, ranked_ids)}
+        for q, q_scores in zip(questions, scores):
+            tracing.trace(tracing.DEBUG, "retrieved_chunks", query=q, ids=ids_by_question[q][:10],
+                          scores=lambda: [round(float(score), 4) for score in q_scores[:10]])
+    except Exception as e:
+        logger.error(f"Failed to retrieve context for questions: {str(e)}", exc_info=True)
+        raise QAError("Failed to process documents", 500) from e
+    # ✅ Optionally rerank a wide candidate set with the cross-encoder so the first
+    # prompt carries only the best few chunks; skipped when the request is running late
+    reranked_by_question = {}
+    reranker = get_reranker()
+    if reranker is not None:
+        if time.monotonic() - started > RERANK_SKIP_AFTER_SECONDS:
+            logger.warning("Skipping reranking: request is running late")
+        else:
+            try:
+                reranked = reranker.rerank(
+                    questions, [ids_by_question[q][:RERANK_CANDIDATES] for q in questions], chunks,
+                    deadline=time.monotonic() + RERANK_BUDGET_SECONDS,
+                )
+                reranked_by_question = {q: ids for q, ids in zip(questions, reranked) if ids}
+            except Exception as e:
+                logger.warning(f"Reranking failed, using retrieval order: {str(e)}")
+    progress.stage("retrieve", "done")
+    progress.check_cancelled()
+
+    count_tokens = make_token_counter(getattr(model, "tokenizer", None))
+    fingerprint = document_set_fingerprint(r.content_key for r in results if r.content_key and not r.error)
+
+    stages_by_question = {
+        q: escalation_stages(ids_by_question[q], len(chunks), reranked_by_question.get(q)) for q in questions
+    }
+
+    def cached_answer(q):
+        if answer_cache is None:
+            return None
+        cached_ans = answer_cache.get(fingerprint, q, vec_by_question[q])
+        metrics.count(metrics.CACHE_LOOKUPS, cache="answer", result="miss" if cached_ans is None else "hit")
+        if cached_ans is not None:
+            logger.info(f"Answer cache hit for question: {q}")
+            progress.question(q, "done", cached_ans)
+        return cached_ans
+
+    def save_answer(q, raw_ans):
+        cleaned_ans = clean_answer(raw_ans)
+        if answer_cache is not None:
+            answer_cache.put(fingerprint, q, vec_by_question[q], cleaned_ans)
+        progress.question(q, "done", cleaned_ans)
+        return cleaned_ans
+
+    def answer_question(q, check_cache=True):
+        progress.check_cancelled()
+        progress.question(q, "running")
+        logger.info(f"Processing question: {q}")
+        if check_cache:
+            cached_ans = cached_answer(q)
+            if cached_ans is not None:
+                return cached_ans
+
+        raw_ans = ""
+        previous_context = None
+
+        # Escalate reranked top N → k=10 → wider k → neighbour expansion, each under a token budget
+        for stage, stage_ids, budget in stages_by_question[q]:
+            context, _ = assemble_context(stage_ids, chunks, budget, count_tokens, chunk_doc)
+            if context == previous_context:
+                continue  # nothing new to show the model
+            previous_context = context
+
+            prompt_tokens = count_tokens(build_prompt(q, context))
+            logger.info(f"Stage {stage}: {len(context)} passages, {prompt_tokens} prompt tokens")
+            tracing.trace(tracing.DEBUG, "context_stage", query=q, stage=stage, chunk_ids=stage_ids[:30],
+                          passages=len(context), prompt_tokens=prompt_tokens)
+            metrics.count(metrics.PROMPT_TOKENS, prompt_tokens)
+            raw_ans = get_gemini_response(q, context)
+            if raw_ans.strip() and "not specify" not in raw_ans.lower():
+                break
+            progress.check_cancelled()
+
+        logger.info(f"Answered question: {q}")
+        return save_answer(q, raw_ans)
+
+    def answer_batch(batch):
+        """Ask one prompt about several questions over their combined first-stage chunks; returns the answers found."""
+        batch_questions = [questions[i] for i in batch]
+        for q in batch_questions:
+            progress.question(q, "running")
+        ranked_ids = interleave([stages_by_question[q][0][1] for q in batch_questions])
+        context, _ = assemble_context(ranked_ids, chunks, BATCH_CONTEXT_TOKEN_BUDGET, count_tokens, chunk_doc)
+
+        prompt_tokens = count_tokens(build_batch_prompt(batch_questions, context))
+        logger.info(f"Batch of {len(batch)} questions: {len(context)} passages, {prompt_tokens} prompt tokens")
+        tracing.trace(tracing.DEBUG, "context_batch", queries=batch_questions, chunk_ids=ranked_ids[:30],
+                      passages=len(context), prompt_tokens=prompt_tokens)
+        metrics.count(metrics.PROMPT_TOKENS, prompt_tokens)
+        try:
+            raw_answers = get_gemini_batch_response(batch_questions, context)
+        except Exception as e:
+            logger.warning(f"Batched prompt failed: {str(e)}")
+            return {}
+
+        # Unanswered questions go through the single-question escalation instead
+        return {
+            batch[j]: save_answer(batch_questions[j], raw_ans)
+            for j, raw_ans in raw_answers.items() if raw_ans and "not specify" not in raw_ans.lower()
+        }
+
+    def answer_group(group):
+        """Answers by question index: cached ones, one batched prompt for the rest, then one prompt per question left."""
+        if len(group) == 1:
+            return {group[0]: answer_question(questions[group[0]])}
+
+        progress.check_cancelled()
+        answers = {}
+        for i in group:
+            cached_ans = cached_answer(questions[i])
+            if cached_ans is not None:
+                answers[i] = cached_ans
+        batch = [i for i in group if i not in answers]
+        if len(batch) > 1:
+            answers.update(answer_batch(batch))
+
+        left = [i for i in batch if i not in answers]
+        if left:
+            logger.info(f"Answering {len(left)} of {len(batch)} batched questions with their own prompts")
+        for i in left:
+            try:
+                answers[i] = answer_question(questions[i], check_cache=False)
+            except Exception as e:
+                logger.error(f"Error answering question {questions[i]}: {str(e)}", exc_info=True)
+                answers[i] = DEFAULT_ANSWER
+        return answers
+
+    # ✅ Answer questions concurrently, reporting each answer as it completes and
+    # returning them in the original order. Questions whose first-stage chunks
+    # overlap share one prompt, up to batch_size questions each
+    progress.stage("answer", "running")
+    groups = group_questions([stages_by_question[q][0][1] for q in questions], batch_size)
+    if len(groups) < len(questions):
+        logger.info(f"Batched {len(questions)} questions into {len(groups)} prompts: {groups}")
+    answers = [DEFAULT_ANSWER] * len(questions)
+    for g, group_answers in iter_answers(groups, answer_group, default={}):
+        for i in groups[g]:
+            answers[i] = group_answers.get(i, DEFAULT_ANSWER)
+            progress.answered(i, answers[i])
+    progress.check_cancelled()
+    progress.stage("answer", "done")
+
+    logger.info("Successfully processed all questions")
+    if answer_cache is not None:
+        logger.info(f"Answer cache: {answer_cache.stats()}")
+    return {
+        "answers": answers,
+        "documents_processed": len(doc_paths),
+        "documents_with_content": documents_with_content
+    }
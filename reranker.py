@@ -0,0 +1,129 @@
+import hashlib
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import metrics
+from model_registry import get_cross_encoder, EMBEDDING_DEVICE
+
+logger = logging.getLogger(__name__)
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() in ("1", "true", "yes")
+RERANK_MODEL_NAME = os.getenv("RERANK_MODEL_NAME", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "30"))   # retrieved chunks scored per question
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "6"))              # chunks kept for the first prompt
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "32"))
+RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "512"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "50000"))
+RERANK_BUDGET_SECONDS = float(os.getenv("RERANK_BUDGET_SECONDS", "2.0"))        # max time spent scoring
+RERANK_SKIP_AFTER_SECONDS = float(os.getenv("RERANK_SKIP_AFTER_SECONDS", "20"))  # request age after which to skip
+
+
+def _pair_key(question: str, chunk: str) -> bytes:
+    return hashlib.blake2b(f"{question}\0{chunk}".encode("utf-8"), digest_size=16).digest()
+
+
+class Reranker:
+    """
+    Cross-encoder reranking of retrieved chunks, with an LRU cache of pair scores.
+
+    All uncached (question, chunk) pairs of a request are scored together in
+    batches of `batch_size`. Scoring stops at the deadline; questions whose
+    candidates were not all scored by then keep their retrieval order.
+    """
+
+    def __init__(self, model_name: str = RERANK_MODEL_NAME, device: str = EMBEDDING_DEVICE,
+                 batch_size: int = RERANK_BATCH_SIZE, cache_size: int = RERANK_CACHE_SIZE):
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[bytes, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, keys: List[bytes]) -> Dict[bytes, float]:
+        with self._lock:
+            found = {}
+            for key in keys:
+                score = self._cache.get(key)
+                if score is not None:
+                    self._cache.move_to_end(key)
+                    found[key] = score
+            return found
+
+    def _store(self, scores: Dict[bytes, float]) -> None:
+        with self._lock:
+            self._cache.update(scores)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def rerank(self, questions: Sequence[str], candidate_ids: Sequence[Sequence[int]], chunks: List[str],
+               top_n: int = RERANK_TOP_N, deadline: Optional[float] = None) -> List[Optional[List[int]]]:
+        """
+        Rerank each question's candidate chunks.
+
+        Args:
+            questions: Questions
+            candidate_ids: Retrieved chunk ids per question, best first
+            chunks: All chunks of the index
+            top_n: Chunks to keep per question
+            deadline: time.monotonic() value after which no more batches are scored
+
+        Returns:
+            Per question, the top_n chunk ids by cross-encoder score, or None if the
+            question could not be scored in time
+        """
+        keys = [[_pair_key(q, chunks[i]) for i in ids] for q, ids in zip(questions, candidate_ids)]
+        all_keys = list(dict.fromkeys(key for question_keys in keys for key in question_keys))
+        scores = self._cached(all_keys)
+        metrics.count(metrics.CACHE_LOOKUPS, len(scores), cache="rerank", result="hit")
+        metrics.count(metrics.CACHE_LOOKUPS, len(all_keys) - len(scores), cache="rerank", result="miss")
+
+        pending: Dict[bytes, tuple] = {}  # uncached pair key -> (question, chunk)
+        for q, ids, question_keys in zip(questions, candidate_ids, keys):
+            for i, key in zip(ids, question_keys):
+                if key not in scores:
+                    pending.setdefault(key, (q, chunks[i]))
+        pending_keys, pairs = list(pending), list(pending.values())
+
+        if pairs:
+            model = get_cross_encoder(self.model_name, self.device, RERANK_MAX_LENGTH)
+            with metrics.timed("rerank"):
+                for start in range(0, len(pairs), self.batch_size):
+                    if deadline is not None and time.monotonic() > deadline:
+                        logger.warning(f"Rerank budget exhausted after {start} of {len(pairs)} pairs")
+                        break
+                    batch_scores = model.predict(
+                        pairs[start:start + self.batch_size], batch_size=self.batch_size,
+                        show_progress_bar=False, convert_to_numpy=True,
+                    )
+                    new_scores = dict(zip(pending_keys[start:start + self.batch_size], map(float, batch_scores)))
+                    scores.update(new_scores)
+                    self._store(new_scores)
+
+        reranked = []
+        for ids, question_keys in zip(candidate_ids, keys):
+            if any(key not in scores for key in question_keys):
+                reranked.append(None)
+                continue
+            order = sorted(range(len(ids)), key=lambda pos: -scores[question_keys[pos]])
+            reranked.append([ids[pos] for pos in order[:top_n]])
+        return reranked
+
+
+_reranker: Optional[Reranker] = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> Optional[Reranker]:
+    """The process-wide Reranker, or None when RERANK_ENABLED is off."""
+    global _reranker
+    if not RERANK_ENABLED:
+        return None
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = Reranker()
+        return _reranker
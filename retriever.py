@@ -1,4 +1,145 @@
-def get_top_chunks(query, index, chunks, model, k=20):
+import os
+
+import numpy as np
+
+import metrics
+import tracing
+from startup import lazy_import
+
+faiss = lazy_import("faiss")
+
+# Retrieval: dense (FAISS cosine), lexical (BM25) or hybrid (both, fused by reciprocal rank)
+RETRIEVAL_MODES = ("dense", "lexical", "hybrid")
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+RRF_K = int(os.getenv("RRF_K", "60"))
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))  # per retriever, before fusion
+
+
+def encode_queries(queries, model):
+    """
+    Encode queries in one batch into L2-normalized float32 vectors.
+
+    Args:
+        queries (List[str]): The user's questions.
+        model (SentenceTransformer): The sentence embedding model.
+
+    Returns:
+        np.ndarray: Matrix of shape (len(queries), dim) whose inner products are cosine scores.
+    """
+    queries = list(queries)
+    if not queries:
+        return np.zeros((0, model.get_sentence_embedding_dimension()), dtype="float32")
+    with metrics.timed("encode"):
+        query_vecs = model.encode(queries, batch_size=32, convert_to_numpy=True)
+    query_vecs = np.ascontiguousarray(query_vecs, dtype="float32")
+    faiss.normalize_L2(query_vecs)
+    return query_vecs
+
+
+def reciprocal_rank_fusion(rankings, k, rrf_k=RRF_K):
+    """
+    Fuse several rankings of the same queries by reciprocal rank.
+
+    Args:
+        rankings (List[np.ndarray]): Id matrices, one row per query, best first; -1 entries are ignored.
+        k (int): Number of fused results per query.
+        rrf_k (int): Rank offset; larger values flatten the difference between top ranks.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Fused scores and ids, one row per query, -1 padded.
+    """
+    n = len(rankings[0])
+    D = np.zeros((n, k), dtype="float32")
+    I = np.full((n, k), -1, dtype="int64")
+    for row in range(n):
+        fused = {}
+        for ranking in rankings:
+            for rank, i in enumerate(ranking[row]):
+                if i >= 0:
+                    fused[int(i)] = fused.get(int(i), 0.0) + 1.0 / (rrf_k + rank + 1)
+        best = sorted(fused.items(), key=lambda item: -item[1])[:k]
+        for col, (i, score) in enumerate(best):
+            I[row, col] = i
+            D[row, col] = score
+    return D, I
+
+
+def search_batch(queries, index, model, k=20, query_vecs=None, lexical_index=None, mode=None):
+    """
+    Search the index for several queries with one encode and one search.
+
+    Args:
+        queries (List[str]): The user's questions.
+        index (faiss.Index): The FAISS vector index.
+        model (SentenceTransformer): The sentence embedding model.
+        k (int): Number of neighbours per query (default = 20).
+        query_vecs (np.ndarray): Normalized query embeddings from `encode_queries`, if already computed.
+        lexical_index (LexicalIndex): BM25 index over the same chunks; without it only dense search runs.
+        mode (str): One of RETRIEVAL_MODES (default RETRIEVAL_MODE).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Scores and chunk ids, one row per query, best first;
+        ids are -1 where fewer than k chunks were found. Scores are cosine for dense,
+        BM25 for lexical and reciprocal-rank for hybrid retrieval.
+    """
+    mode = mode or RETRIEVAL_MODE
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode {mode!r}; expected one of {RETRIEVAL_MODES}")
+    if not len(queries):
+        return np.zeros((0, k), dtype="float32"), np.full((0, k), -1, dtype="int64")
+    if lexical_index is None:
+        mode = "dense"
+
+    if mode == "lexical":
+        with metrics.timed("search"):
+            return lexical_index.search(queries, k)
+
+    if query_vecs is None:
+        query_vecs = encode_queries(queries, model)
+    if mode == "dense":
+        with metrics.timed("search"):
+            return index.search(query_vecs, k)
+
+    depth = max(k, HYBRID_CANDIDATES)
+    with metrics.timed("search"):
+        _, dense_ids = index.search(query_vecs, depth)
+        _, lexical_ids = lexical_index.search(queries, depth)
+        return reciprocal_rank_fusion([dense_ids, lexical_ids], k)
+
+
+def get_top_chunks_batch(queries, index, chunks, model, k=20, lexical_index=None):
+    """
+    Retrieve the top-k most relevant chunks for several queries with one encode and one search.
+
+    Args:
+        queries (List[str]): The user's questions.
+        index (faiss.Index): The FAISS vector index.
+        chunks (List[str]): The list of document chunks.
+        model (SentenceTransformer): The sentence embedding model.
+        k (int): Number of top chunks to retrieve per query (default = 20).
+        lexical_index (LexicalIndex): Optional BM25 index over `chunks` for hybrid retrieval.
+
+    Returns:
+        List[List[str]]: For each query, its top-k most relevant text chunks.
+    """
+    if not queries:
+        return []
+
+    D, I = search_batch(queries, index, model, k, lexical_index=lexical_index)
+
+    results = []
+    for query, distances, ids in zip(queries, D, I):
+        tracing.trace(
+            tracing.DEBUG, "retrieved_chunks", query=query, k=k,
+            scores=lambda: [round(float(d), 4) for d in distances],
+            previews=lambda: [chunks[i][:500] for i in ids if 0 <= i < len(chunks)],  # first 500 chars
+            out_of_bounds=lambda: [int(i) for i in ids if not 0 <= i < len(chunks)],
+        )
+        results.append([chunks[i] for i in ids if 0 <= i < len(chunks)])
+    return results
+
+
+def get_top_chunks(query, index, chunks, model, k=20, lexical_index=None):
     """
     Retrieve the top-k most relevant chunks for a given query using vector similarity search.
 
@@ -7,20 +148,10 @@ def get_top_chunks(query, index, chunks, model, k=20):
         index (faiss.Index): The FAISS vector index.
         chunks (List[str]): The list of document chunks.
         model (SentenceTransformer): The sentence embedding model.
-        k (int): Number of top chunks to retrieve (default = 10).
+        k (int): Number of top chunks to retrieve (default = 20).
+        lexical_index (LexicalIndex): Optional BM25 index over `chunks` for hybrid retrieval.
 
     Returns:
         List[str]: List of top-k most relevant text chunks.
     """
-    query_vec = model.encode([query])
-    D, I = index.search(query_vec, k)
-
-    print(f"\n🔍 DEBUG: Top {k} Chunk Distances:\n", D[0])
-    print(f"\n📦 DEBUG: Top {k} Retrieved Chunks:\n")
-    for i in I[0]:
-        if i < len(chunks):
-            print("---\n", chunks[i][:500], "\n")  # Preview first 500 chars
-        else:
-            print(f"⚠️ Warning: Retrieved index {i} out of bounds.")
-
-    return [chunks[i] for i in I[0] if i < len(chunks)]
+    return get_top_chunks_batch([query], index, chunks, model, k, lexical_index)[0]
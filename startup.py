@@ -0,0 +1,161 @@
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+import types
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "background")  # background, blocking or off
+
+
+def _process_age() -> float:
+    """Seconds since this process started (Linux), or 0 where /proc is unavailable."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+# Reference point for every timestamp in the report: process start where known
+_origin = time.perf_counter() - _process_age()
+_lock = threading.Lock()
+_events: Dict[str, dict] = {}  # name -> {kind, seconds, at}; first record wins
+_warm_up = {"state": "not started", "seconds": None, "errors": {}}
+_warm_up_done = threading.Event()
+
+
+def _record(name: str, kind: str, seconds: float) -> None:
+    with _lock:
+        _events.setdefault(name, {
+            "kind": kind,
+            "seconds": round(seconds, 3),
+            "at": round(time.perf_counter() - _origin, 3),
+        })
+
+
+def load(name: str) -> types.ModuleType:
+    """
+    Import a module, recording how long its first import took.
+
+    Modules it shares with earlier imports are already loaded, so in a
+    dependency-ordered sequence each entry is that module's own cost.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    _record(name, "import", time.perf_counter() - start)
+    return module
+
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module that imports it on first attribute access."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_target"] = name
+
+    def __getattr__(self, attr: str):
+        module = load(self.__dict__["_lazy_target"])
+        self.__dict__.update(module.__dict__)  # later lookups no longer reach __getattr__
+        return getattr(module, attr)
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    A module object for `name` that is only imported when first used.
+
+    Annotations that name its attributes must not be evaluated at import time,
+    so modules using it add `from __future__ import annotations`.
+    """
+    return sys.modules.get(name) or LazyModule(name)
+
+
+def mark(name: str) -> None:
+    """Record that a startup milestone (e.g. "app_imported") was reached now."""
+    _record(name, "mark", 0.0)
+
+
+@contextmanager
+def timed_init(name: str) -> Iterator[None]:
+    """Record the time spent initializing a dependency (client setup, model load)."""
+    start = time.perf_counter()
+    yield
+    _record(name, "init", time.perf_counter() - start)
+
+
+def _run_warm_up(modules: Iterable[str], initializers: List[Tuple[str, Callable[[], object]]]) -> None:
+    _warm_up["state"] = "running"
+    start = time.perf_counter()
+    steps = [(name, lambda name=name: load(name)) for name in modules] + list(initializers)
+    for name, step in steps:
+        try:
+            step()
+        except Exception as e:
+            logger.warning(f"⚠️ Warm-up step {name} failed: {e}")
+            _warm_up["errors"][name] = str(e)
+    _warm_up["seconds"] = round(time.perf_counter() - start, 3)
+    _warm_up["state"] = "failed" if _warm_up["errors"] else "done"
+    _warm_up_done.set()
+    logger.info(f"🚀 Warm-up {_warm_up['state']} in {_warm_up['seconds']}s: {report()['events']}")
+
+
+def start_warm_up(modules: Iterable[str], initializers: List[Tuple[str, Callable[[], object]]],
+                  mode: str = STARTUP_WARMUP) -> None:
+    """
+    Import heavy modules and initialize dependencies ahead of the first request.
+
+    Args:
+        modules: Modules to import, in dependency order
+        initializers: (name, function) pairs run after the imports; a failing
+            step is logged and reported, and the rest still run
+        mode: "background" (a daemon thread, so the worker can already answer
+            health checks), "blocking", or "off" (everything loads on first use)
+    """
+    if mode == "off":
+        _warm_up["state"] = "off"
+        _warm_up_done.set()
+        return
+    if mode == "blocking":
+        _run_warm_up(modules, initializers)
+        return
+    threading.Thread(target=_run_warm_up, args=(list(modules), initializers),
+                     name="warm-up", daemon=True).start()
+
+
+def ready() -> bool:
+    """Whether the warm-up finished without errors; with warm-up off, everything loads on demand, so True."""
+    return _warm_up["state"] in ("done", "off")
+
+
+def wait_ready(timeout: Optional[float] = None) -> bool:
+    """Block until the warm-up has finished; returns False on timeout."""
+    return _warm_up_done.wait(timeout)
+
+
+def report() -> dict:
+    """
+    Startup-time breakdown.
+
+    Returns:
+        Dict with uptime_seconds, the warm_up state, and events: per module import
+        and dependency initialization, its kind, duration and completion time, all in
+        seconds since process start
+    """
+    with _lock:
+        events = {name: dict(event) for name, event in _events.items()}
+    return {
+        "uptime_seconds": round(time.perf_counter() - _origin, 3),
+        "warm_up": {**_warm_up, "errors": dict(_warm_up["errors"])},
+        "events": events,
+    }
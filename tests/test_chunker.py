@@ -0,0 +1,41 @@
+import re
+
+import pytest
+
+from chunker import PAGE_BREAK, chunk_document, chunk_stream, iter_pages
+
+
+def count_tokens(text):
+    """Each digit is a token, as are runs of other non-space characters, so token density varies along a text."""
+    return len(re.findall(r"\d|[^\d\s]+", text))
+
+
+# One sentence with no punctuation, sparse words first and dense numbers after; no two chunks alike
+LONG_SEGMENT = "".join(f"cover{chr(97 + i % 26)}{chr(97 + i // 26)} " for i in range(120)) \
+    + "".join(f"{1000000000 + i} " for i in range(40))
+
+
+@pytest.mark.parametrize("max_tokens", [20, 60, 150])
+def test_over_long_segment_chunks_fit_max_tokens(max_tokens):
+    chunks = list(chunk_stream(iter_pages(LONG_SEGMENT), max_tokens, max_tokens // 5, count_tokens))
+
+    assert len(chunks) > 1
+    assert max(count_tokens(chunk.text) for chunk in chunks) <= max_tokens
+
+
+def test_chunks_fit_max_tokens_across_pages_and_sections():
+    pages = [f"4.{n} Room Rent. Room rent is covered up to {n}% of the sum insured per day. " * 8 + LONG_SEGMENT
+             for n in range(1, 4)]
+    text = PAGE_BREAK.join(pages)
+
+    chunks = chunk_document("Cataract | 25,000 | 10%\n" * 50, text, 60, 12, count_tokens)
+
+    assert {chunk.section for chunk in chunks} == {"table", "text"}
+    assert max(count_tokens(chunk.text) for chunk in chunks) <= 60
+    assert [chunk.page for chunk in chunks if chunk.section == "text"][-1] == 3
+
+
+def test_chunks_cover_the_text():
+    chunks = list(chunk_stream(iter_pages(LONG_SEGMENT), 60, 0, count_tokens))
+
+    assert "".join(chunk.text + " " for chunk in chunks).split() == LONG_SEGMENT.split()
@@ -0,0 +1,103 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import downloader
+from downloader import DownloadError, download
+
+PDF_BODY = b"%PDF-1.4\n" + b"x" * 200_000
+ETAG = '"v1"'
+LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+
+class Handler(BaseHTTPRequestHandler):
+    requests = []  # (path, headers) of every request, reset per test
+
+    def do_GET(self):
+        Handler.requests.append((self.path, dict(self.headers)))
+        if self.path.startswith("/missing"):
+            self.send_error(404)
+            return
+        if self.headers.get("If-None-Match") == ETAG or self.headers.get("If-Modified-Since") == LAST_MODIFIED:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        if not self.path.startswith("/chunked"):
+            self.send_header("Content-Length", str(len(PDF_BODY)))
+        self.send_header("ETag", ETAG)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(PDF_BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    Handler.requests = []
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def storage_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(downloader, "PDF_STORAGE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_downloads_to_storage_dir(server, storage_dir):
+    path = download(f"{server}/policy.pdf", require_pdf=True)
+
+    assert path.startswith(str(storage_dir))
+    with open(path, "rb") as f:
+        assert f.read() == PDF_BODY
+
+
+def test_aborts_when_content_length_exceeds_limit(server, storage_dir):
+    with pytest.raises(DownloadError, match="too large"):
+        download(f"{server}/policy.pdf", max_bytes=1000)
+
+    assert not any(p.name.endswith(".pdf") for p in storage_dir.iterdir())
+
+
+def test_aborts_streamed_body_over_limit(server, storage_dir):
+    with pytest.raises(DownloadError, match="exceeds"):
+        download(f"{server}/chunked.pdf", max_bytes=100_000)
+
+    assert list(storage_dir.iterdir()) == []  # partial file removed
+
+
+def test_not_modified_reuses_stored_copy(server):
+    url = f"{server}/policy.pdf"
+    first = download(url)
+
+    second = download(url)
+
+    assert second == first
+    _, headers = Handler.requests[-1]
+    assert headers.get("If-None-Match") == ETAG
+    assert headers.get("If-Modified-Since") == LAST_MODIFIED
+
+
+def test_stored_copy_over_limit_is_not_reused(server):
+    url = f"{server}/policy.pdf"
+    download(url)
+
+    with pytest.raises(DownloadError, match="too large"):
+        download(url, max_bytes=1000)
+
+    _, headers = Handler.requests[-1]
+    assert "If-None-Match" not in headers
+
+
+def test_missing_document_raises(server):
+    with pytest.raises(DownloadError, match="status 404"):
+        download(f"{server}/missing.pdf")
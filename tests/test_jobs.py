@@ -0,0 +1,56 @@
+import threading
+
+import pytest
+
+import jobs
+from jobs import CANCELLED_STATUS, JobManager
+from qa_service import Cancelled, QAError
+
+
+@pytest.fixture
+def manager():
+    return JobManager(workers=1, queue_size=2)
+
+
+def test_cancelled_job_reports_cancelled_status(manager, monkeypatch):
+    started = threading.Event()
+
+    def run_qa(doc_paths, questions, reporter, include_timings):
+        started.set()
+        while not reporter.is_cancelled():
+            threading.Event().wait(0.01)
+        raise Cancelled()
+
+    monkeypatch.setattr(jobs, "run_qa", run_qa)
+    job = manager.submit(["policy.pdf"], ["Is dialysis covered?"])
+    assert started.wait(5)
+    assert job.to_dict()["status"] == "running"
+
+    manager.cancel(job.id)
+
+    assert job.wait(5)
+    assert (job.status, job.error_status) == ("cancelled", CANCELLED_STATUS)
+    assert list(job.iter_events())[-1] == {"event": "error", "error": "Request was cancelled",
+                                          "status": CANCELLED_STATUS}
+
+
+def test_failed_job_keeps_error_status(manager, monkeypatch):
+    def run_qa(doc_paths, questions, reporter, include_timings):
+        raise QAError("No document could be processed", 422)
+
+    monkeypatch.setattr(jobs, "run_qa", run_qa)
+    job = manager.submit(["policy.pdf"], ["Is dialysis covered?"])
+
+    assert job.wait(5)
+    assert (job.status, job.error, job.error_status) == ("failed", "No document could be processed", 422)
+
+
+def test_finished_job_returns_result(manager, monkeypatch):
+    def run_qa(doc_paths, questions, reporter, include_timings):
+        return {"answers": ["✅ Yes"]}
+
+    monkeypatch.setattr(jobs, "run_qa", run_qa)
+    job = manager.submit(["policy.pdf"], ["Is dialysis covered?"])
+
+    assert job.wait(5)
+    assert (job.status, job.result) == ("done", {"answers": ["✅ Yes"]})
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+import gpt_client
+import llm_pool
+from llm_pool import DEFAULT_ANSWER, TokenBucket, answer_questions, iter_answers
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Answers with the prompt's question; questions listed in `delays` sleep first."""
+
+    def __init__(self, delays=None, release=None):
+        self.delays = delays or {}
+        self.release = release
+        self.request_options = []
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, request_options=None, generation_config=None):
+        question = prompt.split("### Question:\n", 1)[1].split("\n", 1)[0]
+        with self._lock:
+            self.request_options.append(request_options)
+        if question in self.delays:
+            if self.release is not None:
+                self.release.wait(self.delays[question])
+            else:
+                time.sleep(self.delays[question])
+        return _Response(f"answer to {question}")
+
+
+@pytest.fixture
+def stub_model(monkeypatch):
+    """Install a stub model with rate limiting off; the test configures it."""
+    stub = StubModel()
+    monkeypatch.setattr(gpt_client, "model", stub)
+    monkeypatch.setattr(gpt_client, "rate_limiter", TokenBucket(rate=0))
+    return stub
+
+
+def ask(question):
+    return gpt_client.get_gemini_response(question, ["context"])
+
+
+def test_answers_keep_question_order(stub_model):
+    questions = [f"q{i}" for i in range(6)]
+    stub_model.delays = {"q0": 0.3, "q1": 0.2, "q2": 0.1}  # early questions finish last
+
+    assert answer_questions(questions, ask) == [f"answer to {q}" for q in questions]
+
+
+def test_iter_answers_yields_in_completion_order(stub_model):
+    stub_model.delays = {"slow": 0.3}
+
+    order = [i for i, _ in iter_answers(["slow", "fast"], ask)]
+
+    assert order == [1, 0]
+
+
+def test_set_model_replaces_the_client(monkeypatch):
+    stub = StubModel()
+    monkeypatch.setattr(gpt_client, "rate_limiter", TokenBucket(rate=0))
+    monkeypatch.setattr(gpt_client, "model", None)
+    gpt_client.set_model(stub)
+
+    assert gpt_client.get_model() is stub
+    assert ask("q") == "answer to q"
+
+
+def test_each_call_carries_the_call_timeout(stub_model):
+    ask("q")
+
+    assert stub_model.request_options == [{"timeout": llm_pool.LLM_CALL_TIMEOUT}]
+
+
+def test_timeout_returns_default_for_slow_questions(stub_model):
+    release = threading.Event()
+    stub_model.delays, stub_model.release = {"slow": 10}, release
+    try:
+        start = time.monotonic()
+        answers = answer_questions(["fast", "slow"], ask, timeout=0.3)
+        elapsed = time.monotonic() - start
+    finally:
+        release.set()  # free the pool thread still inside the stub
+
+    assert answers == ["answer to fast", DEFAULT_ANSWER]
+    assert elapsed < 2
+
+
+def test_failing_question_gets_default(stub_model):
+    def answer(q):
+        if q == "bad":
+            raise RuntimeError("LLM error")
+        return ask(q)
+
+    assert answer_questions(["good", "bad"], answer) == ["answer to good", DEFAULT_ANSWER]
+
+
+def test_token_bucket_allows_burst_then_throttles():
+    bucket = TokenBucket(rate=10, capacity=2)
+
+    assert bucket.acquire(timeout=0) and bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0.01)
+    start = time.monotonic()
+    assert bucket.acquire(timeout=1)
+    assert time.monotonic() - start >= 0.05
+
+
+def test_rate_limiter_throttles_llm_calls(stub_model, monkeypatch):
+    monkeypatch.setattr(gpt_client, "rate_limiter", TokenBucket(rate=20, capacity=1))
+
+    start = time.monotonic()
+    answer_questions([f"q{i}" for i in range(5)], ask)
+
+    # one call from the burst, then one every 1/20 s
+    assert time.monotonic() - start >= 4 / 20 * 0.9
+
+
+def test_rate_limiter_timeout_raises(stub_model, monkeypatch):
+    bucket = TokenBucket(rate=0.001, capacity=1)
+    bucket.acquire()
+    monkeypatch.setattr(gpt_client, "rate_limiter", bucket)
+    monkeypatch.setattr(gpt_client, "LLM_CALL_TIMEOUT", 0.05)
+
+    with pytest.raises(TimeoutError):
+        ask("q")
@@ -0,0 +1,25 @@
+import logging
+
+from pipeline import DocumentResult, _fetch
+from qa_service import fetch_document
+
+
+def test_missing_local_file_is_a_clean_document_error(tmp_path, caplog):
+    result = DocumentResult(str(tmp_path / "missing.pdf"))
+
+    with caplog.at_level(logging.WARNING):
+        _fetch(result, fetch_document)
+
+    assert result.local_path is None
+    assert result.error == "File not found or not a valid PDF"
+    assert not any(record.exc_info for record in caplog.records)
+
+
+def test_local_file_that_is_not_a_pdf_is_rejected(tmp_path):
+    notes = tmp_path / "notes.txt"
+    notes.write_text("not a policy")
+    result = DocumentResult(str(notes))
+
+    _fetch(result, fetch_document)
+
+    assert result.error == "File not found or not a valid PDF"
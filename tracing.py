@@ -0,0 +1,78 @@
+import contextvars
+import json
+import logging
+import os
+import random
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+logger = logging.getLogger("trace")
+
+DEBUG = 10
+INFO = 20
+OFF = 100
+LEVELS = {"debug": DEBUG, "info": INFO, "off": OFF}
+
+TRACE_LEVEL = os.getenv("TRACE_LEVEL", "off")                # level for every request
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))  # fraction of requests traced at TRACE_SAMPLE_LEVEL
+TRACE_SAMPLE_LEVEL = os.getenv("TRACE_SAMPLE_LEVEL", "debug")
+TRACE_HEADER = "X-Debug-Trace"                                # per-request override, e.g. "X-Debug-Trace: debug"
+
+
+def parse_level(name: Optional[str], default: int = OFF) -> int:
+    """Level for a name like "debug"; "1"/"true" mean debug, unknown names give `default`."""
+    if not name:
+        return default
+    name = name.strip().lower()
+    if name in ("1", "true", "yes"):
+        return DEBUG
+    return LEVELS.get(name, default)
+
+
+_default_level = parse_level(TRACE_LEVEL)
+_level: contextvars.ContextVar[int] = contextvars.ContextVar("trace_level", default=_default_level)
+_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+
+
+@contextmanager
+def request_trace(requested: Optional[str] = None) -> Iterator[int]:
+    """
+    Decide the trace level for one request and apply it to everything run in this context.
+
+    Args:
+        requested: Level asked for by the client (e.g. the TRACE_HEADER value), if any
+
+    Yields:
+        The level in effect for the request
+    """
+    level = parse_level(requested, _default_level)
+    if requested is None and TRACE_SAMPLE_RATE > 0 and random.random() < TRACE_SAMPLE_RATE:
+        level = min(level, parse_level(TRACE_SAMPLE_LEVEL))
+    level_token = _level.set(level)
+    id_token = _trace_id.set(uuid.uuid4().hex[:12])
+    try:
+        yield level
+    finally:
+        _level.reset(level_token)
+        _trace_id.reset(id_token)
+
+
+def enabled(level: int) -> bool:
+    """Whether events at `level` are recorded; use it to guard expensive trace-only work."""
+    return level >= _level.get()
+
+
+def trace(level: int, event: str, **fields) -> None:
+    """
+    Record a structured trace event as one JSON log line.
+
+    Nothing is formatted unless `level` is enabled for the current request. Field
+    values may be zero-argument callables, which are only called when recorded.
+    """
+    if level < _level.get():
+        return
+    record = {"event": event, "trace_id": _trace_id.get()}
+    for name, value in fields.items():
+        record[name] = value() if callable(value) else value
+    logger.info("🔎 %s", json.dumps(record, ensure_ascii=False, default=str))
@@ -1,17 +1,57 @@
-from sentence_transformers import SentenceTransformer
+from __future__ import annotations
+
 import numpy as np
-import faiss
-import re
-from typing import List, Tuple, Optional
+import os
+from typing import TYPE_CHECKING, List, Tuple, Optional
 import logging
+import time
+from model_registry import get_embedding_model, embedding_model_id
+from embedding_store import get_embedding_store, chunk_key, EMBEDDING_STORE_ENABLED
+from lexical_index import LexicalIndex
+from chunker import Chunk, chunk_document, chunk_stream, iter_pages
+from context_builder import make_token_counter
+import metrics
+from startup import lazy_import
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+faiss = lazy_import("faiss")
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))      # characters, for chunk_text
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "200"))   # embedding-model tokens per indexed chunk
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "40"))
+ENCODE_BATCH_SIZE = int(os.getenv("ENCODE_BATCH_SIZE", "32"))
+
+# Vector index construction
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+INDEX_TYPE = os.getenv("INDEX_TYPE", "flat")
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))  # 0 = 4 * sqrt(n)
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+PQ_M = int(os.getenv("PQ_M", "16"))
+PQ_NBITS = 8
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "80"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+MIN_POINTS_PER_CENTROID = 39  # FAISS k-means wants at least this many training points per centroid
+
+# Precision of stored vectors for flat, IVF-Flat and HNSW indexes (IVF-PQ is always compressed)
+EMBEDDING_STORAGE_TYPES = ("float32", "float16", "int8")
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "float32")
+# Widen the trained int8 range by this fraction of its width, so vectors added later clip less
+SQ_RANGE_MARGIN = float(os.getenv("SQ_RANGE_MARGIN", "0.1"))
+
+# Most recent per-chunk encode time, used to estimate the time saved by store hits
+_seconds_per_chunk = 0.0
+
+def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
     """
-    Split text into meaningful chunks with improved handling of document structure.
+    Split text into chunks of at most `chunk_size` characters.
     
     Args:
         text: Input text to be chunked
@@ -21,99 +61,307 @@ def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[st
     Returns:
         List of text chunks
     """
-    # First try to split by sections (for structured documents)
-    section_pattern = r"\n\s*\d+\.\d+(?:\.\d+)?\s+[^\n]+"  # Pattern for section headers
-    matches = list(re.finditer(section_pattern, text))
-    
-    chunks = []
-    if len(matches) >= 3:  # Only use section-based chunking if we find enough sections
-        for i in range(len(matches)):
-            start = matches[i].start()
-            end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
-            section_text = text[start:end].strip()
-            if len(section_text) > 100:
-                chunks.append(section_text)
-        logger.info(f"Created {len(chunks)} chunks using section-based chunking")
+    return [chunk.text for chunk in chunk_stream(iter_pages(text), chunk_size, overlap, len)]
+
+def make_chunks(table_text: Optional[str], fallback_text: Optional[str], model: SentenceTransformer,
+                source: Optional[str] = None) -> List[Chunk]:
+    """
+    Chunk a document into CHUNK_TOKENS-token chunks measured with the embedding model's tokenizer.
+    
+    Args:
+        table_text: Extracted structured table text
+        fallback_text: Fallback extracted text, pages separated by chunker.PAGE_BREAK
+        model: Embedding model whose tokenizer sets the chunk boundaries
+        source: Document the text comes from
+        
+    Returns:
+        Chunk records with offsets, section and page numbers
+    """
+    count_tokens = make_token_counter(getattr(model, "tokenizer", None))
+    return chunk_document(table_text, fallback_text, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS, count_tokens, source)
+
+def _encode(chunks: List[str], model: SentenceTransformer) -> np.ndarray:
+    """Encode chunks into L2-normalized float32 embeddings."""
+    with metrics.timed("encode"):
+        embeddings = model.encode(
+            chunks,
+            show_progress_bar=True,
+            batch_size=ENCODE_BATCH_SIZE,
+            convert_to_numpy=True
+        )
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    
+    # Normalize embeddings for better similarity search
+    faiss.normalize_L2(embeddings)
+    return embeddings
+
+def embed_chunks(chunks: List[str], model: SentenceTransformer, stats: Optional[dict] = None,
+                 model_name: Optional[str] = None) -> np.ndarray:
+    """
+    Embed chunks, encoding only those not already in the chunk embedding store.
+    
+    Args:
+        chunks: Text chunks to encode
+        model: SentenceTransformer model
+        stats: Optional dict updated with embedding_hits, embedding_misses,
+            encode_seconds and encode_seconds_saved
+        model_name: Name the store keys embeddings under (default: the configured
+            model and backend, see model_registry.embedding_model_id)
+        
+    Returns:
+        L2-normalized float32 embedding matrix of shape (len(chunks), dim)
+    """
+    global _seconds_per_chunk
+    model_name = model_name or embedding_model_id()
+    
+    if not EMBEDDING_STORE_ENABLED:
+        start = time.perf_counter()
+        embeddings = _encode(chunks, model)
+        _record_stats(stats, 0, len(chunks), time.perf_counter() - start, 0.0)
+        return embeddings
+    
+    store = get_embedding_store(model_name, model.get_sentence_embedding_dimension())
+    keys = [chunk_key(chunk, model_name) for chunk in chunks]
+    hits, misses = store.lookup(keys)
+    
+    embeddings = np.empty((len(chunks), store.dim), dtype="float32")
+    for pos, vec in hits.items():
+        embeddings[pos] = vec
+    
+    encode_seconds = 0.0
+    if misses:
+        logger.info(f"Encoding {len(misses)} of {len(chunks)} text chunks...")
+        start = time.perf_counter()
+        encoded = _encode([chunks[pos] for pos in misses], model)
+        encode_seconds = time.perf_counter() - start
+        embeddings[misses] = encoded
+        store.add([keys[pos] for pos in misses], encoded)
+        _seconds_per_chunk = encode_seconds / len(misses)
+    
+    _record_stats(stats, len(hits), len(misses), encode_seconds, len(hits) * _seconds_per_chunk)
+    return embeddings
+
+def _record_stats(stats: Optional[dict], hits: int, misses: int, encode_seconds: float, seconds_saved: float) -> None:
+    logger.info(f"Embedding store: {hits} hits, {misses} misses, ~{seconds_saved:.2f}s encoding saved")
+    metrics.count(metrics.CACHE_LOOKUPS, hits, cache="embedding", result="hit")
+    metrics.count(metrics.CACHE_LOOKUPS, misses, cache="embedding", result="miss")
+    if stats is None:
+        return
+    stats["embedding_hits"] = stats.get("embedding_hits", 0) + hits
+    stats["embedding_misses"] = stats.get("embedding_misses", 0) + misses
+    stats["encode_seconds"] = round(stats.get("encode_seconds", 0.0) + encode_seconds, 3)
+    stats["encode_seconds_saved"] = round(stats.get("encode_seconds_saved", 0.0) + seconds_saved, 3)
+
+def _ivf_nlist(n: int, nlist: int) -> int:
+    """Number of IVF lists to use for n vectors, capped so every list gets enough training points."""
+    nlist = nlist or int(4 * np.sqrt(n))
+    return min(nlist, n // MIN_POINTS_PER_CENTROID)
+
+def _scalar_quantizer_type(storage: str) -> Optional[int]:
+    """faiss ScalarQuantizer type for an EMBEDDING_STORAGE value, None for full float32."""
+    if storage not in EMBEDDING_STORAGE_TYPES:
+        raise ValueError(f"Unknown embedding storage {storage!r}, expected one of {EMBEDDING_STORAGE_TYPES}")
+    return {
+        "float32": None,
+        "float16": faiss.ScalarQuantizer.QT_fp16,
+        "int8": faiss.ScalarQuantizer.QT_8bit,  # per-dimension min/max learned in train()
+    }[storage]
+
+def _widen_sq_range(index: faiss.Index) -> None:
+    """Apply SQ_RANGE_MARGIN to the scalar quantizer of an index, if it has one."""
+    sq = getattr(index, "sq", None)
+    if sq is not None:
+        sq.rangestat = faiss.ScalarQuantizer.RS_minmax
+        sq.rangestat_arg = SQ_RANGE_MARGIN
+
+def flat_index(dim: int, storage: Optional[str] = None) -> faiss.Index:
+    """
+    Exact inner-product index storing vectors at the given precision.
+    
+    Args:
+        dim: Vector dimension
+        storage: One of EMBEDDING_STORAGE_TYPES (default EMBEDDING_STORAGE)
+        
+    Returns:
+        IndexFlatIP for float32, otherwise an IndexScalarQuantizer that still needs train()
+    """
+    qtype = _scalar_quantizer_type(storage or EMBEDDING_STORAGE)
+    if qtype is None:
+        return faiss.IndexFlatIP(dim)
+    index = faiss.IndexScalarQuantizer(dim, qtype, faiss.METRIC_INNER_PRODUCT)
+    _widen_sq_range(index)
+    return index
+
+def train_unit_range(index: faiss.Index) -> None:
+    """
+    Train a scalar-quantized index on the fixed [-1, 1] range of every dimension.
+
+    Components of L2-normalized vectors never leave that range, so the index can
+    take vectors from any later document without depending on the sample it saw first.
+    """
+    sq = getattr(index, "sq", None)
+    if sq is not None:
+        sq.rangestat = faiss.ScalarQuantizer.RS_minmax
+        sq.rangestat_arg = 0.0
+    bounds = np.vstack([-np.ones(index.d), np.ones(index.d)]).astype("float32")
+    index.train(bounds)
+
+def create_index(embeddings: np.ndarray, kind: Optional[str] = None, storage: Optional[str] = None) -> faiss.Index:
+    """
+    Build a FAISS index over normalized embeddings.
+    
+    Trained index types fall back to a simpler type when there are too few
+    vectors to train them: IVF-PQ → IVF-Flat → Flat.
+    
+    Args:
+        embeddings: L2-normalized float32 embedding matrix
+        kind: One of INDEX_TYPES (default INDEX_TYPE)
+        storage: One of EMBEDDING_STORAGE_TYPES (default EMBEDDING_STORAGE); float16
+            halves and int8 quarters the memory per vector of flat, IVF-Flat and HNSW indexes
+        
+    Returns:
+        FAISS index using inner product (cosine) similarity
+    """
+    kind = kind or INDEX_TYPE
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {kind!r}, expected one of {INDEX_TYPES}")
+    qtype = _scalar_quantizer_type(storage or EMBEDDING_STORAGE)
+    
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    n, dim = embeddings.shape
+    
+    if kind == "ivf_pq" and (n < MIN_POINTS_PER_CENTROID * 2 ** PQ_NBITS or dim % PQ_M):
+        kind = "ivf_flat"
+    nlist = _ivf_nlist(n, IVF_NLIST)
+    if kind in ("ivf_flat", "ivf_pq") and nlist < 2:
+        kind = "flat"
+    
+    if kind == "flat":
+        index = flat_index(dim, storage)  # Using Inner Product for normalized vectors
+    elif kind == "hnsw":
+        if qtype is None:
+            index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexHNSWSQ(dim, qtype, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            _widen_sq_range(faiss.downcast_index(index.storage))
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
     else:
-        # Fallback to sliding window chunking
-        for i in range(0, len(text), chunk_size - overlap):
-            chunk = text[i:i + chunk_size].strip()
-            if len(chunk) > 100:
-                # Try to split at sentence boundaries within the chunk
-                sentences = re.split(r'(?<=[.!?])\s+', chunk)
-                if len(sentences) > 1:
-                    current_chunk = ""
-                    for sentence in sentences:
-                        if len(current_chunk) + len(sentence) <= chunk_size:
-                            current_chunk += sentence + " "
-                        else:
-                            if current_chunk:
-                                chunks.append(current_chunk.strip())
-                            current_chunk = sentence + " "
-                    if current_chunk:
-                        chunks.append(current_chunk.strip())
-                else:
-                    chunks.append(chunk)
-        logger.info(f"Created {len(chunks)} chunks using sliding window approach")
-    
-    return chunks
-
-def build_vector_index(table_text: Optional[str], fallback_text: Optional[str]) -> Tuple[faiss.Index, List[str], SentenceTransformer]:
-    """
-    Build a FAISS vector index from combined table and text content.
+        quantizer = faiss.IndexFlatIP(dim)
+        if kind == "ivf_flat" and qtype is not None:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, qtype, faiss.METRIC_INNER_PRODUCT)
+            _widen_sq_range(index)
+        elif kind == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, PQ_M, PQ_NBITS, faiss.METRIC_INNER_PRODUCT)
+        logger.info(f"Training {kind} index with {nlist} lists on {n} vectors")
+    
+    if not index.is_trained:
+        index.train(embeddings)  # IVF centroids, PQ codebooks or scalar quantizer ranges
+    index.add(embeddings)
+    tune_index(index)
+    return index
+
+def tune_index(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> faiss.Index:
+    """
+    Set search-time parameters on an IVF or HNSW index; other index types are left as-is.
+    
+    Args:
+        index: FAISS index
+        nprobe: IVF lists to visit per query (default IVF_NPROBE)
+        ef_search: HNSW candidate list size per query (default HNSW_EF_SEARCH)
+        
+    Returns:
+        The same index
+    """
+    params = faiss.ParameterSpace()
+    for name, value in (("nprobe", nprobe or IVF_NPROBE), ("efSearch", ef_search or HNSW_EF_SEARCH)):
+        try:
+            params.set_index_parameter(index, name, value)
+        except RuntimeError:
+            pass  # parameter doesn't apply to this index type
+    return index
+
+def merge_indexes(indexes: List[faiss.Index]) -> faiss.Index:
+    """
+    Combine several indexes into one, preserving vector order, without re-encoding.
+
+    The merged index is a flat one at EMBEDDING_STORAGE precision, so nothing is
+    trained per request: IVF centroids and PQ codebooks are only ever trained
+    once per document, when its index is built and cached. Its scalar quantizer,
+    if any, covers the fixed unit range (see `train_unit_range`).
+    
+    Args:
+        indexes: Indexes whose vectors can be reconstructed
+        
+    Returns:
+        A single index holding the vectors of all inputs in order
+    """
+    if not indexes:
+        raise ValueError("No indexes to merge")
+    if len(indexes) == 1:
+        return indexes[0]
+    merged = flat_index(indexes[0].d)
+    if not merged.is_trained:
+        train_unit_range(merged)
+    for index in indexes:
+        merged.add(np.ascontiguousarray(reconstruct_all(index), dtype="float32"))
+    return merged
+
+def reconstruct_all(index: faiss.Index) -> np.ndarray:
+    """All vectors of an index in insertion order (approximate for PQ- and SQ-compressed indexes)."""
+    try:
+        faiss.extract_index_ivf(index).make_direct_map()
+    except RuntimeError:
+        pass  # not an IVF index
+    return index.reconstruct_n(0, index.ntotal)
+
+def build_vector_index(table_text: Optional[str], fallback_text: Optional[str],
+                       stats: Optional[dict] = None, source: Optional[str] = None,
+                       records: Optional[List[Chunk]] = None
+                       ) -> Tuple[faiss.Index, List[str], SentenceTransformer, LexicalIndex]:
+    """
+    Build a FAISS vector index and a BM25 lexical index from combined table and text content.
     
     Args:
         table_text: Extracted structured table text
         fallback_text: Fallback extracted text
+        stats: Optional dict updated with embedding store hit/miss statistics
+        source: Document the text comes from, recorded on each chunk
+        records: Optional list extended with a Chunk record (offsets, page) per chunk
         
     Returns:
         Tuple containing:
         - FAISS index
         - List of text chunks
         - SentenceTransformer model
+        - BM25 index over the same chunks, with the same chunk ids
     """
     logger.info("🔧 Building vector index...")
     
-    # Handle None inputs
-    table_text = table_text or ""
-    fallback_text = fallback_text or ""
-    
-    all_text = table_text + "\n" + fallback_text
-    
-    if not all_text.strip():
+    if not (table_text or "").strip() and not (fallback_text or "").strip():
         raise ValueError("No text content provided for indexing")
     
-    chunks = chunk_text(all_text)
+    # Shared process-wide model, loaded once on first use
+    model = get_embedding_model()
+    
+    with metrics.timed("chunk"):
+        chunk_records = make_chunks(table_text, fallback_text, model, source)
+    chunks = [chunk.text for chunk in chunk_records]
+    metrics.count(metrics.CHUNKS, len(chunks))
+    if records is not None:
+        records.extend(chunk_records)
     
     if not chunks:
         raise ValueError("No valid chunks created from input text")
     
     logger.info(f"Processing {len(chunks)} text chunks")
     
-    # Initialize model with more robust settings
-    model = SentenceTransformer(
-        "all-MiniLM-L6-v2",
-        device="cpu",
-        cache_folder="./model_cache"
-    )
-    
-    # Encode chunks with progress indication
-    logger.info("Encoding text chunks...")
-    embeddings = model.encode(
-        chunks,
-        show_progress_bar=True,
-        batch_size=32,
-        convert_to_numpy=True
-    )
-    
-    # Normalize embeddings for better similarity search
-    faiss.normalize_L2(embeddings)
-    
-    # Build index with improved configuration
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatIP(dim)  # Using Inner Product for normalized vectors
-    index.add(np.array(embeddings).astype("float32"))
+    embeddings = embed_chunks(chunks, model, stats)
+    with metrics.timed("index_build"):
+        index = create_index(embeddings)
+        lexical_index = LexicalIndex.build(chunks)
     
-    logger.info(f"Built index with {index.ntotal} vectors")
+    logger.info(f"Built index with {index.ntotal} vectors and {len(lexical_index.terms)} lexical terms")
     
-    return index, chunks, model
\ No newline at end of file
+    return index, chunks, model, lexical_index